@@ -0,0 +1,142 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("warm-webshop-cache")
+@click.option("--now", is_flag=True, default=False, help="Warm up in this process instead of background jobs")
+@pass_context
+def warm_webshop_cache(context, now=False):
+	"Pre-build variant, review, filter and listing caches of the webshop"
+	from webshop.webshop.cache_warmer import (
+		enqueue_cache_warm_up,
+		get_cache_warm_up_status,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	frappe.set_user("Administrator")
+	try:
+		total = enqueue_cache_warm_up(now=now)
+
+		if now:
+			status = get_cache_warm_up_status()
+			click.echo(
+				f"Warmed {status['done']} of {total} caches in {status['duration']}s"
+				f" ({status['failed']} failed)"
+			)
+			for kind, timing in status["time_per_kind"].items():
+				click.echo(f"  {kind}: {timing['count']} in {timing['seconds']}s")
+		else:
+			click.echo(f"Queued warm-up of {total} caches")
+	finally:
+		frappe.destroy()
+
+
+@click.command("reindex-webshop-search")
+@pass_context
+def reindex_webshop_search(context):
+	"Rewrite all published Website Items to the Redisearch index and report throughput"
+	from webshop.webshop.redisearch_utils import reindex_all_web_items
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		stats = reindex_all_web_items()
+		if not stats:
+			click.echo("Redisearch is not enabled")
+			return
+
+		click.echo(
+			f"Indexed {stats['items']} items in {stats['duration']}s"
+			f" ({stats['items_per_sec']} items/sec)"
+		)
+	finally:
+		frappe.destroy()
+
+
+@click.command("benchmark-webshop-listing")
+@click.option("--rows", default=100000, help="Synthetic Website Items to list")
+@click.option("--runs", default=10, help="Queries per measured page")
+@pass_context
+def benchmark_webshop_listing(context, rows=100000, runs=10):
+	"Time OFFSET against cursor paging at several page depths (adds and removes rows, use a test site)"
+	from webshop.webshop.benchmarks import benchmark_listing_paging
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		for result in benchmark_listing_paging(rows=rows, runs=runs):
+			click.echo(
+				f"page {result.page} (start {result.start}): offset {result.offset_ms} ms,"
+				f" cursor {result.cursor_ms} ms"
+			)
+	finally:
+		frappe.destroy()
+
+
+@click.command("benchmark-webshop-search")
+@click.argument("search_term")
+@click.option("--runs", default=10, help="Queries per search mode")
+@pass_context
+def benchmark_webshop_search(context, search_term, runs=10):
+	"Compare query plans and timings of full-text and LIKE product search"
+	from webshop.webshop.benchmarks import benchmark_search
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		for mode, result in benchmark_search(search_term, runs=runs).items():
+			if not result:
+				click.echo(f"{mode}: full-text search is not available for this term")
+				continue
+
+			click.echo(f"{mode}: {result.rows} items, {result.ms} ms")
+			for step in result.plan:
+				click.echo(
+					f"  {step.get('table')}: type {step.get('type')}, key {step.get('key')},"
+					f" rows {step.get('rows')}, {step.get('Extra') or ''}"
+				)
+	finally:
+		frappe.destroy()
+
+
+@click.command("benchmark-webshop-variants")
+@pass_context
+def benchmark_webshop_variants(context):
+	"Compare the cached variant data and option filtering with the previous layout"
+	from webshop.webshop.benchmarks import (
+		benchmark_variant_options,
+		benchmark_variants_cache_payload,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		payload = benchmark_variants_cache_payload()
+		click.echo(
+			f"cache payload of {payload.variants} variants: compact {payload.compact_bytes} bytes,"
+			f" previous layout {payload.legacy_bytes} bytes"
+		)
+
+		options = benchmark_variant_options()
+		click.echo(
+			f"variant options of {options.variants} variants: bitsets {options.bitset_ms} ms,"
+			f" scan {options.scan_ms} ms"
+		)
+	finally:
+		frappe.destroy()
+
+
+commands = [
+	warm_webshop_cache,
+	reindex_webshop_search,
+	benchmark_webshop_listing,
+	benchmark_webshop_search,
+	benchmark_webshop_variants,
+]
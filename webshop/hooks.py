@@ -47,12 +47,63 @@ doc_events = {
         "on_update": [
             "webshop.webshop.crud_events.item.update_website_item.execute",
             "webshop.webshop.crud_events.item.invalidate_item_variants_cache.execute",
+            "webshop.webshop.crud_events.item.update_attribute_index.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.crud_events.item.update_attribute_index.execute",
         ],
         "before_rename": [
             "webshop.webshop.crud_events.item.validate_duplicate_website_item.execute",
         ],
         "after_rename": [
             "webshop.webshop.crud_events.item.invalidate_item_variants_cache.execute",
+            "webshop.webshop.crud_events.item.update_attribute_index.execute",
+        ],
+    },
+    "Website Item": {
+        "after_rename": [
+            "webshop.webshop.redisearch_utils.rename_item_in_index",
+        ],
+    },
+    "Item Group": {
+        "after_rename": [
+            "webshop.webshop.redisearch_utils.rename_item_group_suggestion",
+            "webshop.webshop.crud_events.item_group.invalidate_item_group_tree.execute",
+        ],
+    },
+    "Item Attribute": {
+        "on_update": [
+            "webshop.webshop.crud_events.item_attribute.clear_ordered_attribute_values.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.crud_events.item_attribute.clear_ordered_attribute_values.execute",
+        ],
+    },
+    "Warehouse": {
+        "on_update": [
+            "webshop.webshop.crud_events.warehouse.clear_warehouse_tree_cache.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.crud_events.warehouse.clear_warehouse_tree_cache.execute",
+        ],
+        "after_rename": [
+            "webshop.webshop.crud_events.warehouse.clear_warehouse_tree_cache.execute",
+        ],
+    },
+    "Product Bundle": {
+        "on_update": [
+            "webshop.webshop.crud_events.product_bundle.clear_product_bundles_cache.execute",
+        ],
+        "on_trash": [
+            "webshop.webshop.crud_events.product_bundle.clear_product_bundles_cache.execute",
+        ],
+        "after_rename": [
+            "webshop.webshop.crud_events.product_bundle.clear_product_bundles_cache.execute",
+        ],
+    },
+    "Stock Ledger Entry": {
+        "on_submit": [
+            "webshop.webshop.utils.sellable_stock.update_sellable_stock",
         ],
     },
     "Sales Taxes and Charges Template": {
@@ -67,6 +118,22 @@ doc_events = {
         "on_trash": "webshop.webshop.shopping_cart.cart.remove_quotation_loyalty_points",
         "on_cancel": "webshop.webshop.shopping_cart.cart.remove_quotation_loyalty_points"
     },
+    "Item Price": {
+        "on_update": [
+            "webshop.webshop.crud_events.item_price.update_website_item_prices.execute",
+        ],
+        "after_delete": [
+            "webshop.webshop.crud_events.item_price.update_website_item_prices.execute",
+        ],
+    },
+    "Pricing Rule": {
+        "on_update": [
+            "webshop.webshop.crud_events.pricing_rule.update_website_item_prices.execute",
+        ],
+        "after_delete": [
+            "webshop.webshop.crud_events.pricing_rule.update_website_item_prices.execute",
+        ],
+    },
     "Price List": {
         "validate": [
             "webshop.webshop.crud_events.price_list.check_impact_on_cart.execute"
@@ -86,6 +153,18 @@ doc_events = {
     }
 }
 
+scheduler_events = {
+    "hourly_long": [
+        "webshop.webshop.cache_warmer.warm_up_if_flushed",
+        "webshop.webshop.utils.sellable_stock.reconcile_sellable_stock",
+    ],
+    "daily_long": [
+        "webshop.webshop.redisearch_utils.define_autocomplete_dictionary",
+        "webshop.webshop.product_data_engine.attribute_index.rebuild_attribute_indexes",
+        "webshop.webshop.doctype.website_item_price.website_item_price.refresh_all_website_item_prices",
+    ],
+}
+
 has_website_permission = {
     "Website Item": "webshop.webshop.doctype.website_item.website_item.has_website_permission_for_website_item",
     "Item Group": "webshop.webshop.doctype.website_item.website_item.has_website_permission_for_item_group"
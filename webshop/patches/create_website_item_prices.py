@@ -0,0 +1,11 @@
+import frappe
+
+
+def execute():
+	"""Populate Website Item Price for listing discount filters."""
+	frappe.reload_doc("webshop", "doctype", "website_item_price")
+
+	frappe.enqueue(
+		"webshop.webshop.doctype.website_item_price.website_item_price.refresh_website_item_prices",
+		queue="long",
+	)
@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Fill the rating summary of Website Items from existing Item Reviews."""
+	from webshop.webshop.doctype.item_review.item_review import update_all_rating_summaries
+
+	frappe.reload_doc("webshop", "doctype", "website_item")
+	update_all_rating_summaries()
@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+	"""Rebuild the Redisearch index with ranking, published flag and filter fields in its schema."""
+	from webshop.webshop.redisearch_utils import create_website_items_index
+
+	frappe.reload_doc("webshop", "doctype", "webshop_settings")
+	create_website_items_index()
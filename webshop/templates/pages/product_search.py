@@ -4,13 +4,16 @@
 import json
 
 import frappe
-from frappe.utils import cint, cstr
+from frappe.utils import cint
 from redis.commands.search.query import Query
 
+from webshop.webshop.product_data_engine.query import ProductQuery
 from webshop.webshop.redisearch_utils import (
 	WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE,
 	WEBSITE_ITEM_INDEX,
 	WEBSITE_ITEM_NAME_AUTOCOMPLETE,
+	get_search_filter_query,
+	get_tag_fields,
 	is_redisearch_enabled,
 )
 from webshop.webshop.shopping_cart.product_info import set_product_info_for_website
@@ -25,7 +28,7 @@ def get_context(context):
 
 @frappe.whitelist(allow_guest=True)
 def get_product_list(search=None, start=0, limit=12):
-	data = get_product_data(search, start, limit)
+	data, total = get_product_data(search, start, limit)
 
 	for item in data:
 		set_product_info_for_website(item)
@@ -33,34 +36,47 @@ def get_product_list(search=None, start=0, limit=12):
 	return [get_item_for_list_in_html(r) for r in data]
 
 
-def get_product_data(search=None, start=0, limit=12):
+def get_product_data(search=None, start=0, limit=12, item_group=None, field_filters=None):
+	"""
+	Published Website Items matching `search` by ranking (or relevance), filtered
+	like `get_product_filter_data`. Serves search when Redisearch is not enabled.
+
+	Returns:
+	        tuple: (items of the page, number of matching items)
+	"""
 	# limit = 12 because we show 12 items in the grid view
-	# base query
-	query = """
-		SELECT
-			web_item_name, item_name, item_code, brand, route,
-			website_image, thumbnail, item_group,
-			description, web_long_description as website_description,
-			website_warehouse, ranking
-		FROM `tabWebsite Item`
-		WHERE published = 1
-		"""
-
-	# search term condition
+	engine = ProductQuery()
+	engine.page_length = cint(limit)
+	engine.fields = [
+		"name",
+		"web_item_name",
+		"item_name",
+		"item_code",
+		"brand",
+		"route",
+		"website_image",
+		"thumbnail",
+		"item_group",
+		"description",
+		"web_long_description as website_description",
+		"website_warehouse",
+		"ranking",
+	]
+
+	if field_filters:
+		engine.build_fields_filters(field_filters)
+		if field_filters.get("discount"):
+			engine.build_discount_filters(field_filters["discount"])
+	if item_group:
+		engine.build_item_group_filters(item_group)
 	if search:
-		query += """ and (item_name like %(search)s
-				or web_item_name like %(search)s
-				or brand like %(search)s
-				or web_long_description like %(search)s)"""
-		search = "%" + cstr(search) + "%"
-
-	# order by
-	query += """ ORDER BY ranking desc, modified desc limit %s offset %s""" % (
-		cint(limit),
-		cint(start),
-	)
+		engine.build_search_filters(search)
+	if engine.settings.hide_variants:
+		engine.filters.append(["variant_of", "is", "not set"])
+
+	items, count = engine.query_items(start=cint(start))
 
-	return frappe.db.sql(query, {"search": search}, as_dict=1)  # nosemgrep
+	return items, engine.total_count
 
 
 @frappe.whitelist(allow_guest=True)
@@ -75,13 +91,30 @@ def search(query):
 
 
 @frappe.whitelist(allow_guest=True)
-def product_search(query, limit=10, fuzzy_search=True):
+def product_search(query, limit=10, fuzzy_search=True, start=0, item_group=None, field_filters=None):
+	"""
+	Search published Website Items by ranking, filtered like `get_product_filter_data`.
+
+	Args:
+	        query (str): Search term
+	        limit (int, optional): Page length
+	        fuzzy_search (bool, optional): Match suggestions within a Levenshtein distance of 1
+	        start (int, optional): Offset results by
+	        item_group (str, optional): Valid Item Group
+	        field_filters (dict, optional): Keys include item_group, brand, etc.
+	"""
 	search_results = {"from_redisearch": True, "results": []}
+	limit, start = cint(limit), cint(start)
 
-	if not is_redisearch_enabled():
-		# Redisearch module not enabled
+	if isinstance(field_filters, str):
+		field_filters = json.loads(field_filters)
+
+	if not is_redisearch_enabled() or not can_filter_in_redisearch(field_filters):
+		# Redisearch module not enabled, or filters it cannot apply (eg. discount)
 		search_results["from_redisearch"] = False
-		search_results["results"] = get_product_data(query, 0, limit)
+		search_results["results"], search_results["total"] = get_product_data(
+			query, start, limit, item_group, field_filters
+		)
 		return search_results
 
 	if not query:
@@ -106,17 +139,22 @@ def product_search(query, limit=10, fuzzy_search=True):
 	for s in suggestions:
 		query_string += f"|('{clean_up_query(s.string)}')"
 
-	q = Query(query_string)
+	query_string = f"({query_string}) {get_search_filter_query(item_group, field_filters)}"
+	q = Query(query_string).sort_by("ranking", asc=False).paging(start, limit)
 	results = redisearch.search(q)
 
 	search_results["results"] = list(map(convert_to_dict, results.docs))
-	search_results["results"] = sorted(
-		search_results["results"], key=lambda k: frappe.utils.cint(k["ranking"]), reverse=True
-	)
+	search_results["total"] = results.total
 
 	return search_results
 
 
+def can_filter_in_redisearch(field_filters):
+	"""Only fields indexed as tags can be filtered by in Redisearch, see `get_search_filter_query`."""
+	tag_fields = get_tag_fields()
+	return all(field in tag_fields for field, values in (field_filters or {}).items() if values)
+
+
 def clean_up_query(query):
 	return "".join(c for c in query if c.isalnum() or c.isspace())
 
@@ -8,6 +8,7 @@ from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 from webshop.webshop.shopping_cart.cart import _set_price_list
 from erpnext.utilities.product import get_price
 from webshop.webshop.shopping_cart.cart import get_party
+from webshop.webshop.utils.product import get_stock_for_items
 
 
 def get_context(context):
@@ -25,23 +26,6 @@ def get_context(context):
 	context.no_cache = 1
 
 
-def get_stock_availability(item_code, warehouse):
-	from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
-
-	if warehouse and frappe.get_cached_value("Warehouse", warehouse, "is_group") == 1:
-		warehouses = get_child_warehouses(warehouse)
-	else:
-		warehouses = [warehouse] if warehouse else []
-
-	stock_qty = 0.0
-	for warehouse in warehouses:
-		stock_qty += frappe.utils.flt(
-			frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse}, "actual_qty")
-		)
-
-	return bool(stock_qty)
-
-
 def get_wishlist_items():
 	if not frappe.db.exists("Wishlist", frappe.session.user):
 		return []
@@ -63,11 +47,13 @@ def get_wishlist_items():
 
 
 def set_stock_price_details(items, settings, selling_price_list):
+	stock = {}
+	if settings.show_stock_availability:
+		stock = get_stock_for_items([item.item_code for item in items], "website_warehouse")
+
 	for item in items:
 		if settings.show_stock_availability:
-			item.available = get_stock_availability(
-				item.item_code, item.get("warehouse")
-			)
+			item.available = bool(stock[item.item_code].in_stock)
 
 		party = get_party()
 
@@ -7,9 +7,15 @@ import json
 import frappe
 from frappe.utils import cint
 
+from webshop.webshop.product_data_engine.cache import (
+	get_cached_product_listing,
+	get_product_listing_cache_key,
+	set_cached_product_listing,
+)
 from webshop.webshop.product_data_engine.filters import ProductFiltersBuilder
 from webshop.webshop.product_data_engine.query import ProductQuery
 from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
+from webshop.webshop.shopping_cart.cart import _set_price_list, get_party
 
 
 @frappe.whitelist(allow_guest=True)
@@ -25,6 +31,8 @@ def get_product_filter_data(query_args=None):
 		field_filters (dict): Keys include item_group, brand, etc.
 		attribute_filters(dict): Keys include Color, Size, etc.
 		start (int): Offset items by
+		cursor (str): `next_cursor` of the previous page, seek instead of offsetting by start
+		sort_by (str): "average_rating" to list best rated items first
 		item_group (str): Valid Item Group
 		from_filters (bool): Set as True to jump to page 1
 	"""
@@ -38,64 +46,99 @@ def get_product_filter_data(query_args=None):
 		field_filters = query_args.get("field_filters", {})
 		attribute_filters = query_args.get("attribute_filters", {})
 		start = cint(query_args.start) if query_args.get("start") else 0
+		cursor = query_args.get("cursor")
+		sort_by = query_args.get("sort_by")
 		item_group = query_args.get("item_group")
 		from_filters = query_args.get("from_filters")
 	else:
-		search, attribute_filters, item_group, from_filters = None, None, None, None
+		search, attribute_filters, item_group, from_filters, cursor = None, None, None, None, None
+		sort_by = None
 		field_filters = {}
 		start = 0
 
 	# if new filter is checked, reset start to show filtered items from page 1
 	if from_filters:
 		start = 0
-
-	sub_categories = []
-	if item_group:
-		sub_categories = get_child_groups_for_website(item_group, immediate=True)
+		cursor = None
 
 	engine = ProductQuery()
 
 	try:
-		result = engine.query(
-			attribute_filters,
-			field_filters,
-			search_term=search,
-			start=start,
-			item_group=item_group,
-		)
-		
-		# Get total count
-		engine.page_length = 0 
-		total_result = engine.query(
-			attribute_filters,
-			field_filters,
-			search_term=search,
-			start=0,
+		cache_key = get_listing_cache_key(
+			engine.settings,
+			search=search,
+			field_filters=field_filters,
+			attribute_filters=attribute_filters,
 			item_group=item_group,
+			start=start,
+			cursor=cursor,
+			sort_by=sort_by,
 		)
-		engine.page_length = engine.settings.products_per_page or 20  # Restore pagination
+		response = get_cached_product_listing(cache_key)
+
+		if response is None:
+			response = get_product_listing(
+				engine, search, field_filters, attribute_filters, start, cursor, item_group, sort_by
+			)
+			set_cached_product_listing(cache_key, response)
+		else:
+			# cached response is shared, set cart and wishlist details of this user
+			engine.set_user_item_details(response["items"])
 	except Exception:
 		frappe.log_error("Product query with filter failed")
 		return {"exc": "Something went wrong!"}
 
+	return {**response, "settings": engine.settings}
+
+
+def get_product_listing(
+	engine, search, field_filters, attribute_filters, start, cursor, item_group, sort_by=None
+):
+	sub_categories = []
+	if item_group:
+		sub_categories = get_child_groups_for_website(item_group, immediate=True)
+
+	result = engine.query(
+		attribute_filters,
+		field_filters,
+		search_term=search,
+		start=start,
+		item_group=item_group,
+		cursor=cursor,
+		sort_by=sort_by,
+	)
+
 	# discount filter data
 	filters = {}
-	discounts = result["discounts"]
+	filter_engine = ProductFiltersBuilder()
+	discount_filters = filter_engine.get_discount_filters()
 
-	if discounts:
-		filter_engine = ProductFiltersBuilder()
-		filters["discount_filters"] = filter_engine.get_discount_filters(discounts)
+	if discount_filters:
+		filters["discount_filters"] = discount_filters
 
 	return {
 		"items": result["items"] or [],
 		"filters": filters,
-		"settings": engine.settings,
 		"sub_categories": sub_categories,
 		"items_count": len(result["items"]),
-		"total_count": len(result["items"]) if field_filters.get("discount") else total_result["items_count"],
+		"total_count": result["total_count"],
+		"next_cursor": result["next_cursor"],
 	}
 
 
+def get_listing_cache_key(settings, **query_args):
+	"""Cache key of a listing, prices depend on the price list, customer group and party."""
+	party = get_party()
+	is_guest = frappe.session.user == "Guest"
+
+	return get_product_listing_cache_key(
+		query_args,
+		price_list=_set_price_list(settings, None) if party else settings.price_list,
+		customer_group=party.get("customer_group") if party else settings.default_customer_group,
+		party=party.name if party and not is_guest else None,
+	)
+
+
 @frappe.whitelist(allow_guest=True)
 def get_guest_redirect_on_action():
 	return frappe.db.get_single_value("Webshop Settings", "redirect_on_action")
@@ -0,0 +1,273 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import pickle
+import time
+
+import frappe
+from frappe.utils import now
+
+# synthetic rows are named after this prefix and removed after each run
+BENCHMARK_PREFIX = "_Bench WI-"
+
+
+def benchmark_listing_paging(rows=100000, page_length=20, runs=10, pages=(2, 10, 100, 1000, -1)):
+	"""
+	Time listing pages of a committed catalog of `rows` synthetic Website Items,
+	fetched by OFFSET and by seeking past a cursor. Rankings are tied in groups of 100.
+	Args:
+	        pages (tuple): page numbers to measure, negative numbers count from the last page
+	Returns:
+	        list: {page, start, offset_ms, cursor_ms} per measured page
+	"""
+	from webshop.webshop.product_data_engine.query import ProductQuery, encode_cursor
+
+	insert_benchmark_web_items(rows)
+	try:
+		engine = ProductQuery()
+		order_by = "ranking desc, `tabWebsite Item`.`name` desc"
+		filters = [["published", "=", 1]]
+		total = frappe.db.count("Website Item", {"published": 1})
+		last_page = (total - 1) // page_length + 1
+
+		def fetch(filters, start):
+			return frappe.get_all(
+				"Website Item",
+				filters=filters,
+				order_by=order_by,
+				limit_start=start,
+				limit_page_length=page_length,
+				pluck="name",
+			)
+
+		results = []
+		for page in pages:
+			page = last_page + page + 1 if page < 0 else page
+			if not 1 < page <= last_page:
+				continue
+
+			start = (page - 1) * page_length
+			# last item of the previous page
+			previous = frappe.get_all(
+				"Website Item",
+				fields=["name", "ranking"],
+				filters=filters,
+				order_by=order_by,
+				limit_start=start - 1,
+				limit_page_length=1,
+			)[0]
+			cursor_filters = filters + [engine.get_cursor_condition(encode_cursor(previous))]
+
+			if fetch(cursor_filters, 0) != fetch(filters, start):
+				frappe.throw(f"Cursor and offset pages differ at page {page}")
+
+			results.append(
+				frappe._dict(
+					page=page,
+					start=start,
+					offset_ms=time_per_run(lambda: fetch(filters, start), runs),
+					cursor_ms=time_per_run(lambda: fetch(cursor_filters, 0), runs),
+				)
+			)
+
+		return results
+	finally:
+		delete_benchmark_web_items()
+
+
+def benchmark_search(search_term, runs=10):
+	"""
+	Compare the full-text (MATCH) and LIKE listing queries of `search_term` on the
+	site's committed data.
+	Returns:
+	        dict: {"match": ..., "like": ...} with matching `rows`, `ms` per query and the
+	                EXPLAIN `plan`, "match" is None if full-text search cannot serve the term
+	"""
+	from webshop.webshop.product_data_engine.query import ProductQuery
+
+	results = {}
+	for mode in ("match", "like"):
+		engine = ProductQuery()
+		if mode == "match":
+			engine.build_search_filters(search_term)
+			if not engine.search_match:
+				results[mode] = None
+				continue
+		else:
+			engine.build_like_search_filters(search_term)
+
+		order_fields, order_by = engine.get_order()
+		query_args = dict(
+			fields=["name"] + order_fields,
+			filters=engine.filters,
+			or_filters=engine.or_filters,
+			order_by=order_by,
+			limit_page_length=engine.page_length,
+		)
+		query = frappe.db.get_all("Website Item", run=0, **query_args)
+
+		results[mode] = frappe._dict(
+			rows=engine.get_items_count(),
+			ms=time_per_run(lambda: frappe.db.get_all("Website Item", **query_args), runs),
+			plan=frappe.db.sql(f"explain {query}", as_dict=True),
+		)
+
+	return results
+
+
+def benchmark_variants_cache_payload(sizes=10, colours=10, lengths=5):
+	"""
+	Pickled size of the cached variant data of a synthetic template with
+	`sizes` x `colours` x `lengths` variants, compact against the previous layout.
+	Returns:
+	        dict: `variants`, `compact_bytes` and `legacy_bytes`
+	"""
+	from webshop.webshop.variant_selector.item_variants_cache import make_variants_cache_data
+
+	attributes, item_variants_data = make_variants_data(sizes, colours, lengths)
+	legacy = make_legacy_variants_cache_data(attributes, item_variants_data)
+
+	return frappe._dict(
+		variants=sizes * colours * lengths,
+		compact_bytes=len(pickle.dumps(make_variants_cache_data(attributes, item_variants_data))),
+		# each entry was a separate cache value
+		legacy_bytes=sum(len(pickle.dumps(entry)) for entry in legacy.values()),
+	)
+
+
+def benchmark_variant_options(sizes=20, colours=20, lengths=10, runs=20):
+	"""
+	Time finding valid options and matching variants of a synthetic template with
+	`sizes` x `colours` x `lengths` variants, by bitsets against a scan of all rows.
+	Returns:
+	        dict: `variants`, `bitset_ms` and `scan_ms` for one pass over the selections
+	"""
+	from webshop.webshop.variant_selector.item_variants_cache import (
+		ItemVariantsCacheManager,
+		make_variants_cache_data,
+	)
+	from webshop.webshop.variant_selector.utils import get_variant_options
+
+	attributes, item_variants_data = make_variants_data(sizes, colours, lengths)
+	legacy = make_legacy_variants_cache_data(attributes, item_variants_data)
+	selections = [
+		{"Size": "S3"},
+		{"Size": "S3", "Colour": "C7"},
+		{"Size": "S3", "Colour": "C7", "Length": "L2"},
+	]
+
+	template = "_Bench Variant"
+	item_cache = ItemVariantsCacheManager(template)
+	if getattr(frappe.local, "item_variants_cache", None) is None:
+		frappe.local.item_variants_cache = {}
+	frappe.local.item_variants_cache[template] = make_variants_cache_data(attributes, item_variants_data)
+
+	def scan():
+		for selected_attributes in selections:
+			get_legacy_variant_options(legacy, attributes, selected_attributes)
+
+	def filter_bitsets():
+		for selected_attributes in selections:
+			get_variant_options(item_cache, selected_attributes)
+
+	try:
+		return frappe._dict(
+			variants=sizes * colours * lengths,
+			scan_ms=time_per_run(scan, runs),
+			bitset_ms=time_per_run(filter_bitsets, runs),
+		)
+	finally:
+		frappe.local.item_variants_cache.pop(template, None)
+
+
+def get_legacy_variant_options(legacy, attributes, selected_attributes):
+	"""
+	Matching items and valid options by scanning all variant rows, as done
+	before bitsets.
+	Returns:
+	        tuple: (set of item codes, {attribute: set of valid values})
+	"""
+	attribute_value_item_map = legacy["attribute_value_item_map"]
+	filtered_items = set.intersection(
+		*[set(attribute_value_item_map.get(key, [])) for key in selected_attributes.items()]
+	)
+
+	valid_options = {attribute: set() for attribute in attributes}
+	for attribute, value in selected_attributes.items():
+		valid_options[attribute].add(value)
+
+	for item_code, attribute, value in legacy["item_variants_data"]:
+		if item_code in filtered_items and attribute not in selected_attributes:
+			valid_options[attribute].add(value)
+
+	return filtered_items, valid_options
+
+
+def make_variants_data(sizes, colours, lengths):
+	"""Attributes and variant rows of a template with one variant per combination."""
+	attributes = ["Size", "Colour", "Length"]
+	item_variants_data = []
+	for size in range(sizes):
+		for colour in range(colours):
+			for length in range(lengths):
+				item_code = f"_Bench Variant-{size}-{colour}-{length}"
+				item_variants_data.extend(
+					[
+						(item_code, "Size", f"S{size}"),
+						(item_code, "Colour", f"C{colour}"),
+						(item_code, "Length", f"L{length}"),
+					]
+				)
+
+	return attributes, item_variants_data
+
+
+def make_legacy_variants_cache_data(attributes, item_variants_data):
+	"""The four cache entries of a template before `make_variants_cache_data`."""
+	attribute_value_item_map, item_attribute_value_map = {}, {}
+	for item_code, attribute, value in item_variants_data:
+		attribute_value_item_map.setdefault((attribute, value), []).append(item_code)
+		item_attribute_value_map.setdefault(item_code, {})[attribute] = value
+
+	optional_attributes = {
+		attribute
+		for attribute in attributes
+		if any(attribute not in values for values in item_attribute_value_map.values())
+	}
+
+	return {
+		"item_variants_data": item_variants_data,
+		"attribute_value_item_map": attribute_value_item_map,
+		"item_attribute_value_map": item_attribute_value_map,
+		"optional_attributes": optional_attributes,
+	}
+
+
+def insert_benchmark_web_items(rows):
+	delete_benchmark_web_items()
+
+	timestamp = now()
+	frappe.db.bulk_insert(
+		"Website Item",
+		fields=["name", "item_code", "ranking", "published", "creation", "modified"],
+		values=[
+			(f"{BENCHMARK_PREFIX}{i:06d}", f"{BENCHMARK_PREFIX}{i:06d}", i // 100, 1, timestamp, timestamp)
+			for i in range(rows)
+		],
+	)
+	# measure plans on committed data, as listings see it
+	frappe.db.commit()
+
+
+def delete_benchmark_web_items():
+	frappe.db.delete("Website Item", {"name": ["like", f"{BENCHMARK_PREFIX}%"]})
+	frappe.db.commit()
+
+
+def time_per_run(function, runs):
+	"""Return the mean duration of `function` in milliseconds."""
+	started = time.perf_counter()
+	for _ in range(runs):
+		function()
+
+	return round((time.perf_counter() - started) / runs * 1000, 2)
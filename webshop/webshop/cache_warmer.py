@@ -0,0 +1,202 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import time
+
+import frappe
+from frappe.utils import add_days, cint, flt, now_datetime
+from frappe.utils.redis_wrapper import RedisWrapper
+
+CACHE_WARM_UP_STATUS_KEY = "webshop_cache_warm_up_status"
+
+# number of warm-up jobs running at the same time, each warms a share of the catalog
+CACHE_WARM_UP_JOBS = 4
+
+# most visited item groups whose first listing page is pre-built
+TOP_LISTINGS_LIMIT = 20
+TOP_LISTINGS_DAYS = 7
+
+
+def enqueue_cache_warm_up(now=False):
+	"""Split the warm-up tasks between `CACHE_WARM_UP_JOBS` background jobs."""
+	tasks = get_cache_warm_up_tasks()
+
+	cache = frappe.cache()
+	status_key = cache.make_key(CACHE_WARM_UP_STATUS_KEY)
+	cache.delete(status_key)
+	super(RedisWrapper, cache).hset(
+		status_key,
+		mapping={"total": len(tasks), "done": 0, "failed": 0, "started_at": time.time()},
+	)
+
+	for index in range(CACHE_WARM_UP_JOBS):
+		chunk = tasks[index::CACHE_WARM_UP_JOBS]
+		if chunk:
+			frappe.enqueue(
+				"webshop.webshop.cache_warmer.warm_up_caches",
+				tasks=chunk,
+				queue="long",
+				now=now or frappe.flags.in_test,
+			)
+
+	return len(tasks)
+
+
+def warm_up_if_flushed():
+	"Start a warm-up if the status of the last one is gone, i.e. Redis was flushed."
+	if not frappe.cache().exists(CACHE_WARM_UP_STATUS_KEY):
+		enqueue_cache_warm_up()
+
+
+def get_cache_warm_up_tasks():
+	"""
+	Caches to pre-build, most visited listings first.
+	Returns:
+	        list: [(kind, name), ...] where kind is one of `CACHE_WARMERS`
+	"""
+	tasks = [("listing", item_group) for item_group in get_top_listing_item_groups()]
+
+	item_groups = frappe.get_all("Item Group", {"show_in_website": 1}, pluck="name")
+	tasks.extend(("filters", item_group) for item_group in [None, *item_groups])
+
+	templates = frappe.get_all(
+		"Website Item", {"published": 1, "has_variants": 1}, pluck="item_code"
+	)
+	tasks.extend(("variants", item_code) for item_code in templates)
+
+	if frappe.db.get_single_value("Webshop Settings", "enable_reviews"):
+		reviewed_items = frappe.get_all(
+			"Item Review", fields=["website_item"], distinct=True, pluck="website_item"
+		)
+		tasks.extend(("reviews", web_item) for web_item in reviewed_items)
+
+	return tasks
+
+
+def get_top_listing_item_groups():
+	"""Item groups with the most page views lately, None standing for all products."""
+	views = frappe.get_all(
+		"Web Page View",
+		filters={"creation": (">=", add_days(now_datetime(), -TOP_LISTINGS_DAYS))},
+		fields=["path", "count(*) as views"],
+		group_by="path",
+		order_by="views desc",
+		limit=TOP_LISTINGS_LIMIT * 5,
+	)
+
+	item_group_routes = dict(
+		frappe.get_all(
+			"Item Group", {"show_in_website": 1}, ["route", "name"], as_list=True
+		)
+	)
+
+	item_groups = [None]
+	for view in views:
+		route = (view.path or "").strip("/")
+		if route in item_group_routes and item_group_routes[route] not in item_groups:
+			item_groups.append(item_group_routes[route])
+
+	return item_groups[:TOP_LISTINGS_LIMIT]
+
+
+def warm_up_caches(tasks):
+	cache = frappe.cache()
+	status_key = cache.make_key(CACHE_WARM_UP_STATUS_KEY)
+
+	for kind, name in tasks:
+		start = time.monotonic()
+		try:
+			CACHE_WARMERS[kind](name)
+			cache.hincrby(status_key, "done", 1)
+		except Exception:
+			frappe.log_error(f"Cache warm-up of {kind} {name or ''} failed")
+			cache.hincrby(status_key, "failed", 1)
+		finally:
+			cache.hincrbyfloat(status_key, f"{kind}_time", time.monotonic() - start)
+			cache.hincrby(status_key, f"{kind}_count", 1)
+
+		# drop per-request memos, jobs warm many caches in one request
+		frappe.local.item_variants_cache = None
+		frappe.local.webshop_catalog_version = None
+
+	status = get_warm_up_status()
+	if status["done"] + status["failed"] >= status["total"]:
+		cache.hsetnx(status_key, "finished_at", time.time())
+
+
+def warm_up_variants(item_code):
+	from webshop.webshop.variant_selector.item_variants_cache import ItemVariantsCacheManager
+
+	ItemVariantsCacheManager(item_code).get_cache()
+
+
+def warm_up_reviews(web_item):
+	from webshop.webshop.doctype.item_review.item_review import (
+		get_queried_reviews,
+		set_reviews_in_cache,
+	)
+
+	set_reviews_in_cache(web_item, get_queried_reviews(web_item))
+
+
+def warm_up_filters(item_group):
+	from webshop.webshop.product_data_engine.filters import ProductFiltersBuilder
+
+	filter_engine = ProductFiltersBuilder(item_group)
+	filter_engine.get_field_filters()
+	filter_engine.get_attribute_filters()
+
+
+def warm_up_listing(item_group):
+	"First listing page of the item group as guests see it."
+	from webshop.webshop.api import get_product_filter_data
+
+	user = frappe.session.user
+	frappe.set_user("Guest")
+	try:
+		get_product_filter_data({"item_group": item_group} if item_group else None)
+	finally:
+		frappe.set_user(user)
+
+
+CACHE_WARMERS = {
+	"listing": warm_up_listing,
+	"filters": warm_up_filters,
+	"variants": warm_up_variants,
+	"reviews": warm_up_reviews,
+}
+
+
+def get_warm_up_status():
+	cache = frappe.cache()
+	status = super(RedisWrapper, cache).hgetall(cache.make_key(CACHE_WARM_UP_STATUS_KEY))
+	status = {frappe.safe_decode(key): flt(frappe.safe_decode(value)) for key, value in status.items()}
+
+	for key in ("total", "done", "failed"):
+		status[key] = cint(status.get(key))
+
+	return status
+
+
+@frappe.whitelist()
+def get_cache_warm_up_status():
+	"Progress and timing of the last catalog cache warm-up."
+	frappe.only_for("System Manager")
+
+	status = get_warm_up_status()
+	started_at, finished_at = status.get("started_at"), status.get("finished_at")
+
+	return {
+		"total": status["total"],
+		"done": status["done"],
+		"failed": status["failed"],
+		"running": bool(started_at) and not finished_at,
+		"duration": flt((finished_at or time.time()) - started_at, 2) if started_at else 0,
+		"time_per_kind": {
+			kind: {
+				"count": cint(status.get(f"{kind}_count")),
+				"seconds": flt(status.get(f"{kind}_time"), 2),
+			}
+			for kind in CACHE_WARMERS
+		},
+	}
@@ -0,0 +1,22 @@
+from webshop.webshop.product_data_engine.attribute_index import update_attribute_index
+
+
+def execute(doc, method=None, old_name=None, new_name=None, merge=False):
+    """Keep the attribute filter index in sync with the Item's variant attributes."""
+    attributes = get_attribute_values(doc)
+
+    if method == "after_rename":
+        update_attribute_index(old_name, attributes, {})
+        update_attribute_index(new_name, {}, attributes)
+    elif method == "on_trash":
+        update_attribute_index(doc.name, attributes, {})
+    else:
+        old_attributes = get_attribute_values(doc.get_doc_before_save())
+        update_attribute_index(doc.name, old_attributes, attributes)
+
+
+def get_attribute_values(doc):
+    if not doc:
+        return {}
+
+    return {d.attribute: d.attribute_value for d in doc.get("attributes") or [] if d.attribute_value}
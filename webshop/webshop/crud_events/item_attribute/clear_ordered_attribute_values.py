@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute(doc, method=None):
+    """Clear the cached sequence of attribute values used by the variant selector."""
+    frappe.cache().delete_value("ordered_attribute_values_map")
@@ -0,0 +1,8 @@
+from webshop.webshop.doctype.override_doctype.item_group import invalidate_item_group_tree
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
+
+
+def execute(doc, method=None, old_name=None, new_name=None, merge=False):
+    """Reload the Item Group tree snapshots and listings, which hold the old name."""
+    invalidate_item_group_tree()
+    invalidate_catalog_cache()
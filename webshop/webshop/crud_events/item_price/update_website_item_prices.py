@@ -0,0 +1,15 @@
+from webshop.webshop.doctype.website_item_price.website_item_price import (
+    enqueue_refresh_website_item_prices,
+)
+
+
+def execute(doc, method=None):
+    """Refresh effective price and discount of the Item in Website Item Price."""
+    item_codes = {doc.item_code}
+
+    # the price may have moved to another item
+    doc_before_save = doc.get_doc_before_save()
+    if doc_before_save:
+        item_codes.add(doc_before_save.item_code)
+
+    enqueue_refresh_website_item_prices(list(item_codes))
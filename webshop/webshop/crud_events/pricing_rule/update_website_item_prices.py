@@ -0,0 +1,26 @@
+from webshop.webshop.doctype.website_item_price.website_item_price import (
+    enqueue_refresh_website_item_prices,
+)
+
+
+def execute(doc, method=None):
+    """
+    Refresh Website Item Price for items affected by a selling Pricing Rule.
+    Rules on Item Groups, Brands, etc. can affect any item, refresh all in background.
+    """
+    doc_before_save = doc.get_doc_before_save()
+    if not (doc.selling or (doc_before_save and doc_before_save.selling)):
+        return
+
+    applied_on_items = doc.apply_on == "Item Code" and (
+        not doc_before_save or doc_before_save.apply_on == "Item Code"
+    )
+
+    if applied_on_items:
+        item_codes = {d.item_code for d in doc.items if d.item_code}
+        if doc_before_save:
+            item_codes.update(d.item_code for d in doc_before_save.items if d.item_code)
+
+        enqueue_refresh_website_item_prices(list(item_codes))
+    else:
+        enqueue_refresh_website_item_prices()
@@ -0,0 +1,6 @@
+from webshop.webshop.utils.product import clear_product_bundles_cache
+
+
+def execute(doc, method=None, old_name=None, new_name=None, merge=False):
+    """Clear the cached bundle components used for website stock."""
+    clear_product_bundles_cache()
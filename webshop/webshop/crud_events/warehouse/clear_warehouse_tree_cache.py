@@ -0,0 +1,6 @@
+from webshop.webshop.utils.product import clear_warehouse_tree_cache
+
+
+def execute(doc, method=None, old_name=None, new_name=None, merge=False):
+    """Clear the cached child warehouses used for website stock."""
+    clear_warehouse_tree_cache()
@@ -21,16 +21,62 @@ class UnverifiedReviewer(frappe.ValidationError):
 
 class ItemReview(Document):
 	def after_insert(self):
+		update_rating_summary(self.website_item, self.rating, 1)
+
 		# regenerate cache on review creation
 		reviews_dict = get_queried_reviews(self.website_item)
 		set_reviews_in_cache(self.website_item, reviews_dict)
 
+	def on_update(self):
+		previous = self.get_doc_before_save()
+		if not previous:
+			# inserted, counted in after_insert
+			return
+
+		# rating can be edited in desk
+		if flt(previous.rating) != flt(self.rating) or previous.website_item != self.website_item:
+			update_rating_summary(previous.website_item, previous.rating, -1)
+			update_rating_summary(self.website_item, self.rating, 1)
+
+		for web_item in {previous.website_item, self.website_item}:
+			set_reviews_in_cache(web_item, get_queried_reviews(web_item))
+
 	def after_delete(self):
+		update_rating_summary(self.website_item, self.rating, -1)
+
 		# regenerate cache on review deletion
 		reviews_dict = get_queried_reviews(self.website_item)
 		set_reviews_in_cache(self.website_item, reviews_dict)
 
 
+def get_star(rating):
+	"Star (1 to 5) of a `Rating` field value (0 to 1)."
+	return min(5, max(1, round(flt(rating) * 5)))
+
+
+def update_rating_summary(web_item, rating, change):
+	"""
+	Add (change=1) or remove (change=-1) a review in the rating summary of the Website Item.
+	The average is computed from the previous count, before `total_reviews` is updated.
+	"""
+	star_count = f"rating_{get_star(rating)}_count"
+
+	frappe.db.sql(  # nosemgrep
+		f"""
+		update `tabWebsite Item`
+		set
+			average_rating = case
+				when total_reviews + %(change)s > 0
+				then (average_rating * total_reviews + %(change)s * %(rating)s) / (total_reviews + %(change)s)
+				else 0 end,
+			total_reviews = greatest(total_reviews + %(change)s, 0),
+			{star_count} = greatest({star_count} + %(change)s, 0)
+		where name = %(web_item)s
+		""",
+		{"web_item": web_item, "rating": flt(rating) * 5, "change": change},
+	)
+
+
 @frappe.whitelist()
 def get_item_reviews(web_item, start=0, end=10, data=None):
 	"Get Website Item Review Data."
@@ -74,29 +120,62 @@ def get_queried_reviews(web_item, start=0, end=10, data=None):
 		limit_page_length=end,
 	)
 
-	rating_data = frappe.db.get_all(
-		"Item Review",
-		filters={"website_item": web_item},
-		fields=["avg(rating*5) as average, count(*) as total"],
-	)[0]
+	data.update(get_rating_summary(web_item))
 
-	data.average_rating = flt(rating_data.average, 5)
-	data.average_whole_rating = flt(data.average_rating, 0)
+	return data
+
+
+def get_rating_summary(web_item):
+	"""
+	Rating summary of the Website Item, kept up to date by Item Review hooks.
+	Returns:
+	        dict: average rating, % of reviews per rating (1 to 5 stars) and total reviews.
+	"""
+	fields = ["average_rating", "total_reviews"] + [f"rating_{i}_count" for i in range(1, 6)]
+	summary = frappe.db.get_value("Website Item", web_item, fields, as_dict=True) or frappe._dict()
+	total = cint(summary.total_reviews)
 
 	# get % of reviews per rating
 	reviews_per_rating = []
 	for i in range(1, 6):
-		count = frappe.db.get_all(
-			"Item Review", filters={"website_item": web_item, "rating": i/5}, fields=["count(*) as count"]
-		)[0].count
-
-		percent = flt((count / rating_data.total or 1) * 100, 0) if count else 0
+		count = cint(summary.get(f"rating_{i}_count"))
+		percent = flt((count / total or 1) * 100, 0) if count else 0
 		reviews_per_rating.append(percent)
 
-	data.reviews_per_rating = reviews_per_rating
-	data.total_reviews = rating_data.total
+	average_rating = flt(summary.average_rating, 5)
 
-	return data
+	return frappe._dict(
+		average_rating=average_rating,
+		average_whole_rating=flt(average_rating, 0),
+		reviews_per_rating=reviews_per_rating,
+		total_reviews=total,
+	)
+
+
+def update_all_rating_summaries():
+	"""Recompute the rating summary of every Website Item from its reviews."""
+	review = frappe.qb.DocType("Item Review")
+	rows = (
+		frappe.qb.from_(review)
+		.select(review.website_item, review.rating, frappe.query_builder.functions.Count("*"))
+		.groupby(review.website_item, review.rating)
+		.run()
+	)
+
+	summaries = {}
+	for web_item, rating, count in rows:
+		summary = summaries.setdefault(web_item, {f"rating_{i}_count": 0 for i in range(1, 6)})
+		summary[f"rating_{get_star(rating)}_count"] += count
+		summary["total_reviews"] = summary.get("total_reviews", 0) + count
+		summary["rating_sum"] = summary.get("rating_sum", 0) + flt(rating) * 5 * count
+
+	frappe.db.sql(  # nosemgrep
+		"""update `tabWebsite Item` set average_rating = 0, total_reviews = 0,
+		rating_1_count = 0, rating_2_count = 0, rating_3_count = 0, rating_4_count = 0, rating_5_count = 0"""
+	)
+	for web_item, summary in summaries.items():
+		summary["average_rating"] = summary.pop("rating_sum") / summary["total_reviews"]
+		frappe.db.set_value("Website Item", web_item, summary, update_modified=False)
 
 
 def set_reviews_in_cache(web_item, reviews_dict):
@@ -63,11 +63,21 @@ class TestItemReview(unittest.TestCase):
 		self.assertTrue(review_data.average_rating)
 		self.assertEqual(review_data.reviews_per_rating[0], 100)
 
+		# rating summary is kept on the Website Item
+		rating = frappe.db.get_value("Item Review", review_name, "rating")
+		summary = frappe.db.get_value(
+			"Website Item", web_item, ["total_reviews", "average_rating"], as_dict=True
+		)
+		self.assertEqual(summary.total_reviews, 1)
+		self.assertEqual(summary.average_rating, rating * 5)
+
 		# tear down
 		frappe.set_user("Administrator")
 		frappe.delete_doc("Item Review", review_name)
 		customer.delete()
 
+		self.assertEqual(frappe.db.get_value("Website Item", web_item, "total_reviews"), 0)
+
 	def test_add_item_review_from_non_customer(self):
 		"Check if logged in user (who is not a customer yet) is blocked from posting reviews."
 		web_item = frappe.db.get_value("Website Item", {"item_code": "Test Mobile Phone"})
@@ -3,6 +3,7 @@ from frappe import _
 from frappe.utils import get_link_to_form
 from erpnext.stock.doctype.item.item import Item
 from webshop.webshop.doctype.override_doctype.item_group import invalidate_cache_for
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
 
 class DataValidationError(frappe.ValidationError):
 	pass
@@ -48,4 +49,6 @@ def invalidate_cache_for_item(doc):
 	invalidate_cache_for(doc, doc.item_group)
 
 	if doc.get("old_item_group") and doc.get("old_item_group") != doc.item_group:
-		invalidate_cache_for(doc, doc.old_item_group)
\ No newline at end of file
+		invalidate_cache_for(doc, doc.old_item_group)
+
+	invalidate_catalog_cache()
\ No newline at end of file
@@ -1,3 +1,5 @@
+from bisect import bisect_left
+
 import frappe
 from frappe import _
 from urllib.parse import quote
@@ -5,7 +7,17 @@ from frappe.utils import get_url, cint
 from frappe.website.website_generator import WebsiteGenerator
 from erpnext.setup.doctype.item_group.item_group import ItemGroup
 from frappe.website.utils import clear_cache
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
 from webshop.webshop.product_data_engine.filters import ProductFiltersBuilder
+from webshop.webshop.redisearch_utils import (
+	delete_item_group_suggestion,
+	update_item_group_suggestion,
+)
+
+ITEM_GROUP_TREE_VERSION_KEY = "webshop_item_group_tree_version"
+
+# Item Group tree snapshot of each site, kept for the lifetime of the worker
+_item_group_trees = {}
 
 class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 	nsm_parent_field = "parent_item_group"
@@ -23,7 +35,11 @@ class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 
 	def on_update(self):
 		invalidate_cache_for(self)
+		invalidate_catalog_cache()
 		super(WebshopItemGroup, self).on_update()
+		# after the nested set bounds are updated
+		invalidate_item_group_tree()
+		update_item_group_suggestion(self)
 
 	def make_route(self):
 		"""Make website route"""
@@ -32,10 +48,10 @@ class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 
 		self.route = ""
 		if self.parent_item_group:
-			parent_item_group = frappe.get_doc("Item Group", self.parent_item_group)
+			parent_item_group = get_item_group_tree().get(self.parent_item_group)
 
 			# make parent route only if not root
-			if parent_item_group.parent_item_group and parent_item_group.route:
+			if parent_item_group and parent_item_group.parent_item_group and parent_item_group.route:
 				self.route = parent_item_group.route + "/"
 
 		self.route += self.scrub(self.item_group_name)
@@ -45,6 +61,9 @@ class WebshopItemGroup(ItemGroup, WebsiteGenerator):
 	def on_trash(self):
 		WebsiteGenerator.on_trash(self)
 		super(WebshopItemGroup, self).on_trash()
+		invalidate_item_group_tree()
+		invalidate_catalog_cache()
+		delete_item_group_suggestion(self.name)
 
 	def get_context(self, context):
 		context.show_search = True
@@ -121,15 +140,11 @@ def get_parent_item_groups(item_group_name, from_item=False):
 	if not item_group_name:
 		return base_parents
 
-	item_group = frappe.db.get_value("Item Group", item_group_name, ["lft", "rgt"], as_dict=1)
-	parent_groups = frappe.db.sql(
-		"""select name, route from `tabItem Group`
-		where lft <= %s and rgt >= %s
-		and show_in_website=1
-		order by lft asc""",
-		(item_group.lft, item_group.rgt),
-		as_dict=True,
-	)
+	parent_groups = [
+		frappe._dict(name=d.name, route=d.route)
+		for d in get_item_group_tree().get_ancestors(item_group_name)
+		if d.show_in_website
+	]
 
 	return base_parents + parent_groups
 
@@ -138,20 +153,88 @@ def invalidate_cache_for(doc, item_group=None):
 	if not item_group:
 		item_group = doc.name
 
-	for d in get_parent_item_groups(item_group):
-		item_group_name = frappe.db.get_value("Item Group", d.get("name"))
-		if item_group_name:
-			clear_cache(frappe.db.get_value("Item Group", item_group_name, "route"))
+	for d in get_item_group_tree().get_ancestors(item_group):
+		if d.show_in_website:
+			clear_cache(d.route)
 
 def get_child_groups_for_website(item_group_name, immediate=False, include_self=False):
 	"""Returns child item groups *excluding* passed group."""
-	item_group = frappe.get_cached_value("Item Group", item_group_name, ["lft", "rgt"], as_dict=1)
-	filters = {"lft": [">", item_group.lft], "rgt": ["<", item_group.rgt], "show_in_website": 1}
+	groups = get_item_group_tree().get_descendants(item_group_name, include_self=include_self)
 
 	if immediate:
-		filters["parent_item_group"] = item_group_name
+		groups = [d for d in groups if d.parent_item_group == item_group_name]
+
+	groups = [frappe._dict(name=d.name, route=d.route) for d in groups if d.show_in_website]
+	return sorted(groups, key=lambda d: d.name)
+
+
+class ItemGroupTree:
+	"""Nested set snapshot of Item Groups, answers tree lookups without the DB."""
+
+	def __init__(self, item_groups, version=None):
+		self.version = version
+		self.groups = sorted(item_groups, key=lambda d: d.lft)
+		self.group_map = {d.name: d for d in self.groups}
+		self.lfts = [d.lft for d in self.groups]
+
+	def get(self, item_group_name):
+		return self.group_map.get(item_group_name)
+
+	def get_ancestors(self, item_group_name):
+		"""Groups from the root down to and including `item_group_name`."""
+		ancestors = []
+		item_group = self.get(item_group_name)
+		while item_group:
+			ancestors.append(item_group)
+			item_group = self.get(item_group.parent_item_group)
+
+		return ancestors[::-1]
+
+	def get_descendants(self, item_group_name, include_self=False):
+		"""Groups under `item_group_name`, in tree (lft) order."""
+		item_group = self.get(item_group_name)
+		if not item_group:
+			return []
+
+		# descendants are the contiguous run of groups with lft inside (lft, rgt)
+		start = bisect_left(self.lfts, item_group.lft)
+		end = bisect_left(self.lfts, item_group.rgt)
+
+		return self.groups[start if include_self else start + 1 : end]
+
+
+def get_item_group_tree():
+	"""Item Group tree of the site, reloaded only when its version changes."""
+	version = get_item_group_tree_version()
+	tree = _item_group_trees.get(frappe.local.site)
+
+	if not tree or tree.version != version:
+		item_groups = frappe.get_all(
+			"Item Group",
+			fields=["name", "parent_item_group", "lft", "rgt", "route", "show_in_website"],
+			order_by="lft asc",
+		)
+		tree = ItemGroupTree(item_groups, version)
+		_item_group_trees[frappe.local.site] = tree
+
+	return tree
+
+
+def get_item_group_tree_version():
+	if getattr(frappe.local, "webshop_item_group_tree_version", None) is None:
+		version = frappe.cache().get(frappe.cache().make_key(ITEM_GROUP_TREE_VERSION_KEY))
+		frappe.local.webshop_item_group_tree_version = cint(version)
+
+	return frappe.local.webshop_item_group_tree_version
+
+
+def invalidate_item_group_tree():
+	"""Bump the tree version so that every worker reloads its snapshot."""
 
-	if include_self:
-		filters.update({"lft": [">=", item_group.lft], "rgt": ["<=", item_group.rgt]})
+	def bump_version():
+		frappe.cache().incr(frappe.cache().make_key(ITEM_GROUP_TREE_VERSION_KEY))
+		frappe.local.webshop_item_group_tree_version = None
 
-	return frappe.get_all("Item Group", filters=filters, fields=["name", "route"], order_by="name")
\ No newline at end of file
+	bump_version()
+	# other workers could reload the uncommitted tree in between, bump again once visible
+	frappe.db.after_commit.add(bump_version)
@@ -7,9 +7,10 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import comma_and, flt, unique
 
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
 from webshop.webshop.redisearch_utils import (
+	clear_search_capability_cache,
 	create_website_items_index,
-	define_autocomplete_dictionary,
 	get_indexable_web_fields,
 	is_search_module_loaded,
 )
@@ -50,7 +51,9 @@ class WebshopSettings(Document):
 		self.update_gift_cards_menu()
 
 	def after_save(self):
+		clear_search_capability_cache()
 		self.create_redisearch_indexes()
+		invalidate_catalog_cache()
 	
 	def update_gift_cards_menu(self):
 		"""Updates gift cards menu in Portal Settings based on enable_gift_cards"""
@@ -93,10 +96,9 @@ class WebshopSettings(Document):
 			frappe.db.commit()
 
 	def create_redisearch_indexes(self):
-		# if redisearch is enabled (value changed) create indexes and dictionary
+		# if redisearch is enabled (value changed) build indexes and dictionary in the background
 		value_changed = self.is_redisearch_enabled != self.is_redisearch_enabled_pre_save
 		if self.is_redisearch_loaded and self.is_redisearch_enabled and value_changed:
-			define_autocomplete_dictionary()
 			create_website_items_index()
 
 	@staticmethod
@@ -243,8 +245,12 @@ class WebshopSettings(Document):
 			old_fields = old_doc.search_index_fields
 			new_fields = self.search_index_fields
 
+			# filter fields are indexed as tags
+			old_filter_fields = [row.fieldname for row in old_doc.filter_fields]
+			new_filter_fields = [row.fieldname for row in self.filter_fields]
+
 			# if search index fields get changed
-			if not (new_fields == old_fields):
+			if not (new_fields == old_fields) or new_filter_fields != old_filter_fields:
 				create_website_items_index()
 
 	def update_gift_card_template(self):
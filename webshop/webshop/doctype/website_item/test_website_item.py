@@ -17,7 +17,10 @@ from webshop.webshop.doctype.website_item.website_item import make_website_item
 from webshop.webshop.shopping_cart.product_info import get_product_info_for_website
 from webshop.webshop.doctype.override_doctype.item import DataValidationError
 from erpnext.stock.doctype.item.test_item import make_item
-from webshop.webshop.doctype.override_doctype.item_group import get_parent_item_groups
+from webshop.webshop.doctype.override_doctype.item_group import (
+	get_parent_item_groups,
+	invalidate_item_group_tree,
+)
 
 WEBITEM_DESK_TESTS = ("test_website_item_desk_item_sync", "test_publish_variant_and_template")
 WEBITEM_PRICE_TESTS = (
@@ -192,6 +195,7 @@ class TestWebsiteItem(unittest.TestCase):
 
 		frappe.db.set_value("Item Group", "_Test Item Group B - 1", "show_in_website", 1)
 		frappe.db.set_value("Item Group", "_Test Item Group B", "show_in_website", 1)
+		invalidate_item_group_tree()
 
 		breadcrumbs = get_parent_item_groups(item.item_group)
 
@@ -385,6 +389,91 @@ class TestWebsiteItem(unittest.TestCase):
 		frappe.get_cached_doc("Website Item", {"item_code": "Test Mobile Phone"}).delete()
 		frappe.set_user(user)
 
+	def test_stock_for_items_in_group_warehouse(self):
+		"Check if stock of child warehouses is summed up when the website warehouse is a group."
+		from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+		from webshop.webshop.utils.product import get_stock_for_items
+
+		item_code = "Test Mobile Phone"
+		create_regular_web_item()
+		frappe.db.set_value(
+			"Website Item", {"item_code": item_code}, "website_warehouse", "All Warehouses - _TC"
+		)
+
+		stock_entries = [
+			make_stock_entry(item_code=item_code, target=warehouse, qty=2, rate=100)
+			for warehouse in ("_Test Warehouse - _TC", "_Test Warehouse 1 - _TC")
+		]
+
+		stock = get_stock_for_items([item_code, "Test Mobile Phone"], "website_warehouse")
+		self.assertEqual(list(stock), [item_code])
+		self.assertTrue(stock[item_code].in_stock)
+		self.assertEqual(stock[item_code].stock_qty, 4)
+
+		# tear down
+		for stock_entry in stock_entries:
+			stock_entry.cancel()
+		frappe.get_cached_doc("Website Item", {"item_code": item_code}).delete()
+
+	def test_product_bundle_stock(self):
+		"Check if the number of complete bundles in stock is computed from the components."
+		from erpnext.selling.doctype.product_bundle.test_product_bundle import make_product_bundle
+		from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+		from webshop.webshop.utils.product import get_bundle_stock, get_non_stock_item_status
+
+		bundle = make_item("_Test Web Bundle", {"is_stock_item": 0})
+		make_item("_Test Web Bundle Component", {"is_stock_item": 1})
+		make_product_bundle("_Test Web Bundle", ["_Test Web Bundle Component"], qty=2)
+
+		web_item = make_website_item(bundle, save=False)
+		web_item.website_warehouse = "_Test Warehouse - _TC"
+		web_item.save()
+
+		self.assertFalse(get_non_stock_item_status("_Test Web Bundle", "website_warehouse"))
+
+		stock_entry = make_stock_entry(
+			item_code="_Test Web Bundle Component", target="_Test Warehouse - _TC", qty=5, rate=100
+		)
+
+		bundle_stock = get_bundle_stock(["_Test Web Bundle"], "website_warehouse")
+		self.assertEqual(bundle_stock["_Test Web Bundle"].stock_qty, 2)
+		self.assertTrue(get_non_stock_item_status("_Test Web Bundle", "website_warehouse"))
+
+		# tear down
+		stock_entry.cancel()
+		web_item.delete()
+
+	def test_product_page_data_cache(self):
+		"Check if the catalog part of the product page is cached and cleared on save."
+		from webshop.webshop.doctype.website_item.website_item import PRODUCT_PAGE_CACHE_KEY
+
+		web_item = create_regular_web_item("Test Mobile Phone")
+		cache_key = f"{PRODUCT_PAGE_CACHE_KEY}:{web_item.route}"
+		context = frappe._dict(route=web_item.route, website_image=web_item.website_image)
+
+		page_data = web_item.get_page_data(context, get_shopping_cart_settings())
+		self.assertEqual(page_data.context.metatags.title, web_item.web_item_name)
+		self.assertEqual(frappe.cache().hget(cache_key, frappe.local.lang), page_data)
+
+		# pages are cached per language
+		lang = frappe.local.lang
+		try:
+			frappe.local.lang = "_test_lang"
+			self.assertIsNone(frappe.cache().hget(cache_key, frappe.local.lang))
+			web_item.get_page_data(context, get_shopping_cart_settings())
+		finally:
+			frappe.local.lang = lang
+
+		web_item.short_description = "Test Mobile Phone with a new description"
+		web_item.save()
+		self.assertIsNone(frappe.cache().hget(cache_key, lang))
+		self.assertIsNone(frappe.cache().hget(cache_key, "_test_lang"))
+
+		# tear down
+		web_item.delete()
+
 	def test_recommended_item(self):
 		"Check if added recommended items are fetched correctly."
 		item_code = "Test Mobile Phone"
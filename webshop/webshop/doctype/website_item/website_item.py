@@ -10,11 +10,19 @@ if TYPE_CHECKING:
 
 import frappe
 from frappe import _
-from frappe.utils import cint, cstr, flt, random_string
+from frappe.utils import cstr, random_string
 from frappe.website.doctype.website_slideshow.website_slideshow import get_slideshow
 from frappe.website.website_generator import WebsiteGenerator
 
 from webshop.webshop.doctype.item_review.item_review import get_item_reviews
+from webshop.webshop.doctype.website_item_price.website_item_price import (
+    enqueue_refresh_website_item_prices,
+)
+from webshop.webshop.product_data_engine.cache import (
+    get_catalog_version,
+    invalidate_catalog_cache,
+)
+from webshop.webshop.product_data_engine.search import add_fulltext_index
 from webshop.webshop.redisearch_utils import (
     delete_item_from_index,
     insert_item_to_index,
@@ -32,6 +40,12 @@ from webshop.webshop.variant_selector.item_variants_cache import (
     ItemVariantsCacheManager,
 )
 
+# {language: page data} per route, pages render labels in the visitor's language
+PRODUCT_PAGE_CACHE_KEY = "website_item_page_by_language"
+
+# slideshows can change without a catalog change, bound their staleness
+PRODUCT_PAGE_CACHE_TTL = 3600
+
 
 class WebsiteItem(WebsiteGenerator):
 	website = frappe._dict(
@@ -81,11 +95,13 @@ class WebsiteItem(WebsiteGenerator):
 	def on_update(self):
 		invalidate_cache_for_web_item(self)
 		self.update_template_item()
+		enqueue_refresh_website_item_prices([self.item_code])
 
 	def on_trash(self):
 		super(WebsiteItem, self).on_trash()
 		delete_item_from_index(self)
 		self.publish_unpublish_desk_item(publish=False)
+		invalidate_catalog_cache()
 
 	def validate_duplicate_website_item(self):
 		existing_web_item = frappe.db.exists(
@@ -234,21 +250,15 @@ class WebsiteItem(WebsiteGenerator):
 		context.parents = get_parent_item_groups(
 			self.item_group, from_item=True
 		)  # breadcumbs
-		self.attributes = frappe.get_all(
-			"Item Variant Attribute",
-			fields=["attribute", "attribute_value"],
-			filters={"parent": self.item_code},
-		)
 
-		if self.slideshow:
-			context.update(get_slideshow(self))
-
-		self.set_metatags(context)
 		self.set_shopping_cart_data(context)
 
 		settings = context.shopping_cart.cart_settings
 
-		self.get_product_details_section(context)
+		# catalog data, same for every visitor
+		page_data = self.get_page_data(context, settings)
+		self.attributes = page_data.attributes
+		context.update(page_data.context)
 
 		if settings.get("enable_reviews"):
 			reviews_data = get_item_reviews(self.name)
@@ -265,8 +275,10 @@ class WebsiteItem(WebsiteGenerator):
 		context.user_is_customer = check_if_user_is_customer()
 
 		context.recommended_items = None
-		if settings and settings.enable_recommendations:
-			context.recommended_items = self.get_recommended_items(settings)
+		if page_data.recommended_items is not None:
+			context.recommended_items = self.set_recommended_item_prices(
+				[frappe._dict(item) for item in page_data.recommended_items], settings
+			)
 
 		from webshop.webshop.shopping_cart.guest_cart import check_and_merge_guest_cart
 
@@ -275,51 +287,45 @@ class WebsiteItem(WebsiteGenerator):
 		
 		return context
 
-	def set_selected_attributes(self, variants, context, attribute_values_available):
-		for variant in variants:
-			variant.attributes = frappe.get_all(
-				"Item Variant Attribute",
-				filters={"parent": variant.name},
-				fields=["attribute", "attribute_value as value"],
-			)
+	def get_page_data(self, context, settings):
+		"""
+		Product page context that depends only on catalog data, cached per route and language.
+		User specific data (cart, prices, wishlist) is added on top by `get_context`.
+		"""
+		cache_key = f"{PRODUCT_PAGE_CACHE_KEY}:{self.route}"
+		catalog_version = get_catalog_version()
 
-			# make an attribute-value map for easier access in templates
-			variant.attribute_map = frappe._dict(
-				{attr.attribute: attr.value for attr in variant.attributes}
-			)
+		page_data = frappe.cache().hget(cache_key, frappe.local.lang)
+		if page_data and page_data.catalog_version == catalog_version:
+			return page_data
 
-			for attr in variant.attributes:
-				values = attribute_values_available.setdefault(attr.attribute, [])
-				if attr.value not in values:
-					values.append(attr.value)
+		page_context = frappe._dict(route=context.route, website_image=context.website_image)
 
-				if variant.name == context.variant.name:
-					context.selected_attributes[attr.attribute] = attr.value
+		if self.slideshow:
+			slideshow = get_slideshow(self)
+			slideshow["slides"] = [slide.as_dict() for slide in slideshow.get("slides") or []]
+			page_context.update(slideshow)
 
-	def set_attribute_values(self, attributes, context, attribute_values_available):
-		for attr in attributes:
-			values = context.attribute_values.setdefault(attr.attribute, [])
+		self.set_metatags(page_context)
+		self.get_product_details_section(page_context)
 
-			if cint(
-				frappe.db.get_value("Item Attribute", attr.attribute, "numeric_values")
-			):
-				for val in sorted(
-					attribute_values_available.get(attr.attribute, []), key=flt
-				):
-					values.append(val)
-			else:
-				# get list of values defined (for sequence)
-				for attr_value in frappe.db.get_all(
-					"Item Attribute Value",
-					fields=["attribute_value"],
-					filters={"parent": attr.attribute},
-					order_by="idx asc",
-				):
-
-					if attr_value.attribute_value in attribute_values_available.get(
-						attr.attribute, []
-					):
-						values.append(attr_value.attribute_value)
+		page_data = frappe._dict(
+			catalog_version=catalog_version,
+			context=page_context,
+			attributes=frappe.get_all(
+				"Item Variant Attribute",
+				fields=["attribute", "attribute_value"],
+				filters={"parent": self.item_code},
+			),
+			recommended_items=(
+				self.query_recommended_items() if settings and settings.enable_recommendations else None
+			),
+		)
+
+		cache = frappe.cache()
+		cache.hset(cache_key, frappe.local.lang, page_data)
+		cache.expire(cache.make_key(cache_key), PRODUCT_PAGE_CACHE_TTL)
+		return page_data
 
 	def set_metatags(self, context):
 		context.metatags = frappe._dict({})
@@ -389,6 +395,9 @@ class WebsiteItem(WebsiteGenerator):
 		return tab_values
 
 	def get_recommended_items(self, settings):
+		return self.set_recommended_item_prices(self.query_recommended_items(), settings)
+
+	def query_recommended_items(self):
 		ri = frappe.qb.DocType("Recommended Items")
 		wi = frappe.qb.DocType("Website Item")
 
@@ -402,8 +411,9 @@ class WebsiteItem(WebsiteGenerator):
 			.where((ri.parent == self.name) & (wi.published == 1))
 			.orderby(ri.idx)
 		)
-		items = query.run(as_dict=True)
+		return query.run(as_dict=True)
 
+	def set_recommended_item_prices(self, items, settings):
 		if settings.show_price:
 			is_guest = frappe.session.user == "Guest"
 			# Show Price if logged in.
@@ -457,6 +467,7 @@ def invalidate_cache_for_web_item(doc):
 		doc (Item): document against which cache should be cleared
 	"""
 	invalidate_cache_for(doc, doc.item_group)
+	clear_product_page_cache(doc)
 
 	website_item_groups = list(
 		set(
@@ -476,11 +487,21 @@ def invalidate_cache_for_web_item(doc):
 	update_index_for_item(doc)
 
 	invalidate_item_variants_cache_for_website(doc)
+	invalidate_catalog_cache()
+
+
+def clear_product_page_cache(doc):
+	"""Drop the cached catalog part of the product page of `doc`, in every language."""
+	if doc.get("route"):
+		frappe.cache().delete_value(f"{PRODUCT_PAGE_CACHE_KEY}:{doc.route}")
 
 
 def on_doctype_update():
 	# since route is a Text column, it needs a length for indexing
 	frappe.db.add_index("Website Item", ["route(500)"])
+	# keyset pagination of listings seeks on (ranking, name)
+	frappe.db.add_index("Website Item", ["ranking", "name"])
+	add_fulltext_index()
 
 
 def check_if_user_is_customer(user=None):
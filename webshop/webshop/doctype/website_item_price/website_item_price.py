@@ -0,0 +1,233 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import flt, now
+
+from erpnext.utilities.product import get_price
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
+
+# an Item is refreshed by the queued job, further changes until it starts are coalesced
+REFRESH_PENDING_KEY = "website_item_price_refresh_pending"
+REFRESH_PENDING_TIMEOUT = 60 * 60
+
+
+class WebsiteItemPrice(Document):
+	pass
+
+
+def refresh_website_item_prices(item_codes=None, price_lists=None):
+	"""
+	Recompute list rate, effective rate and discount of published Website Items
+	per selling Price List, so that listings can filter and price items in SQL.
+
+	Args:
+	        item_codes (list, optional): Items to refresh. Variants of these items are included.
+	        price_lists (list, optional): Price Lists to refresh.
+	"""
+	if item_codes is not None and not item_codes:
+		return
+
+	settings = frappe.get_cached_doc("Webshop Settings")
+
+	if item_codes:
+		item_codes = list(set(item_codes))
+		item_codes += frappe.get_all("Item", filters={"variant_of": ["in", item_codes]}, pluck="name")
+
+	price_list_filters = {"selling": 1, "enabled": 1}
+	if price_lists:
+		price_list_filters["name"] = ["in", price_lists]
+	valid_price_lists = frappe.get_all("Price List", filters=price_list_filters, pluck="name")
+
+	web_item_filters = {"published": 1}
+	if item_codes:
+		web_item_filters["item_code"] = ["in", item_codes]
+	web_items = frappe.get_all("Website Item", filters=web_item_filters, fields=["item_code", "variant_of"])
+
+	item_price_map = {}
+	if web_items and valid_price_lists:
+		item_price_filters = {"price_list": ["in", valid_price_lists]}
+		if item_codes:
+			templates = {d.variant_of for d in web_items if d.variant_of}
+			item_price_filters["item_code"] = ["in", list(set(item_codes) | templates)]
+
+		for row in frappe.get_all(
+			"Item Price",
+			filters=item_price_filters,
+			fields=["item_code", "price_list", "price_list_rate"],
+		):
+			item_price_map.setdefault((row.item_code, row.price_list), flt(row.price_list_rate))
+
+	timestamp = now()
+	values = []
+	for web_item in web_items:
+		for price_list in valid_price_lists:
+			list_rate = item_price_map.get((web_item.item_code, price_list))
+			if list_rate is None:
+				list_rate = item_price_map.get((web_item.variant_of, price_list))
+			if list_rate is None:
+				continue
+
+			price = get_price(
+				web_item.item_code,
+				price_list,
+				settings.default_customer_group,
+				settings.company,
+			)
+			effective_rate = flt(price.price_list_rate) if price else list_rate
+
+			discount_percent = flt(price.get("discount_percent")) if price else 0
+			discount_rate = 0
+			if not discount_percent and list_rate and effective_rate < list_rate:
+				# discount via rate based pricing rules
+				discount_rate = list_rate - effective_rate
+				discount_percent = flt(discount_rate / list_rate * 100, 2)
+
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					web_item.item_code,
+					price_list,
+					list_rate,
+					effective_rate,
+					discount_percent,
+					discount_rate,
+					timestamp,
+					timestamp,
+					"Administrator",
+					"Administrator",
+				)
+			)
+
+	delete_filters = {}
+	if item_codes:
+		delete_filters["item_code"] = ["in", item_codes]
+	if price_lists:
+		delete_filters["price_list"] = ["in", price_lists]
+	frappe.db.delete("Website Item Price", delete_filters)
+
+	if values:
+		frappe.db.bulk_insert(
+			"Website Item Price",
+			fields=[
+				"name",
+				"item_code",
+				"price_list",
+				"price_list_rate",
+				"effective_rate",
+				"discount_percent",
+				"discount_rate",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+			],
+			values=values,
+		)
+
+	invalidate_catalog_cache()
+
+
+def refresh_all_website_item_prices():
+	"""Scheduled full refresh, applies Pricing Rules that became (in)valid by date."""
+	refresh_website_item_prices()
+
+
+def enqueue_refresh_website_item_prices(item_codes=None):
+	"""
+	Queue a refresh of `item_codes` (all items if not set) once the transaction
+	is committed. Items already waiting for a refresh are left to the queued job.
+	"""
+	if item_codes is None:
+		frappe.enqueue(
+			"webshop.webshop.doctype.website_item_price.website_item_price.refresh_website_item_prices",
+			queue="long",
+			enqueue_after_commit=True,
+			now=frappe.flags.in_test,
+		)
+		return
+
+	if getattr(frappe.local, "website_item_price_refreshes", None) is None:
+		frappe.local.website_item_price_refreshes = set()
+		frappe.db.after_commit.add(flush_website_item_price_refreshes)
+		frappe.db.after_rollback.add(discard_website_item_price_refreshes)
+
+	frappe.local.website_item_price_refreshes.update(item_codes)
+
+	if frappe.flags.in_test:
+		# tests do not commit
+		flush_website_item_price_refreshes()
+
+
+def flush_website_item_price_refreshes():
+	item_codes = list(frappe.local.website_item_price_refreshes or [])
+	frappe.local.website_item_price_refreshes = None
+	if not item_codes:
+		return
+
+	pipeline = frappe.cache().pipeline(transaction=False)
+	for item_code in item_codes:
+		pipeline.set(get_refresh_pending_key(item_code), 1, nx=True, ex=REFRESH_PENDING_TIMEOUT)
+
+	pending = [item_code for item_code, is_new in zip(item_codes, pipeline.execute()) if is_new]
+	if not pending:
+		return
+
+	frappe.enqueue(
+		"webshop.webshop.doctype.website_item_price.website_item_price.refresh_pending_website_item_prices",
+		queue="long",
+		item_codes=pending,
+		now=frappe.flags.in_test,
+	)
+
+
+def discard_website_item_price_refreshes():
+	frappe.local.website_item_price_refreshes = None
+
+
+def refresh_pending_website_item_prices(item_codes):
+	# changes from now on need another refresh
+	frappe.cache().delete(*[get_refresh_pending_key(item_code) for item_code in item_codes])
+	refresh_website_item_prices(item_codes)
+
+
+def get_refresh_pending_key(item_code):
+	return frappe.cache().make_key(f"{REFRESH_PENDING_KEY}:{item_code}")
+
+
+def get_discounted_items(price_list, max_discount):
+	"""Items with a discount of at most `max_discount` percent in `price_list`."""
+	return frappe.get_all(
+		"Website Item Price",
+		filters=[
+			["price_list", "=", price_list],
+			["discount_percent", ">", 0],
+			["discount_percent", "<=", flt(max_discount)],
+		],
+		pluck="item_code",
+	)
+
+
+def get_discount_range(price_list):
+	"""Return [min, max] discount percent of published Website Items in `price_list`."""
+	wip = frappe.qb.DocType("Website Item Price")
+	wi = frappe.qb.DocType("Website Item")
+
+	result = (
+		frappe.qb.from_(wip)
+		.join(wi)
+		.on(wi.item_code == wip.item_code)
+		.select(frappe.query_builder.functions.Min(wip.discount_percent))
+		.select(frappe.query_builder.functions.Max(wip.discount_percent))
+		.where((wip.price_list == price_list) & (wip.discount_percent > 0) & (wi.published == 1))
+	).run()
+
+	if not result or result[0][0] is None:
+		return []
+
+	return [flt(result[0][0]), flt(result[0][1])]
+
+
+def on_doctype_update():
+	frappe.db.add_index("Website Item Price", ["price_list", "discount_percent"])
@@ -0,0 +1,211 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import hashlib
+import time
+
+import frappe
+from frappe.utils.redis_wrapper import RedisWrapper
+
+# {attribute: time the index was built}, an attribute is indexed only if present
+ATTRIBUTE_INDEX_KEY = "item_attribute_value_index"
+
+# intersections for attribute filters, recomputed on each listing request
+ATTRIBUTE_FILTER_TTL = 60
+
+
+def store_items_with_attribute_values(attributes):
+	"""
+	Intersect in Redis the Items that have any of the given values of each attribute.
+	Args:
+	        attributes (dict): {attribute: list of values}
+	Returns:
+	        tuple: key of the set of item codes, kept for `ATTRIBUTE_FILTER_TTL` seconds,
+	                and its size
+	"""
+	for attribute in attributes:
+		if not is_attribute_indexed(attribute):
+			build_attribute_index(attribute)
+
+	cache = frappe.cache()
+	digest = hashlib.sha1(
+		frappe.as_json({attribute: sorted(values) for attribute, values in attributes.items()}).encode()
+	).hexdigest()
+	items_key = cache.make_key(f"{ATTRIBUTE_INDEX_KEY}:filter:{digest}")
+
+	union_keys = []
+	pipeline = cache.pipeline()
+	for attribute, values in attributes.items():
+		union_key = f"{items_key}:{len(union_keys)}"
+		union_keys.append(union_key)
+
+		value_keys = [get_value_key(attribute, value) for value in values]
+		if value_keys:
+			pipeline.sunionstore(union_key, value_keys)
+		else:
+			# no value selected, matches nothing
+			pipeline.delete(union_key)
+
+	pipeline.sinterstore(items_key, union_keys)
+	pipeline.expire(items_key, ATTRIBUTE_FILTER_TTL)
+	pipeline.delete(*union_keys)
+	pipeline.scard(items_key)
+
+	return items_key, pipeline.execute()[-1]
+
+
+def get_stored_items(items_key):
+	"""Return item codes of a set made by `store_items_with_attribute_values`."""
+	cache = frappe.cache()
+	return [frappe.safe_decode(item_code) for item_code in super(RedisWrapper, cache).smembers(items_key)]
+
+
+def are_items_stored(items_key, item_codes):
+	"""Return whether each of `item_codes` is in a set made by `store_items_with_attribute_values`."""
+	pipeline = frappe.cache().pipeline(transaction=False)
+	for item_code in item_codes:
+		pipeline.sismember(items_key, item_code)
+
+	return [bool(is_member) for is_member in pipeline.execute()]
+
+
+def get_attribute_index(attribute):
+	"""
+	Inverted index of an Item Attribute, built once and kept up to date on Item changes.
+	Returns:
+	        dict: {attribute_value: set of item codes}
+	"""
+	if not is_attribute_indexed(attribute):
+		return build_attribute_index(attribute)
+
+	values = get_indexed_values(attribute)
+	cache = frappe.cache()
+
+	pipeline = cache.pipeline(transaction=False)
+	for value in values:
+		pipeline.smembers(get_value_key(attribute, value))
+
+	index = {}
+	for value, item_codes in zip(values, pipeline.execute()):
+		if item_codes:
+			index[value] = {frappe.safe_decode(item_code) for item_code in item_codes}
+
+	return index
+
+
+def build_attribute_index(attribute):
+	"""Replace the index of `attribute` with one set of item codes per value, read from the DB."""
+	rows = frappe.get_all(
+		"Item Variant Attribute",
+		filters={"parenttype": "Item", "attribute": attribute, "attribute_value": ["is", "set"]},
+		fields=["parent", "attribute_value"],
+	)
+
+	index = {}
+	for row in rows:
+		index.setdefault(row.attribute_value, set()).add(row.parent)
+
+	cache = frappe.cache()
+	values_key = get_values_key(attribute)
+	old_values = get_indexed_values(attribute)
+
+	# readers see either the old or the new index
+	pipeline = cache.pipeline()
+	pipeline.delete(values_key, *[get_value_key(attribute, value) for value in old_values])
+	for value, item_codes in index.items():
+		pipeline.sadd(get_value_key(attribute, value), *item_codes)
+		pipeline.sadd(values_key, value)
+	pipeline.hset(cache.make_key(ATTRIBUTE_INDEX_KEY), attribute, time.time())
+	pipeline.execute()
+
+	return index
+
+
+def rebuild_attribute_indexes():
+	"""
+	Scheduled rebuild of every built index, drops drift that incremental
+	updates could not see (eg. rows changed by SQL).
+	"""
+	cache = frappe.cache()
+	for attribute in super(RedisWrapper, cache).hkeys(cache.make_key(ATTRIBUTE_INDEX_KEY)):
+		build_attribute_index(frappe.safe_decode(attribute))
+
+
+def is_attribute_indexed(attribute):
+	cache = frappe.cache()
+	return super(RedisWrapper, cache).hexists(cache.make_key(ATTRIBUTE_INDEX_KEY), attribute)
+
+
+def get_indexed_values(attribute):
+	cache = frappe.cache()
+	return [
+		frappe.safe_decode(value)
+		for value in super(RedisWrapper, cache).smembers(get_values_key(attribute))
+	]
+
+
+def get_values_key(attribute):
+	return frappe.cache().make_key(f"{ATTRIBUTE_INDEX_KEY}:{attribute}")
+
+
+def get_value_key(attribute, value):
+	return frappe.cache().make_key(f"{ATTRIBUTE_INDEX_KEY}:{attribute}:{value}")
+
+
+def update_attribute_index(item_code, old_attributes, new_attributes):
+	"""
+	Move `item_code` between attribute values in the indexes once the
+	transaction is committed.
+	Args:
+	        old_attributes (dict): {attribute: value} before the change
+	        new_attributes (dict): {attribute: value} after the change
+	"""
+	changes = []
+	for attribute in set(old_attributes) | set(new_attributes):
+		old_value, new_value = old_attributes.get(attribute), new_attributes.get(attribute)
+		if old_value != new_value:
+			changes.append((item_code, attribute, old_value, new_value))
+
+	if not changes:
+		return
+
+	if getattr(frappe.local, "attribute_index_updates", None) is None:
+		frappe.local.attribute_index_updates = []
+		frappe.db.after_commit.add(apply_attribute_index_updates)
+		frappe.db.after_rollback.add(discard_attribute_index_updates)
+
+	frappe.local.attribute_index_updates.extend(changes)
+
+	if frappe.flags.in_test:
+		# tests do not commit
+		apply_attribute_index_updates()
+
+
+def apply_attribute_index_updates():
+	changes = frappe.local.attribute_index_updates or []
+	frappe.local.attribute_index_updates = None
+
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	for item_code, attribute, old_value, new_value in changes:
+		if not is_attribute_indexed(attribute):
+			# not built yet, will be built on first use
+			continue
+
+		if old_value:
+			pipeline.srem(get_value_key(attribute, old_value), item_code)
+		if new_value:
+			pipeline.sadd(get_value_key(attribute, new_value), item_code)
+			pipeline.sadd(get_values_key(attribute), new_value)
+
+	pipeline.execute()
+
+
+def discard_attribute_index_updates():
+	frappe.local.attribute_index_updates = None
+
+
+def clear_attribute_index():
+	cache = frappe.cache()
+	for key in cache.scan_iter(match=cache.make_key(f"{ATTRIBUTE_INDEX_KEY}*")):
+		cache.delete(key)
@@ -0,0 +1,104 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe.utils import cint
+from frappe.utils.redis_wrapper import RedisWrapper
+
+CATALOG_VERSION_KEY = "webshop_catalog_version"
+PRODUCT_LISTING_CACHE_KEY = "product_listing"
+PRODUCT_LISTING_STATS_KEY = "product_listing_cache_stats"
+
+# stock availability is not versioned, bound its staleness
+PRODUCT_LISTING_CACHE_TTL = 600
+
+
+def get_catalog_version():
+	"""Version stamp of the catalog, bumped whenever listed data changes."""
+	if getattr(frappe.local, "webshop_catalog_version", None) is None:
+		version = frappe.cache().get(frappe.cache().make_key(CATALOG_VERSION_KEY))
+		frappe.local.webshop_catalog_version = cint(version)
+
+	return frappe.local.webshop_catalog_version
+
+
+def invalidate_catalog_cache():
+	"""Bump the catalog version, invalidating all caches keyed on it."""
+	frappe.cache().incr(frappe.cache().make_key(CATALOG_VERSION_KEY))
+	frappe.local.webshop_catalog_version = None
+
+
+def get_product_listing_cache_key(query_args, price_list=None, customer_group=None, party=None):
+	"""Key for a listing response from normalized query args and pricing context."""
+	args = {
+		"search": (query_args.get("search") or "").strip(),
+		"field_filters": normalize_filters(query_args.get("field_filters")),
+		"attribute_filters": normalize_filters(query_args.get("attribute_filters")),
+		"item_group": query_args.get("item_group"),
+		"start": cint(query_args.get("start")),
+		"cursor": query_args.get("cursor"),
+		"sort_by": query_args.get("sort_by"),
+		"price_list": price_list,
+		"customer_group": customer_group,
+		"party": party,
+	}
+	digest = hashlib.md5(json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()
+
+	return f"{PRODUCT_LISTING_CACHE_KEY}:{get_catalog_version()}:{digest}"
+
+
+def normalize_filters(filters):
+	normalized = {}
+	for key, values in (filters or {}).items():
+		if not values:
+			continue
+
+		if not isinstance(values, list):
+			values = [values]
+
+		normalized[key] = sorted(str(value) for value in values)
+
+	return normalized
+
+
+def get_cached_product_listing(key):
+	response = frappe.cache().get_value(key)
+	update_product_listing_stats("misses" if response is None else "hits")
+
+	return response
+
+
+def set_cached_product_listing(key, response):
+	"""Cache a listing response without the details of the current user."""
+	user_fields = ("in_cart", "wished")
+	items = [
+		frappe._dict({key: value for key, value in item.items() if key not in user_fields})
+		for item in response["items"]
+	]
+
+	frappe.cache().set_value(
+		key, {**response, "items": items}, expires_in_sec=PRODUCT_LISTING_CACHE_TTL
+	)
+
+
+def update_product_listing_stats(counter):
+	frappe.cache().hincrby(frappe.cache().make_key(PRODUCT_LISTING_STATS_KEY), counter, 1)
+
+
+@frappe.whitelist()
+def get_product_listing_cache_stats():
+	"Hit/miss counters of the product listing cache."
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	stats = super(RedisWrapper, cache).hgetall(cache.make_key(PRODUCT_LISTING_STATS_KEY))
+	stats = {frappe.safe_decode(key): cint(value) for key, value in stats.items()}
+
+	return {
+		"hits": stats.get("hits", 0),
+		"misses": stats.get("misses", 0),
+		"catalog_version": get_catalog_version(),
+	}
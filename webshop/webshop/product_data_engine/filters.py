@@ -3,6 +3,22 @@
 import frappe
 from frappe.utils import floor
 
+from webshop.webshop.product_data_engine.attribute_index import get_attribute_index
+from webshop.webshop.product_data_engine.cache import get_catalog_version
+
+FIELD_FACETS_CACHE_KEY = "webshop_field_facets"
+
+# link doctypes (eg. Brand) can be hidden from website without a catalog change
+FIELD_FACETS_CACHE_TTL = 3600
+
+ATTRIBUTE_FACETS_CACHE_KEY = "webshop_attribute_facets"
+
+# the attribute index is updated after commit, bound a race with the version bump
+ATTRIBUTE_FACETS_CACHE_TTL = 3600
+
+PUBLISHED_ITEMS_CACHE_KEY = "webshop_published_items"
+PUBLISHED_ITEMS_CACHE_TTL = 86400
+
 
 class ProductFiltersBuilder:
 	def __init__(self, item_group=None):
@@ -14,12 +30,9 @@ class ProductFiltersBuilder:
 		self.item_group = item_group
 
 	def get_field_filters(self):
-		from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
-
 		if not self.item_group and not self.doc.enable_field_filters:
 			return
 
-		fields, filter_data = [], []
 		filter_fields = [row.fieldname for row in self.doc.filter_fields]  # fields in settings
 
 		# filter valid field filters i.e. those that exist in Website Item
@@ -28,57 +41,115 @@ class ProductFiltersBuilder:
 			web_item_meta.get_field(field) for field in filter_fields if web_item_meta.has_field(field)
 		]
 
+		facets = self.get_field_facets(fields) if fields else {}
+
+		filter_data = []
+		for df in fields:
+			values, counts = facets.get(df.fieldname) or ([], {})
+			if values:
+				filter_data.append([df, values, counts])
+
+		return filter_data
+
+	def get_field_facets(self, fields):
+		"""
+		Values of filter fields with the number of published items per value.
+		Cached per item group until the catalog changes.
+		Returns:
+		        dict: {fieldname: (values, {value: count})}
+		"""
+		cache_key = f"{FIELD_FACETS_CACHE_KEY}:{get_catalog_version()}:{self.item_group or ''}"
+		facets = frappe.cache().get_value(cache_key)
+		if facets is not None:
+			return facets
+
+		value_counts = self.get_field_value_counts(fields)
+
+		facets = {}
 		for df in fields:
-			item_filters, item_or_filters = {"published": 1}, []
 			link_doctype_values = self.get_filtered_link_doctype_records(df)
+			counts = value_counts.get(df.fieldname, {})
 
 			if df.fieldtype == "Link":
-				if self.item_group:
-					include_child = frappe.db.get_value("Item Group", self.item_group, "include_descendants")
-					if include_child:
-						include_groups = get_child_groups_for_website(self.item_group, include_self=True)
-						include_groups = [x.name for x in include_groups]
-						item_or_filters.extend(
-							[
-								["item_group", "in", include_groups],
-								["Website Item Group", "item_group", "=", self.item_group],  # consider website item groups
-							]
-						)
-					else:
-						item_or_filters.extend(
-							[
-								["item_group", "=", self.item_group],
-								["Website Item Group", "item_group", "=", self.item_group],  # consider website item groups
-							]
-						)
-
-				# exclude variants if mentioned in settings
-				if frappe.db.get_single_value("Webshop Settings", "hide_variants"):
-					item_filters["variant_of"] = ["is", "not set"]
-
-				# Get link field values attached to published items
-				item_values = frappe.get_all(
-					"Website Item",
-					fields=[df.fieldname],
-					filters=item_filters,
-					or_filters=item_or_filters,
-					distinct="True",
-					pluck=df.fieldname,
-				)
-
-				values = list(set(item_values) & link_doctype_values)  # intersection of both
+				# values attached to published items
+				values = [value for value in counts if value in link_doctype_values]
 			else:
 				# table multiselect
 				values = list(link_doctype_values)
 
-			# Remove None
-			if None in values:
-				values.remove(None)
+			values = sorted(value for value in values if value is not None)
+			facets[df.fieldname] = (values, {value: counts.get(value, 0) for value in values})
 
-			if values:
-				filter_data.append([df, values])
+		frappe.cache().set_value(cache_key, facets, expires_in_sec=FIELD_FACETS_CACHE_TTL)
+		return facets
 
-		return filter_data
+	def get_field_value_counts(self, fields):
+		"""Count published items per value of every filter field in a single grouped query."""
+		conditions, join, params = self.get_published_item_conditions()
+
+		queries = []
+		for df in fields:
+			fieldname = frappe.db.escape(df.fieldname)
+
+			if df.fieldtype == "Link":
+				queries.append(
+					f"""select {fieldname} as field, wi.`{df.fieldname}` as value,
+						count(distinct wi.name) as count
+					from `tabWebsite Item` wi {join}
+					where {conditions}
+					group by wi.`{df.fieldname}`"""
+				)
+			elif df.fieldtype == "Table MultiSelect":
+				child_meta = frappe.get_meta(df.options, cached=True)
+				if not child_meta.get("fields"):
+					continue
+
+				link_field = child_meta.get("fields")[0].fieldname
+				queries.append(
+					f"""select {fieldname} as field, child.`{link_field}` as value,
+						count(distinct wi.name) as count
+					from `tabWebsite Item` wi {join}
+					inner join `tab{df.options}` child
+						on child.parent = wi.name
+						and child.parenttype = 'Website Item'
+						and child.parentfield = {fieldname}
+					where {conditions}
+					group by child.`{link_field}`"""
+				)
+
+		value_counts = {}
+		if not queries:
+			return value_counts
+
+		for row in frappe.db.sql(" union all ".join(queries), params, as_dict=True):  # nosemgrep
+			value_counts.setdefault(row.field, {})[row.value] = row.count
+
+		return value_counts
+
+	def get_published_item_conditions(self):
+		"""Conditions for published Website Items in the current item group (if any)."""
+		from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
+
+		conditions, join, params = ["wi.published = 1"], "", {}
+
+		# exclude variants if mentioned in settings
+		if frappe.get_cached_doc("Webshop Settings").hide_variants:
+			conditions.append("ifnull(wi.variant_of, '') = ''")
+
+		if self.item_group:
+			item_groups = [self.item_group]
+			if self.doc.include_descendants:
+				item_groups = [
+					x.name for x in get_child_groups_for_website(self.item_group, include_self=True)
+				] or item_groups
+
+			# consider website item groups
+			join = """left join `tabWebsite Item Group` wig
+				on wig.parent = wi.name and wig.parenttype = 'Website Item'"""
+			conditions.append("(wi.item_group in %(item_groups)s or wig.item_group = %(item_group)s)")
+			params.update({"item_groups": tuple(item_groups), "item_group": self.item_group})
+
+		return " and ".join(conditions), join, params
 
 	def get_filtered_link_doctype_records(self, field):
 		"""
@@ -119,25 +190,65 @@ class ProductFiltersBuilder:
 		if not attributes:
 			return []
 
-		result = frappe.get_all(
-			"Item Variant Attribute",
-			filters={"attribute": ["in", attributes], "attribute_value": ["is", "set"]},
-			fields=["attribute", "attribute_value"],
-			distinct=True,
-		)
+		cache_key = f"{ATTRIBUTE_FACETS_CACHE_KEY}:{get_catalog_version()}:{self.item_group or ''}"
+		facets = frappe.cache().get_value(cache_key)
+		if facets is not None:
+			return facets
+
+		facets = self.get_attribute_facets(attributes)
+		frappe.cache().set_value(cache_key, facets, expires_in_sec=ATTRIBUTE_FACETS_CACHE_TTL)
+
+		return facets
 
-		attribute_value_map = {}
-		for d in result:
-			attribute_value_map.setdefault(d.attribute, []).append(d.attribute_value)
+	def get_attribute_facets(self, attributes):
+		"""Values of `attributes` with the count of published items in the item group."""
+		published_items = self.get_published_item_codes()
 
 		out = []
-		for name, values in attribute_value_map.items():
-			out.append(frappe._dict(name=name, item_attribute_values=values))
+		for attribute in attributes:
+			# count published items in this group per value, via the attribute index
+			counts = {}
+			for value, item_codes in get_attribute_index(attribute).items():
+				count = len(published_items.intersection(item_codes))
+				if count:
+					counts[value] = count
+
+			if counts:
+				out.append(
+					frappe._dict(name=attribute, item_attribute_values=sorted(counts), counts=counts)
+				)
+
 		return out
 
-	def get_discount_filters(self, discounts):
+	def get_published_item_codes(self):
+		"""Item codes of published Website Items in the current item group, cached until the catalog changes."""
+		cache_key = f"{PUBLISHED_ITEMS_CACHE_KEY}:{get_catalog_version()}:{self.item_group or ''}"
+		item_codes = frappe.cache().get_value(cache_key)
+		if item_codes is not None:
+			return item_codes
+
+		conditions, join, params = self.get_published_item_conditions()
+		item_codes = set(
+			frappe.db.sql_list(
+				f"""select distinct wi.item_code
+				from `tabWebsite Item` wi {join}
+				where {conditions}""",
+				params,
+			)
+		)
+
+		frappe.cache().set_value(cache_key, item_codes, expires_in_sec=PUBLISHED_ITEMS_CACHE_TTL)
+		return item_codes
+
+	def get_discount_filters(self, discounts=None):
 		discount_filters = []
 
+		if discounts is None:
+			discounts = self.get_discount_range()
+
+		if not discounts:
+			return discount_filters
+
 		# [25.89, 60.5] min max
 		min_discount, max_discount = discounts[0], discounts[1]
 		# [25, 60] rounded min max
@@ -156,3 +267,20 @@ class ProductFiltersBuilder:
 			discount_filters.append([discount, label])
 
 		return discount_filters
+
+	def get_discount_range(self):
+		"Min and max discount of published items in the current Price List, if prices are shown."
+		from webshop.webshop.doctype.webshop_settings.webshop_settings import (
+			get_shopping_cart_settings,
+		)
+		from webshop.webshop.doctype.website_item_price.website_item_price import get_discount_range
+		from webshop.webshop.shopping_cart.cart import _set_price_list
+
+		settings = get_shopping_cart_settings()
+		if not (settings.enabled and settings.show_price):
+			return []
+
+		if frappe.session.user == "Guest" and settings.hide_price_for_guest:
+			return []
+
+		return get_discount_range(_set_price_list(settings, None))
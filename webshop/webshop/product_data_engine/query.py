@@ -1,12 +1,35 @@
 # Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import base64
+import json
+
 import frappe
-from frappe.utils import flt
+from frappe import _
+from frappe.utils import cint, flt
 
 from webshop.webshop.doctype.item_review.item_review import get_customer
-from webshop.webshop.shopping_cart.product_info import get_product_info_for_website
-from webshop.webshop.utils.product import get_non_stock_item_status
+from webshop.webshop.doctype.website_item_price.website_item_price import get_discounted_items
+from webshop.webshop.product_data_engine.attribute_index import (
+	are_items_stored,
+	get_stored_items,
+	store_items_with_attribute_values,
+)
+from webshop.webshop.product_data_engine.search import get_fulltext_match
+from webshop.webshop.shopping_cart.cart import _set_price_list
+from webshop.webshop.shopping_cart.product_info import get_prices_for_website_items
+from webshop.webshop.utils.product import get_non_stock_items_status, get_stock_for_items
+
+
+# attribute filters matching up to this many Items are applied in SQL with an IN list,
+# larger ones by checking the listing against the set in Redis, this many rows at a time
+ATTRIBUTE_FILTER_IN_LIMIT = 1000
+ATTRIBUTE_FILTER_BATCH = 1000
+
+# listing orders other than by ranking, see `ProductQuery.query`
+SORT_ORDERS = {
+	"average_rating": "average_rating desc, total_reviews desc, `tabWebsite Item`.`name` desc",
+}
 
 
 class ProductQuery:
@@ -26,6 +49,8 @@ class ProductQuery:
 
 		self.or_filters = []
 		self.filters = [["published", "=", 1]]
+		self.search_match = None
+		self.sort_by = None
 		self.fields = [
 			"web_item_name",
 			"name",
@@ -40,27 +65,44 @@ class ProductQuery:
 			"route",
 			"website_warehouse",
 			"ranking",
+			"average_rating",
+			"total_reviews",
 			"on_backorder",
 			"is_gift_card",
 		]
 
-	def query(self, attributes=None, fields=None, search_term=None, start=0, item_group=None):
+	def query(
+		self,
+		attributes=None,
+		fields=None,
+		search_term=None,
+		start=0,
+		item_group=None,
+		cursor=None,
+		sort_by=None,
+	):
 		"""
 		Args:
 		        attributes (dict, optional): Item Attribute filters
 		        fields (dict, optional): Field level filters
 		        search_term (str, optional): Search term to lookup
 		        start (int, optional): Page start
+		        cursor (str, optional): `next_cursor` of the previous page, used instead of `start`
+		        sort_by (str, optional): "average_rating" to list best rated items first,
+		                by ranking otherwise
 
 		Returns:
 		        dict: Dict containing items, item count & discount range
 		"""
-		# track if discounts included in field filters
-		self.filter_with_discount = bool(fields.get("discount"))
-		result, discount_list, website_item_groups, cart_items, count = [], [], [], [], 0
+		result, discount_list, count = [], [], 0
+		self.total_count = 0
+		self.next_cursor = None
+		self.sort_by = sort_by if sort_by in SORT_ORDERS else None
 
 		if fields:
 			self.build_fields_filters(fields)
+			if fields.get("discount"):
+				self.build_discount_filters(fields["discount"])
 		if item_group:
 			self.build_item_group_filters(item_group)
 		if search_term:
@@ -70,87 +112,189 @@ class ProductQuery:
 
 		# query results
 		if attributes:
-			result, count = self.query_items_with_attributes(attributes, start)
+			result, count = self.query_items_with_attributes(attributes, start, cursor)
 		else:
-			result, count = self.query_items(start=start)
-
-		# sort combined results by ranking
-		result = sorted(result, key=lambda x: x.get("ranking"), reverse=True)
+			result, count = self.query_items(start=start, cursor=cursor)
 
-		if self.settings.enabled:
-			cart_items = self.get_cart_items()
+		if self.search_match is None and not self.sort_by:
+			# sort combined results by ranking, search results are already ordered by score
+			result = sorted(result, key=lambda x: x.get("ranking"), reverse=True)
 
-		result, discount_list = self.add_display_details(result, discount_list, cart_items)
+		result, discount_list = self.add_display_details(result, discount_list)
+		self.set_user_item_details(result)
 
 		discounts = []
 		if discount_list:
 			discounts = [min(discount_list), max(discount_list)]
 
-		result = self.filter_results_by_discount(fields, result)
+		return {
+			"items": result,
+			"items_count": count,
+			"total_count": self.total_count,
+			"next_cursor": self.next_cursor,
+			"discounts": discounts,
+		}
 
-		return {"items": result, "items_count": count, "discounts": discounts}
-
-	def query_items(self, start=0):
+	def query_items(self, start=0, cursor=None):
 		"""Build a query to fetch Website Items based on field filters."""
-		# MySQL does not support offset without limit,
-		# frappe does not accept two parameters for limit
-		# https://dev.mysql.com/doc/refman/8.0/en/select.html#id4651989
-		count_items = frappe.db.get_all(
+		# count matching items once, `items_count` is the number of items from this offset
+		self.total_count = self.get_items_count()
+		count = max(self.total_count - cint(start), 0)
+
+		order_fields, order_by = self.get_order()
+		filters = list(self.filters)
+		if cursor and not (self.search_match or self.sort_by):
+			# seek past the last item of the previous page instead of offsetting
+			filters.append(self.get_cursor_condition(cursor))
+			start = 0
+
+		items = frappe.db.get_all(
 			"Website Item",
-			filters=self.filters,
+			fields=self.fields + order_fields,
+			filters=filters,
 			or_filters=self.or_filters,
-			limit_page_length=184467440737095516,
-			limit_start=start,  # get all items from this offset for total count ahead
-			order_by="ranking desc",
+			limit_page_length=self.page_length,
+			limit_start=start,
+			order_by=order_by,
 		)
-		count = len(count_items)
 
-		# If discounts included, return all rows.
-		# Slice after filtering rows with discount (See `filter_results_by_discount`).
-		# Slicing before hand will miss discounted items on the 3rd or 4th page.
-		# Discounts are fetched on computing Pricing Rules so we cannot query them directly.
-		page_length = 184467440737095516 if self.filter_with_discount else self.page_length
+		self.set_next_cursor(items)
 
-		items = frappe.db.get_all(
+		return items, count
+
+	def get_order(self):
+		"""Return the fields to order by, and the order of the listing."""
+		if self.search_match:
+			# full-text matches by relevance, pages are offset as cursors seek on ranking
+			return (
+				[f"{self.search_match.score} as search_score"],
+				"search_score desc, `tabWebsite Item`.`name` desc",
+			)
+
+		if self.sort_by:
+			# pages are offset as cursors seek on ranking
+			return [], SORT_ORDERS[self.sort_by]
+
+		return [], "ranking desc, `tabWebsite Item`.`name` desc"
+
+	def set_next_cursor(self, items):
+		if items and len(items) == self.page_length and not (self.search_match or self.sort_by):
+			self.next_cursor = encode_cursor(items[-1])
+
+	def get_items_count(self):
+		"""Count all Website Items matching the current filters without fetching rows."""
+		# child table filters (eg. Website Item Group) join rows, count each item once
+		result = frappe.db.get_all(
 			"Website Item",
-			fields=self.fields,
+			fields=["count(distinct `tabWebsite Item`.`name`) as count"],
 			filters=self.filters,
 			or_filters=self.or_filters,
-			limit_page_length=page_length,
-			limit_start=start,
-			order_by="ranking desc",
 		)
 
-		return items, count
+		return cint(result[0].count) if result else 0
 
-	def query_items_with_attributes(self, attributes, start=0):
-		"""Build a query to fetch Website Items based on field & attribute filters."""
-		item_codes = []
+	def get_cursor_condition(self, cursor):
+		"""Condition for rows after (ranking, name) of the cursor, in listing order."""
+		ranking, name = decode_cursor(cursor)
+		name = frappe.db.escape(name)
 
-		for attribute, values in attributes.items():
-			if not isinstance(values, list):
-				values = [values]
+		return (
+			f"(`tabWebsite Item`.`ranking` < {ranking} or "
+			f"(`tabWebsite Item`.`ranking` = {ranking} and `tabWebsite Item`.`name` < {name}))"
+		)
 
-			# get items that have selected attribute & value
-			item_code_list = frappe.db.get_all(
-				"Item",
-				fields=["item_code"],
-				filters=[
-					["published_in_website", "=", 1],
-					["Item Variant Attribute", "attribute", "=", attribute],
-					["Item Variant Attribute", "attribute_value", "in", values],
-				],
+	def query_items_with_attributes(self, attributes, start=0, cursor=None):
+		"""
+		Build a query to fetch Website Items based on field & attribute filters.
+		Items matching the attributes are intersected in Redis. Small results are
+		filtered in SQL, larger ones are matched against the listing in batches.
+		"""
+		attributes = {
+			attribute: values if isinstance(values, list) else [values]
+			for attribute, values in attributes.items()
+		}
+		items_key, items_count = store_items_with_attribute_values(attributes)
+
+		if items_count <= ATTRIBUTE_FILTER_IN_LIMIT:
+			self.filters.append(["item_code", "in", get_stored_items(items_key)])
+			return self.query_items(start=start, cursor=cursor)
+
+		return self.query_items_in_set(items_key, start=start, cursor=cursor)
+
+	def query_items_in_set(self, items_key, start=0, cursor=None):
+		"""
+		Walk the listing `ATTRIBUTE_FILTER_BATCH` rows at a time, keeping rows whose
+		Item is in the Redis set at `items_key`, until the page is full. Only the
+		names of the page are sent back to SQL to fetch the listed fields.
+		"""
+		self.total_count = self.count_items_in_set(items_key)
+		count = max(self.total_count - cint(start), 0)
+
+		order_fields, order_by = self.get_order()
+		filters = list(self.filters)
+		if cursor and not (self.search_match or self.sort_by):
+			filters.append(self.get_cursor_condition(cursor))
+			start = 0
+
+		# child table filters (eg. Website Item Group) may repeat rows
+		page, seen, skipped, batch_start = [], set(), 0, 0
+		while len(page) < self.page_length:
+			rows = frappe.db.get_all(
+				"Website Item",
+				fields=["name", "item_code"] + order_fields,
+				filters=filters,
+				or_filters=self.or_filters,
+				limit_page_length=ATTRIBUTE_FILTER_BATCH,
+				limit_start=batch_start,
+				order_by=order_by,
 			)
-			item_codes.append({x.item_code for x in item_code_list})
 
-		if item_codes:
-			item_codes = list(set.intersection(*item_codes))
-			self.filters.append(["item_code", "in", item_codes])
+			for row, in_set in zip(rows, are_items_stored(items_key, [row.item_code for row in rows])):
+				if not in_set or row.name in seen:
+					continue
+
+				seen.add(row.name)
+				if skipped < cint(start):
+					skipped += 1
+				elif len(page) < self.page_length:
+					page.append(row.name)
+
+			if len(rows) < ATTRIBUTE_FILTER_BATCH:
+				break
+			batch_start += ATTRIBUTE_FILTER_BATCH
+
+		items = []
+		if page:
+			items = frappe.db.get_all(
+				"Website Item",
+				fields=self.fields + order_fields,
+				filters=[["name", "in", page]],
+				order_by=order_by,
+			)
 
-		items, count = self.query_items(start=start)
+		self.set_next_cursor(items)
 
 		return items, count
 
+	def count_items_in_set(self, items_key):
+		"""Count listed Website Items whose Item is in the Redis set at `items_key`."""
+		count, last_name = 0, ""
+		while True:
+			rows = frappe.db.get_all(
+				"Website Item",
+				fields=["name", "item_code"],
+				filters=self.filters + [["name", ">", last_name]],
+				distinct=True,
+				or_filters=self.or_filters,
+				limit_page_length=ATTRIBUTE_FILTER_BATCH,
+				order_by="`tabWebsite Item`.`name` asc",
+			)
+			if not rows:
+				return count
+
+			count += sum(are_items_stored(items_key, [row.item_code for row in rows]))
+			last_name = rows[-1].name
+
 	def build_fields_filters(self, filters):
 		"""Build filters for field values
 
@@ -177,6 +321,19 @@ class ProductQuery:
 				# `=` will be faster than `IN` for most cases
 				self.filters.append([field, "=", values])
 
+	def build_discount_filters(self, discount):
+		"""Filter items by the maximum discount selected, via Website Item Price.
+
+		Args:
+		        discount (list): Selected discount values, eg. [10]
+		"""
+		if isinstance(discount, list):
+			discount = discount[0]
+
+		price_list = _set_price_list(self.settings, None)
+		item_codes = get_discounted_items(price_list, flt(discount))
+		self.filters.append(["item_code", "in", item_codes])
+
 	def build_item_group_filters(self, item_group):
 		"Add filters for Item group page and include Website Item Groups."
 		from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
@@ -204,8 +361,19 @@ class ProductQuery:
 		Args:
 		        search_term (str): Search candidate
 		"""
+		search_match = get_fulltext_match(search_term)
+		if search_match:
+			# full-text matches, ordered by score in `query_items`
+			self.search_match = search_match
+			self.filters.append(search_match.condition)
+			return
+
+		self.build_like_search_filters(search_term)
+
+	def build_like_search_filters(self, search_term):
+		"""Match `search_term` anywhere in the search fields, used if full-text search cannot."""
 		# Default fields to search from
-		default_fields = {"item_code", "item_name", "web_long_description", "item_group"}
+		default_fields = {"item_code", "item_name", "web_long_description", "item_group", "brand"}
 
 		# Get meta search fields
 		meta = frappe.get_meta("Website Item")
@@ -221,29 +389,36 @@ class ProductQuery:
 		for field in search_fields:
 			self.or_filters.append([field, "like", search])
 
-	def add_display_details(self, result, discount_list, cart_items):
-		"""Add price and availability details in result."""
-		for item in result:
-			product_info = get_product_info_for_website(item.item_code, skip_quotation_creation=True).get(
-				"product_info"
-			)
+	def add_display_details(self, result, discount_list):
+		"""Add price and availability details in result for the whole page at once."""
+		item_codes = [item.item_code for item in result]
+		if not item_codes:
+			return result, discount_list
 
-			if product_info and product_info["price"]:
+		prices = get_prices_for_website_items(item_codes)
+
+		if self.settings.show_stock_availability:
+			self.set_stock_availability(result)
+
+		for item in result:
+			price = prices.get(item.item_code)
+			if price:
 				# update/mutate item and discount_list objects
-				self.get_price_discount_info(item, product_info["price"], discount_list)
+				self.get_price_discount_info(item, price, discount_list)
 
-			if self.settings.show_stock_availability:
-				self.get_stock_availability(item)
+		return result, discount_list
 
-			item.in_cart = item.item_code in cart_items
+	def set_user_item_details(self, result):
+		"""Add cart and wishlist details of the current user in result."""
+		if not result:
+			return
 
-			item.wished = False
-			if frappe.db.exists(
-				"Wishlist Item", {"item_code": item.item_code, "parent": frappe.session.user}
-			):
-				item.wished = True
+		cart_items = self.get_cart_items() if self.settings.enabled else []
+		wished_items = self.get_wished_items([item.item_code for item in result])
 
-		return result, discount_list
+		for item in result:
+			item.in_cart = item.item_code in cart_items
+			item.wished = item.item_code in wished_items
 
 	def get_price_discount_info(self, item, price_object, discount_list):
 		"""Modify item object and add price details."""
@@ -260,28 +435,63 @@ class ProductQuery:
 				"formatted_discount_rate"
 			)
 
-	def get_stock_availability(self, item):
-		"""Modify item object and add stock details."""
-		from webshop.templates.pages.wishlist import (
-			get_stock_availability as get_stock_availability_from_template,
+	def set_stock_availability(self, items):
+		"""Modify item objects and add stock details."""
+		stock_items = set(
+			frappe.get_all(
+				"Item",
+				filters={"name": ["in", [item.item_code for item in items]], "is_stock_item": 1},
+				pluck="name",
+			)
 		)
 
-		item.in_stock = False
-		warehouse = item.get("website_warehouse")
-		is_stock_item = frappe.get_cached_value("Item", item.item_code, "is_stock_item")
+		stock = get_stock_for_items(
+			[
+				item.item_code
+				for item in items
+				if item.item_code in stock_items and item.get("website_warehouse")
+			],
+			"website_warehouse",
+		)
+		# product bundles
+		non_stock_status = get_non_stock_items_status(
+			[
+				item.item_code
+				for item in items
+				if item.item_code not in stock_items and item.get("website_warehouse")
+			],
+			"website_warehouse",
+		)
 
-		if item.get("on_backorder"):
-			return
+		for item in items:
+			item.in_stock = False
+			warehouse = item.get("website_warehouse")
 
-		if not is_stock_item:
-			if warehouse:
-				# product bundle case
-				item.in_stock = get_non_stock_item_status(item.item_code, "website_warehouse")
-			else:
-				item.in_stock = True
-		elif warehouse:
-			# stock item and has warehouse
-			item.in_stock = get_stock_availability_from_template(item.item_code, warehouse)
+			if item.get("on_backorder"):
+				continue
+
+			if item.item_code not in stock_items:
+				if warehouse:
+					# product bundle case
+					item.in_stock = bool(non_stock_status[item.item_code])
+				else:
+					item.in_stock = True
+			elif warehouse:
+				# stock item and has warehouse
+				item.in_stock = bool(stock[item.item_code].in_stock)
+
+	def get_wished_items(self, item_codes):
+		"""Return the items in `item_codes` that are in the current user's wishlist."""
+		if frappe.session.user == "Guest":
+			return set()
+
+		return set(
+			frappe.get_all(
+				"Wishlist Item",
+				filters={"item_code": ["in", item_codes], "parent": frappe.session.user},
+				pluck="item_code",
+			)
+		)
 
 	def get_cart_items(self):
 		customer = get_customer(silent=True)
@@ -307,18 +517,18 @@ class ProductQuery:
 
 		return []
 
-	def filter_results_by_discount(self, fields, result):
-		if fields and fields.get("discount"):
-			discount_percent = frappe.utils.flt(fields["discount"][0])
-			result = [
-				row
-				for row in result
-				if row.get("discount_percent") and row.discount_percent <= discount_percent
-			]
-
-		if self.filter_with_discount:
-			# no limit was added to results while querying
-			# slice results manually
-			result[: self.page_length]
-
-		return result
+
+def encode_cursor(item):
+	"""Opaque cursor pointing at a listed Website Item."""
+	value = json.dumps([cint(item.get("ranking")), item.get("name")])
+	return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+	"""Return (ranking, name) from a cursor made by `encode_cursor`."""
+	try:
+		ranking, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+	except Exception:
+		frappe.throw(_("Invalid cursor"), frappe.ValidationError)
+
+	return cint(ranking), str(name)
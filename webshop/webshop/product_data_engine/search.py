@@ -0,0 +1,89 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import re
+
+import frappe
+from frappe.utils import flt
+
+FULLTEXT_INDEX = "website_item_fulltext"
+FULLTEXT_INDEX_CACHE_KEY = "webshop_fulltext_index_available"
+
+# columns of the FULLTEXT index, MATCH() must list exactly these
+FULLTEXT_FIELDS = (
+	"web_item_name",
+	"item_name",
+	"item_code",
+	"item_group",
+	"brand",
+	"web_long_description",
+)
+
+# words shorter than `innodb_ft_min_token_size` are not indexed
+MIN_TOKEN_SIZE = 3
+
+# relevance added per point of Website Item `ranking`
+RANKING_WEIGHT = 0.1
+
+
+def add_fulltext_index():
+	"""Add the FULLTEXT index on Website Item search fields (MariaDB only)."""
+	if frappe.db.db_type != "mariadb":
+		return
+
+	if not frappe.db.has_index("tabWebsite Item", FULLTEXT_INDEX):
+		columns = ", ".join(f"`{field}`" for field in FULLTEXT_FIELDS)
+		frappe.db.sql_ddl(
+			f"alter table `tabWebsite Item` add fulltext index `{FULLTEXT_INDEX}` ({columns})"
+		)
+
+	frappe.cache().delete_value(FULLTEXT_INDEX_CACHE_KEY)
+
+
+def get_fulltext_match(search_term):
+	"""
+	Full-text condition and relevance of published Website Items for `search_term`.
+	Relevance is blended with `ranking` so that promoted items surface first.
+	Filtering, ordering and paging stay in the caller's query.
+
+	Args:
+	        search_term (str): Search candidate
+
+	Returns:
+	        dict: `condition` (MATCH ... AGAINST) and `score` SQL expressions, or None
+	        if full-text search cannot serve the term (caller should fall back to LIKE)
+	"""
+	query = get_boolean_search_query(search_term)
+	if not query or not is_fulltext_search_available():
+		return None
+
+	# qualified, filters on child tables join columns of the same name (eg. item_group)
+	columns = ", ".join(f"`tabWebsite Item`.`{field}`" for field in FULLTEXT_FIELDS)
+	match = f"match({columns}) against ({frappe.db.escape(query)} in boolean mode)"
+
+	return frappe._dict(
+		condition=match,
+		score=f"{match} + {flt(RANKING_WEIGHT)} * `tabWebsite Item`.`ranking`",
+	)
+
+
+def get_boolean_search_query(search_term):
+	"""
+	Boolean mode query requiring every word of `search_term` as a prefix.
+	Returns None if any word is too short to be in the index.
+	"""
+	words = re.findall(r"\w+", search_term or "")
+	if not words or min(len(word) for word in words) < MIN_TOKEN_SIZE:
+		return None
+
+	return " ".join(f"+{word}*" for word in words)
+
+
+def is_fulltext_search_available():
+	if frappe.db.db_type != "mariadb":
+		return False
+
+	return frappe.cache().get_value(
+		FULLTEXT_INDEX_CACHE_KEY,
+		generator=lambda: frappe.db.has_index("tabWebsite Item", FULLTEXT_INDEX),
+	)
@@ -6,7 +6,13 @@ import unittest
 import frappe
 
 from webshop.webshop.api import get_product_filter_data
+from webshop.webshop.doctype.override_doctype.item_group import (
+	get_child_groups_for_website,
+	get_item_group_tree,
+	invalidate_item_group_tree,
+)
 from webshop.webshop.doctype.website_item.test_website_item import create_regular_web_item
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
 
 test_dependencies = ["Item", "Item Group"]
 
@@ -30,6 +36,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 
 		frappe.db.set_value("Item Group", "_Test Item Group B - 1", "show_in_website", 1)
 		frappe.db.set_value("Item Group", "_Test Item Group B - 2", "show_in_website", 1)
+		invalidate_item_group_caches()
 
 		frappe.db.set_single_value("Webshop Settings", "products_per_page", 10)
 
@@ -40,6 +47,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 		"Test if only products belonging to the Item Group are fetched."
 
 		frappe.db.set_value("Item Group", "_Test Item Group B", "include_descendants", 0)
+		invalidate_item_group_caches()
 		result = get_product_filter_data(
 			query_args={
 				"field_filters": {},
@@ -98,6 +106,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 	def test_item_group_with_sub_groups(self):
 		"Test Valid Sub Item Groups in Item Group Page."
 		frappe.db.set_value("Item Group", "_Test Item Group B - 2", "show_in_website", 0)
+		invalidate_item_group_caches()
 
 		result = get_product_filter_data(
 			query_args={
@@ -115,6 +124,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 		self.assertIn("_Test Item Group B - 1", child_groups)
 
 		frappe.db.set_value("Item Group", "_Test Item Group B - 2", "show_in_website", 1)
+		invalidate_item_group_caches()
 		result = get_product_filter_data(
 			query_args={
 				"field_filters": {},
@@ -155,6 +165,7 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 
 		# enable 'include descendants' in Level 1
 		frappe.db.set_value("Item Group", "_Test Item Group B", "include_descendants", 1)
+		invalidate_item_group_caches()
 
 		result = get_product_filter_data(
 			query_args={
@@ -174,3 +185,38 @@ class TestItemGroupProductDataEngine(unittest.TestCase):
 		self.assertIn("Test Mobile C", item_codes)
 		self.assertIn("Test Mobile E", item_codes)
 		self.assertIn("Test Mobile F", item_codes)
+
+	def test_item_group_tree(self):
+		"Test if the cached Item Group tree answers lookups like the nested set in db."
+		tree = get_item_group_tree()
+
+		ancestors = [d.name for d in tree.get_ancestors("_Test Item Group B - 1")]
+		self.assertEqual(ancestors[-2:], ["_Test Item Group B", "_Test Item Group B - 1"])
+
+		item_group = frappe.db.get_value("Item Group", "_Test Item Group B", ["lft", "rgt"], as_dict=1)
+		descendants = frappe.get_all(
+			"Item Group",
+			filters={"lft": [">", item_group.lft], "rgt": ["<", item_group.rgt]},
+			pluck="name",
+		)
+		self.assertEqual(
+			sorted(d.name for d in tree.get_descendants("_Test Item Group B")), sorted(descendants)
+		)
+
+		# new groups are picked up by the tree
+		frappe.get_doc(
+			{
+				"doctype": "Item Group",
+				"item_group_name": "_Test Item Group B - 3",
+				"parent_item_group": "_Test Item Group B",
+				"show_in_website": 1,
+			}
+		).insert()
+		child_groups = [d.name for d in get_child_groups_for_website("_Test Item Group B")]
+		self.assertIn("_Test Item Group B - 3", child_groups)
+
+
+def invalidate_item_group_caches():
+	"Direct db updates skip Item Group hooks, drop the caches they would invalidate."
+	invalidate_item_group_tree()
+	invalidate_catalog_cache()
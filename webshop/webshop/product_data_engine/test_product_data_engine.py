@@ -8,7 +8,9 @@ import frappe
 from webshop.webshop.doctype.webshop_settings.test_webshop_settings import (
 	setup_webshop_settings,
 )
+from webshop.webshop.doctype.override_doctype.item_group import invalidate_item_group_tree
 from webshop.webshop.doctype.website_item.test_website_item import create_regular_web_item
+from webshop.webshop.product_data_engine.cache import invalidate_catalog_cache
 from webshop.webshop.product_data_engine.filters import ProductFiltersBuilder
 from webshop.webshop.product_data_engine.query import ProductQuery
 
@@ -80,6 +82,99 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertEqual(items[1].get("item_code"), "Test 12I Laptop")
 		self.assertEqual(items[2].get("item_code"), "Test 11I Laptop")
 
+	def test_product_list_count(self):
+		"Test if item counts are computed independent of the page being fetched."
+		engine = ProductQuery()
+		result = engine.query(attributes={}, fields={}, search_term=None, start=0, item_group=None)
+		total_count = result.get("total_count")
+
+		self.assertEqual(result.get("items_count"), total_count)
+		self.assertEqual(total_count, frappe.db.count("Website Item", {"published": 1}))
+
+		# items count is the number of items from the offset, total count is unchanged
+		engine = ProductQuery()
+		result = engine.query(attributes={}, fields={}, search_term=None, start=4, item_group=None)
+
+		self.assertEqual(result.get("items_count"), total_count - 4)
+		self.assertEqual(result.get("total_count"), total_count)
+
+	def test_product_list_cursor_paging(self):
+		"Test if cursor based paging returns the same pages as offset based paging."
+		engine = ProductQuery()
+		first_page = engine.query(attributes={}, fields={}, search_term=None, start=0, item_group=None)
+		next_cursor = first_page.get("next_cursor")
+		self.assertIsNotNone(next_cursor)
+
+		engine = ProductQuery()
+		offset_page = engine.query(attributes={}, fields={}, search_term=None, start=4, item_group=None)
+
+		engine = ProductQuery()
+		cursor_page = engine.query(
+			attributes={}, fields={}, search_term=None, item_group=None, cursor=next_cursor
+		)
+
+		self.assertEqual(
+			[item.item_code for item in cursor_page.get("items")],
+			[item.item_code for item in offset_page.get("items")],
+		)
+		self.assertEqual(cursor_page.get("total_count"), first_page.get("total_count"))
+
+	def test_product_list_cursor_paging_with_ties(self):
+		"Test if cursor paging lists every item once when rankings are tied across pages."
+		item_codes = ["Test 12I Laptop", "Test 13I Laptop", "Test 14I Laptop", "Test 15I Laptop"]
+		rankings = dict(
+			frappe.get_all(
+				"Website Item",
+				filters={"item_code": ["in", item_codes]},
+				fields=["name", "ranking"],
+				as_list=True,
+			)
+		)
+
+		try:
+			# four items sharing a ranking straddle the page boundary of 4
+			for name in rankings:
+				frappe.db.set_value("Website Item", name, "ranking", 3)
+
+			expected = frappe.get_all(
+				"Website Item",
+				filters={"published": 1},
+				order_by="ranking desc, name desc",
+				pluck="name",
+			)
+
+			listed, cursor = [], None
+			for _ in range(len(expected)):
+				engine = ProductQuery()
+				result = engine.query(
+					attributes={}, fields={}, search_term=None, item_group=None, cursor=cursor
+				)
+				listed.extend(item.name for item in result.get("items"))
+				cursor = result.get("next_cursor")
+				if not cursor:
+					break
+
+			self.assertEqual(listed, expected)
+		finally:
+			for name, ranking in rankings.items():
+				frappe.db.set_value("Website Item", name, "ranking", ranking)
+
+	def test_product_list_sort_by_rating(self):
+		"Test if listings can be ordered by the rating summary of Website Items."
+		web_item = frappe.db.get_value("Website Item", {"item_code": "Test 11I Laptop"})
+		frappe.db.set_value("Website Item", web_item, {"average_rating": 5, "total_reviews": 1})
+
+		engine = ProductQuery()
+		result = engine.query(
+			attributes={}, fields={}, search_term=None, item_group=None, sort_by="average_rating"
+		)
+
+		# lowest ranking, best rated
+		self.assertEqual(result.get("items")[0].get("item_code"), "Test 11I Laptop")
+		self.assertIsNone(result.get("next_cursor"))
+
+		frappe.db.set_value("Website Item", web_item, {"average_rating": 0, "total_reviews": 0})
+
 	def test_change_product_ranking(self):
 		"Test if item on second page appear on first if ranking is changed."
 		item_code = "Test 12I Laptop"
@@ -105,6 +200,9 @@ class TestProductDataEngine(unittest.TestCase):
 	def test_product_list_field_filter_builder(self):
 		"Test if field filters are fetched correctly."
 		frappe.db.set_value("Item Group", "Raw Material", "show_in_website", 0)
+		# direct db update skips item group hooks
+		invalidate_item_group_tree()
+		invalidate_catalog_cache()
 
 		filter_engine = ProductFiltersBuilder()
 		field_filters = filter_engine.get_field_filters()
@@ -120,6 +218,8 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertNotIn("Raw Material", valid_item_groups)
 
 		frappe.db.set_value("Item Group", "Raw Material", "show_in_website", 1)
+		invalidate_item_group_tree()
+		invalidate_catalog_cache()
 		field_filters = filter_engine.get_field_filters()
 
 		#'Products' and 'Raw Materials' both have 'show_in_website' enabled
@@ -131,6 +231,56 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertIn("Products", valid_item_groups)
 		self.assertIn("Raw Material", valid_item_groups)
 
+		# published item count per item group
+		item_group_counts = item_group_filters[2]
+		self.assertGreaterEqual(item_group_counts["Raw Material"], 3)
+
+	def test_product_list_display_details(self):
+		"Test if wishlist state is set for the whole page of listed items."
+		from webshop.webshop.doctype.wishlist.wishlist import add_to_wishlist, remove_from_wishlist
+
+		add_to_wishlist("Test 16I Laptop")
+
+		engine = ProductQuery()
+		result = engine.query(attributes={}, fields={}, search_term=None, start=0, item_group=None)
+		wished = {item.item_code: item.wished for item in result.get("items")}
+
+		self.assertTrue(wished["Test 16I Laptop"])
+		self.assertFalse(wished["Test 17I Laptop"])
+
+		# tear down
+		remove_from_wishlist("Test 16I Laptop")
+
+	def test_product_list_prices(self):
+		"Test if listed prices match the price of the product page."
+		from erpnext.utilities.product import get_price
+
+		from webshop.webshop.doctype.website_item.test_website_item import (
+			make_web_item_price,
+			make_web_pricing_rule,
+		)
+
+		item_code = "Test 12I Laptop"
+		make_web_item_price(item_code=item_code)
+		make_web_pricing_rule(title=f"Test Pricing Rule for {item_code}", item_code=item_code, selling=1)
+
+		setup_webshop_settings({"show_price": 1})
+		frappe.local.shopping_cart_settings = None
+
+		engine = ProductQuery()
+		result = engine.query(attributes={}, fields={}, search_term=None, start=0, item_group=None)
+		item = next(item for item in result.get("items") if item.item_code == item_code)
+
+		# 10% off 1000
+		self.assertEqual(item.price_list_rate, 900)
+		self.assertEqual(item.discount_percent, 10)
+		self.assertEqual(item.discount, "10%")
+
+		price = get_price(item_code, "_Test Price List India", "_Test Customer Group", "_Test Company")
+		self.assertEqual(item.price_list_rate, price.price_list_rate)
+		self.assertEqual(item.formatted_price, price.formatted_price)
+		self.assertEqual(item.formatted_mrp, price.formatted_mrp)
+
 	def test_product_list_with_field_filter(self):
 		"Test if field filters are applied correctly."
 		field_filters = {"item_group": "Raw Material"}
@@ -161,6 +311,12 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertEqual(attribute_filter.name, "Test Size")
 		self.assertGreater(len(attribute_values), 0)
 		self.assertIn("Large", attribute_values)
+		self.assertEqual(attribute_filter.counts["Large"], 1)
+
+		# attribute values are scoped to published items of the item group
+		filter_engine = ProductFiltersBuilder(item_group="Raw Material")
+		filter_engine.doc.append("filter_attributes", {"attribute": "Test Size"})
+		self.assertEqual(filter_engine.get_attribute_filters(), [])
 
 	def test_product_list_with_attribute_filter(self):
 		"Test if attribute filters are applied correctly."
@@ -177,6 +333,24 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertEqual(len(items), 1)
 		self.assertEqual(items[0].get("item_code"), "Test Web Item-L")
 
+	def test_product_list_with_large_attribute_filter(self):
+		"Test if items are paged against the attribute filter set when it is too large for SQL."
+		from webshop.webshop.product_data_engine.attribute_index import (
+			store_items_with_attribute_values,
+		)
+
+		create_variant_web_item()
+
+		items_key, items_count = store_items_with_attribute_values({"Test Size": ["Large"]})
+		self.assertEqual(items_count, 1)
+
+		engine = ProductQuery()
+		items, count = engine.query_items_in_set(items_key)
+
+		self.assertEqual([item.item_code for item in items], ["Test Web Item-L"])
+		self.assertEqual(engine.total_count, 1)
+		self.assertEqual(count, 1)
+
 	def test_product_list_discount_filter_builder(self):
 		"Test if discount filters are fetched correctly."
 		from webshop.webshop.doctype.website_item.test_website_item import (
@@ -237,6 +411,79 @@ class TestProductDataEngine(unittest.TestCase):
 		# check if only product with 10% and below discount are fetched
 		self.assertEqual(len(items), 1)
 		self.assertEqual(items[0].get("item_code"), "Test 12I Laptop")
+		self.assertEqual(result.get("total_count"), 1)
+
+		# discounts are materialized per item and price list
+		discount_percent = frappe.db.get_value(
+			"Website Item Price",
+			{"item_code": "Test 13I Laptop", "price_list": "_Test Price List India"},
+			"discount_percent",
+		)
+		self.assertEqual(discount_percent, 15)
+
+	def test_website_item_price_refresh_coalescing(self):
+		"Test if changes to an Item waiting for a price refresh are left to the queued job."
+		from webshop.webshop.doctype.website_item.test_website_item import make_web_item_price
+		from webshop.webshop.doctype.website_item_price.website_item_price import (
+			get_refresh_pending_key,
+			refresh_pending_website_item_prices,
+		)
+
+		item_code = "Test 14I Laptop"
+		pending_key = get_refresh_pending_key(item_code)
+		frappe.db.delete("Website Item Price", {"item_code": item_code})
+
+		# a refresh is already queued
+		frappe.cache().set(pending_key, 1, ex=60)
+		try:
+			make_web_item_price(item_code=item_code, price_list_rate=500)
+			self.assertFalse(frappe.db.exists("Website Item Price", {"item_code": item_code}))
+
+			refresh_pending_website_item_prices([item_code])
+			self.assertEqual(
+				frappe.db.get_value("Website Item Price", {"item_code": item_code}, "effective_rate"), 500
+			)
+			self.assertIsNone(frappe.cache().get(pending_key))
+		finally:
+			frappe.cache().delete(pending_key)
+
+	def test_attribute_index_on_item_change(self):
+		"Test if the attribute filter index follows changes in variant attributes."
+		from webshop.webshop.product_data_engine.attribute_index import get_attribute_index
+
+		create_variant_web_item()
+		self.assertIn("Test Web Item-L", get_attribute_index("Test Size").get("Large"))
+
+		variant = frappe.get_doc("Item", "Test Web Item-L")
+		variant.attributes[0].attribute_value = "Medium"
+		variant.save()
+
+		index = get_attribute_index("Test Size")
+		self.assertNotIn("Test Web Item-L", index.get("Large", []))
+		self.assertIn("Test Web Item-L", index.get("Medium"))
+
+		# tear down
+		variant.reload()
+		variant.attributes[0].attribute_value = "Large"
+		variant.save()
+
+	def test_attribute_index_rebuild(self):
+		"Test if the scheduled rebuild repairs drift of the attribute filter index."
+		from webshop.webshop.product_data_engine.attribute_index import (
+			get_attribute_index,
+			get_value_key,
+			rebuild_attribute_indexes,
+		)
+
+		create_variant_web_item()
+		self.assertIn("Test Web Item-L", get_attribute_index("Test Size").get("Large"))
+
+		# drift, eg. a change made without document events
+		frappe.cache().pipeline().srem(get_value_key("Test Size", "Large"), "Test Web Item-L").execute()
+		self.assertNotIn("Test Web Item-L", get_attribute_index("Test Size").get("Large", set()))
+
+		rebuild_attribute_indexes()
+		self.assertIn("Test Web Item-L", get_attribute_index("Test Size").get("Large"))
 
 	def test_product_list_with_api(self):
 		"Test products listing using API."
@@ -257,6 +504,61 @@ class TestProductDataEngine(unittest.TestCase):
 		self.assertEqual(len(items), 1)
 		self.assertEqual(items[0].get("item_code"), "Test Web Item-L")
 
+	def test_product_search_query(self):
+		"Test if search terms are turned into full-text queries only when indexable."
+		from webshop.webshop.product_data_engine.search import get_boolean_search_query
+
+		self.assertEqual(get_boolean_search_query("Test Laptop"), "+Test* +Laptop*")
+		# operators are stripped from user input
+		self.assertEqual(get_boolean_search_query('"laptop" -bag'), "+laptop* +bag*")
+		# words shorter than the min token size cannot use the index
+		self.assertIsNone(get_boolean_search_query("HP Laptop"))
+		self.assertIsNone(get_boolean_search_query(""))
+
+	def test_redisearch_filter_query(self):
+		"Test if listing filters are turned into Redisearch tag clauses."
+		from webshop.webshop.redisearch_utils import get_search_filter_query
+
+		self.assertEqual(get_search_filter_query(), "@published:[1 1]")
+
+		filter_query = get_search_filter_query(
+			field_filters={"brand": ["Test Brand", "Acme-1"], "discount": [10]}
+		)
+		# tag values are escaped, fields not indexed as tags are ignored
+		self.assertEqual(filter_query, r"@published:[1 1] @brand_tags:{Test\ Brand|Acme\-1}")
+
+	def test_product_search_sql_fallback(self):
+		"Test if search falls back to SQL for filters Redisearch cannot apply, with a total."
+		from webshop.templates.pages.product_search import (
+			can_filter_in_redisearch,
+			get_product_data,
+		)
+
+		self.assertFalse(can_filter_in_redisearch({"discount": [10]}))
+		self.assertTrue(can_filter_in_redisearch({"brand": ["Test Brand"], "discount": []}))
+
+		items, total = get_product_data(limit=2, field_filters={"item_group": "Raw Material"})
+		self.assertEqual(len(items), 2)
+		self.assertEqual(total, 3)
+
+	def test_product_list_api_cache(self):
+		"Test if repeated listing requests are served from the listing cache."
+		from webshop.webshop.api import get_product_filter_data
+		from webshop.webshop.product_data_engine.cache import get_product_listing_cache_stats
+
+		query_args = {"field_filters": {"item_group": "Raw Material"}, "start": 0}
+
+		first_result = get_product_filter_data(query_args=query_args)
+		hits = get_product_listing_cache_stats()["hits"]
+		second_result = get_product_filter_data(query_args=query_args)
+
+		self.assertEqual(get_product_listing_cache_stats()["hits"], hits + 1)
+		self.assertEqual(
+			[item.item_code for item in first_result["items"]],
+			[item.item_code for item in second_result["items"]],
+		)
+		self.assertIn("wished", second_result["items"][0])
+
 	def test_product_list_with_variants(self):
 		"Test if variants are hideen on hiding variants in settings."
 		create_variant_web_item()
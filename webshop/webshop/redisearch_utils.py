@@ -2,19 +2,41 @@
 # License: GNU General Public License v3. See license.txt
 
 import json
+import re
+import time
 
 import frappe
 from frappe import _
 from frappe.utils.redis_wrapper import RedisWrapper
 from redis import ResponseError
-from redis.commands.search.field import TagField, TextField
+from redis.commands.search.field import NumericField, TagField, TextField
 from redis.commands.search.indexDefinition import IndexDefinition
 from redis.commands.search.suggestion import Suggestion
 
+# alias of the live index, searches always go through it
 WEBSITE_ITEM_INDEX = "website_items_index"
+# key prefix of the index created before indexes were versioned
 WEBSITE_ITEM_KEY_PREFIX = "website_item:"
 WEBSITE_ITEM_NAME_AUTOCOMPLETE = "website_items_name_dict"
 WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE = "website_items_category_dict"
+SEARCH_INDEX_STATS_KEY = "website_items_index_stats"
+
+# version of the index behind the alias and of the index being built
+SEARCH_INDEX_VERSION_KEY = "website_items_index_version"
+SEARCH_INDEX_BUILD_KEY = "website_items_index_build"
+SEARCH_INDEX_BUILD_TIMEOUT = 3600
+
+# seconds a worker trusts its redisearch probe, see `get_search_capability`
+SEARCH_CAPABILITY_TTL = 30
+
+# {site: {"loaded", "enabled", "checked_at"}}, per worker
+_search_capability = {}
+
+# documents written per pipeline flush
+INDEXING_CHUNK_SIZE = 1000
+
+# separates values of filter fields indexed as tags, item group names can contain commas
+TAG_SEPARATOR = "|"
 
 
 def get_indexable_web_fields():
@@ -30,8 +52,58 @@ def get_indexable_web_fields():
 
 def is_redisearch_enabled():
 	"Return True only if redisearch is loaded and enabled."
-	is_redisearch_enabled = frappe.db.get_single_value("Webshop Settings", "is_redisearch_enabled")
-	return is_search_module_loaded() and is_redisearch_enabled
+	return get_search_capability()["enabled"]
+
+
+def get_search_capability():
+	"""
+	Whether redisearch is loaded and enabled, probed at most once per
+	`SEARCH_CAPABILITY_TTL` seconds per worker and site.
+	"""
+	site = frappe.local.site
+	capability = _search_capability.get(site)
+	if capability and time.monotonic() - capability["checked_at"] < SEARCH_CAPABILITY_TTL:
+		return capability
+
+	is_loaded = bool(is_search_module_loaded())
+	is_enabled = frappe.db.get_single_value("Webshop Settings", "is_redisearch_enabled")
+	capability = {
+		"loaded": is_loaded,
+		"enabled": bool(is_loaded and is_enabled),
+		"checked_at": time.monotonic(),
+	}
+	_search_capability[site] = capability
+
+	return capability
+
+
+def clear_search_capability_cache():
+	"Drop the probe of this worker, other workers probe again within `SEARCH_CAPABILITY_TTL`."
+	_search_capability.pop(frappe.local.site, None)
+
+
+@frappe.whitelist()
+def get_search_backend():
+	"Backend serving product search on this site and the state of the redisearch probe."
+	from webshop.webshop.product_data_engine.search import is_fulltext_search_available
+
+	frappe.only_for("System Manager")
+
+	capability = get_search_capability()
+	if capability["enabled"]:
+		backend = "redisearch"
+	elif is_fulltext_search_available():
+		backend = "mariadb_fulltext"
+	else:
+		backend = "like"
+
+	return {
+		"backend": backend,
+		"redisearch_loaded": capability["loaded"],
+		"redisearch_enabled": capability["enabled"],
+		"checked_seconds_ago": frappe.utils.flt(time.monotonic() - capability["checked_at"], 1),
+		"ttl": SEARCH_CAPABILITY_TTL,
+	}
 
 
 def is_search_module_loaded():
@@ -62,21 +134,77 @@ def make_key(key):
 
 @if_redisearch_enabled
 def create_website_items_index():
-	"Creates Index Definition."
+	"Rebuild the index in a background job, searches use the current index until it is done."
+	frappe.enqueue(
+		"webshop.webshop.redisearch_utils.build_website_items_index",
+		queue="long",
+		enqueue_after_commit=True,
+		now=frappe.flags.in_test,
+	)
+
+
+@if_redisearch_enabled
+def build_website_items_index():
+	"""
+	Build a new version of the index under its own key prefix, then point the
+	alias to it and drop the previous version. Documents saved meanwhile are
+	written to both versions.
+	"""
+	cache = frappe.cache()
+	lock_key = make_key(f"{SEARCH_INDEX_BUILD_KEY}:lock")
+
+	# one build at a time
+	if not cache.set(lock_key, 1, nx=True, ex=SEARCH_INDEX_BUILD_TIMEOUT):
+		return
 
-	redis = frappe.cache()
-	index = redis.ft(WEBSITE_ITEM_INDEX)
+	current_version = get_index_version()
+	version = cache.incr(make_key(f"{SEARCH_INDEX_VERSION_KEY}:counter"))
+	build_key = make_key(SEARCH_INDEX_BUILD_KEY)
 
+	cache.delete(build_key)
+	super(RedisWrapper, cache).hset(
+		build_key, mapping={"version": version, "status": "Building", "started_at": time.time()}
+	)
+
+	index = cache.ft(get_index_name(version))
 	try:
-		index.dropindex()  # drop if already exists
-	except ResponseError:
-		# will most likely raise a ResponseError if index does not exist
-		# ignore and create index
-		pass
+		create_index(index, version)
+		reindex_all_web_items(version)
+
+		if not current_version:
+			# the alias takes the name of the unversioned index, its documents go after the switch
+			drop_unversioned_index()
+
+		index.aliasupdate(make_key(WEBSITE_ITEM_INDEX))
+		cache.set(make_key(SEARCH_INDEX_VERSION_KEY), version)
+		super(RedisWrapper, cache).hset(
+			build_key, mapping={"status": "Completed", "finished_at": time.time()}
+		)
+		stale_version = current_version
 	except Exception:
-		raise_redisearch_error()
+		frappe.log_error("Redisearch Index Build Error")
+		super(RedisWrapper, cache).hset(
+			build_key, mapping={"status": "Failed", "finished_at": time.time()}
+		)
+		# the alias still points to the current index, drop the partial one
+		stale_version = version
+	finally:
+		cache.delete(lock_key)
+
+	if stale_version:
+		try:
+			cache.ft(get_index_name(stale_version)).dropindex(delete_documents=True)
+		except ResponseError:
+			pass
+	else:
+		# first versioned build, the alias already serves it
+		delete_unversioned_documents()
 
-	idx_def = IndexDefinition([make_key(WEBSITE_ITEM_KEY_PREFIX)])
+	define_autocomplete_dictionary()
+
+
+def create_index(index, version):
+	idx_def = IndexDefinition([make_key(get_key_prefix(version))])
 
 	# Index fields mentioned in webshop settings
 	idx_fields = frappe.db.get_single_value("Webshop Settings", "search_index_fields")
@@ -87,14 +215,85 @@ def create_website_items_index():
 
 	idx_fields = [to_search_field(f) for f in idx_fields]
 
-	# TODO: sortable?
+	# sorting and filtering of search results, see `get_search_filter_query`
+	idx_fields += [NumericField("ranking", sortable=True), NumericField("published")]
+	idx_fields += [
+		TagField(get_tag_field(field), separator=TAG_SEPARATOR) for field in get_tag_fields()
+	]
+
 	index.create_index(
 		[TextField("web_item_name", sortable=True)] + idx_fields,
 		definition=idx_def,
 	)
 
-	reindex_all_web_items()
-	define_autocomplete_dictionary()
+
+def drop_unversioned_index():
+	"""
+	Drop the index created before versioning, its name is taken by the alias.
+	Documents are kept, the definition alone is dropped instantly.
+	"""
+	try:
+		frappe.cache().ft(WEBSITE_ITEM_INDEX).dropindex(delete_documents=False)
+	except ResponseError:
+		# does not exist
+		pass
+
+
+def delete_unversioned_documents():
+	"""Delete documents of the index created before versioning, once no index serves them."""
+	cache = frappe.cache()
+	pipeline = cache.pipeline(transaction=False)
+	for key in cache.scan_iter(match=make_key(f"{WEBSITE_ITEM_KEY_PREFIX}*")):
+		pipeline.delete(key)
+	pipeline.execute()
+
+
+def get_index_version():
+	"Version of the index behind the alias, 0 for the unversioned index."
+	return frappe.utils.cint(frappe.cache().get(make_key(SEARCH_INDEX_VERSION_KEY)))
+
+
+def get_live_index_versions():
+	"Versions documents are written to: the current one and the one being built."
+	cache = frappe.cache()
+	versions = {get_index_version()}
+
+	build = super(RedisWrapper, cache).hgetall(make_key(SEARCH_INDEX_BUILD_KEY))
+	if frappe.safe_decode(build.get(b"status")) == "Building":
+		versions.add(frappe.utils.cint(build.get(b"version")))
+
+	return versions
+
+
+def get_index_name(version):
+	return f"{WEBSITE_ITEM_INDEX}_v{version}" if version else WEBSITE_ITEM_INDEX
+
+
+def get_key_prefix(version):
+	return f"website_item_v{version}:" if version else WEBSITE_ITEM_KEY_PREFIX
+
+
+@frappe.whitelist()
+def get_search_index_status():
+	"Current index version, and progress of the last index build."
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	build = super(RedisWrapper, cache).hgetall(make_key(SEARCH_INDEX_BUILD_KEY))
+	build = {frappe.safe_decode(key): frappe.safe_decode(value) for key, value in build.items()}
+
+	return {
+		"version": get_index_version(),
+		"build": {
+			"version": frappe.utils.cint(build.get("version")),
+			"status": build.get("status"),
+			"indexed": frappe.utils.cint(build.get("indexed")),
+			"total": frappe.utils.cint(build.get("total")),
+			"started_at": frappe.utils.flt(build.get("started_at")),
+			"finished_at": frappe.utils.flt(build.get("finished_at")),
+		},
+		"last_reindex": cache.get_value(SEARCH_INDEX_STATS_KEY),
+	}
 
 
 def to_search_field(field):
@@ -107,12 +306,12 @@ def to_search_field(field):
 @if_redisearch_enabled
 def insert_item_to_index(website_item_doc):
 	# Insert item to index
-	key = get_cache_key(website_item_doc.name)
 	cache = frappe.cache()
 	web_item = create_web_item_map(website_item_doc)
 
-	for field, value in web_item.items():
-		super(RedisWrapper, cache).hset(make_key(key), field, value)
+	for version in get_live_index_versions():
+		key = get_cache_key(website_item_doc.name, version)
+		super(RedisWrapper, cache).hset(make_key(key), mapping=web_item)
 
 	insert_to_name_ac(website_item_doc.web_item_name, website_item_doc.name)
 
@@ -123,30 +322,156 @@ def insert_to_name_ac(web_name, doc_name):
 	ac.sugadd(WEBSITE_ITEM_NAME_AUTOCOMPLETE, Suggestion(web_name, payload=doc_name))
 
 
-def create_web_item_map(website_item_doc):
-	fields_to_index = get_fields_indexed()
+def create_web_item_map(website_item_doc, fields_to_index=None, tag_fields=None):
+	fields_to_index = fields_to_index or get_fields_indexed()
+	tag_fields = get_tag_fields() if tag_fields is None else tag_fields
 	web_item = {}
 
 	for field in fields_to_index:
 		web_item[field] = website_item_doc.get(field) or ""
 
+	# an empty numeric field keeps the document out of the index
+	web_item["ranking"] = frappe.utils.cint(website_item_doc.get("ranking"))
+	web_item["published"] = frappe.utils.cint(website_item_doc.get("published"))
+
+	for field, table in tag_fields.items():
+		web_item[get_tag_field(field)] = get_tag_values(website_item_doc, field, table)
+
 	return web_item
 
 
+def get_tag_fields():
+	"""
+	Website Item fields search results can be filtered by, indexed as tags:
+	item group, brand and the filter fields of Webshop Settings.
+
+	Returns:
+	        dict: {fieldname: (child doctype, child fieldname) for Table MultiSelect fields, else None}
+	"""
+	meta = frappe.get_meta("Website Item", cached=True)
+	filter_fields = [row.fieldname for row in frappe.get_cached_doc("Webshop Settings").filter_fields]
+	tag_fields = {}
+
+	for field in ["item_group", "brand"] + filter_fields:
+		df = meta.get_field(field)
+		if not df or field in tag_fields:
+			continue
+
+		if df.fieldtype == "Table MultiSelect":
+			child_fields = frappe.get_meta(df.options, cached=True).get("fields")
+			if child_fields:
+				tag_fields[field] = (df.options, child_fields[0].fieldname)
+		else:
+			tag_fields[field] = None
+
+	return tag_fields
+
+
+def get_tag_field(field):
+	return f"{field}_tags"
+
+
+def get_tag_values(website_item_doc, field, table=None):
+	if table:
+		values = [row.get(table[1]) for row in website_item_doc.get(field) or []]
+	else:
+		values = [website_item_doc.get(field)]
+
+	if field == "item_group":
+		# listings of an item group include items of its Website Item Groups
+		values += [row.item_group for row in website_item_doc.get("website_item_groups") or []]
+
+	return TAG_SEPARATOR.join(dict.fromkeys(value for value in values if value))
+
+
+def set_tag_tables(items, tag_fields):
+	"Load the child rows `get_tag_values` reads on Website Items fetched with get_all."
+	tables = {"website_item_groups": ("Website Item Group", "item_group")}
+	tables.update({field: table for field, table in tag_fields.items() if table})
+	names = [item.name for item in items]
+
+	for field, (doctype, child_field) in tables.items():
+		rows = {}
+		for row in frappe.get_all(
+			doctype,
+			filters={"parenttype": "Website Item", "parentfield": field, "parent": ["in", names]},
+			fields=["parent", child_field],
+			order_by="idx",
+		):
+			rows.setdefault(row.parent, []).append(row)
+
+		for item in items:
+			item[field] = rows.get(item.name, [])
+
+
+def get_search_filter_query(item_group=None, field_filters=None):
+	"""
+	Query clause restricting search results to published items of `item_group`
+	matching `field_filters`, as `ProductQuery` does for listings.
+
+	Args:
+	        item_group (str, optional): Item Group, including descendants if set on the group
+	        field_filters (dict, optional): {fieldname: value or list of values}
+	"""
+	from webshop.webshop.doctype.override_doctype.item_group import get_child_groups_for_website
+
+	clauses = ["@published:[1 1]"]
+	tag_fields = get_tag_fields()
+
+	if item_group:
+		item_groups = [item_group]
+		if frappe.db.get_value("Item Group", item_group, "include_descendants"):
+			item_groups += [d.name for d in get_child_groups_for_website(item_group)]
+
+		clauses.append(get_tag_clause("item_group", item_groups))
+
+	for field, values in (field_filters or {}).items():
+		# only fields indexed as tags can be filtered by (eg. not discount)
+		if not values or field not in tag_fields:
+			continue
+
+		clauses.append(get_tag_clause(field, values if isinstance(values, list) else [values]))
+
+	return " ".join(clauses)
+
+
+def get_tag_clause(field, values):
+	values = "|".join(re.sub(r"(\W)", r"\\\1", frappe.utils.cstr(value)) for value in values)
+	return f"@{get_tag_field(field)}:{{{values}}}"
+
+
 @if_redisearch_enabled
 def update_index_for_item(website_item_doc):
-	# Reinsert to Cache
-	insert_item_to_index(website_item_doc)
-	define_autocomplete_dictionary()
+	"""Reindex the item and update its name suggestion, unpublished items are removed."""
+	previous = website_item_doc.get_doc_before_save()
+	previous_name = previous.web_item_name if previous else None
+
+	if website_item_doc.published:
+		insert_item_to_index(website_item_doc)
+	else:
+		delete_item_from_index(website_item_doc)
+
+	if previous_name and previous_name != website_item_doc.web_item_name:
+		delete_name_suggestion(previous_name)
+
+
+@if_redisearch_enabled
+def rename_item_in_index(website_item_doc, method=None, old_name=None, new_name=None, merge=False):
+	"Website Item hook: move the item to the key of its new name."
+	for version in get_live_index_versions():
+		frappe.cache().delete(make_key(get_cache_key(old_name, version)))
+
+	if website_item_doc.published:
+		insert_item_to_index(website_item_doc)
 
 
 @if_redisearch_enabled
 def delete_item_from_index(website_item_doc):
 	cache = frappe.cache()
-	key = get_cache_key(website_item_doc.name)
 
 	try:
-		cache.delete(key)
+		for version in get_live_index_versions():
+			cache.delete(make_key(get_cache_key(website_item_doc.name, version)))
 	except Exception:
 		raise_redisearch_error()
 
@@ -157,8 +482,42 @@ def delete_item_from_index(website_item_doc):
 @if_redisearch_enabled
 def delete_from_ac_dict(website_item_doc):
 	"""Removes this items's name from autocomplete dictionary"""
-	ac = frappe.cache().ft()
-	ac.sugdel(website_item_doc.web_item_name)
+	delete_name_suggestion(website_item_doc.web_item_name, exclude=website_item_doc.name)
+
+
+def delete_name_suggestion(web_item_name, exclude=None):
+	# the suggestion is shared by published items with the same name
+	if frappe.db.exists(
+		"Website Item",
+		{"web_item_name": web_item_name, "published": 1, "name": ["!=", exclude or ""]},
+	):
+		return
+
+	frappe.cache().ft().sugdel(WEBSITE_ITEM_NAME_AUTOCOMPLETE, web_item_name)
+
+
+@if_redisearch_enabled
+def update_item_group_suggestion(item_group_doc):
+	"""Add, update or remove the suggestion of an Item Group after it is saved."""
+	# replaced as a whole, route and weightage may have changed
+	delete_item_group_suggestion(item_group_doc.name)
+
+	if item_group_doc.show_in_website:
+		frappe.cache().ft().sugadd(
+			WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE, make_item_group_suggestion(item_group_doc)
+		)
+
+
+@if_redisearch_enabled
+def rename_item_group_suggestion(item_group_doc, method=None, old_name=None, new_name=None, merge=False):
+	"Item Group hook: replace the suggestion of the old name."
+	delete_item_group_suggestion(old_name)
+	update_item_group_suggestion(item_group_doc)
+
+
+@if_redisearch_enabled
+def delete_item_group_suggestion(item_group):
+	frappe.cache().ft().sugdel(WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE, item_group)
 
 
 @if_redisearch_enabled
@@ -166,35 +525,48 @@ def define_autocomplete_dictionary():
 	"""
 	Defines/Redefines an autocomplete search dictionary for Website Item Name.
 	Also creats autocomplete dictionary for Published Item Groups.
-	"""
 
+	Dictionaries are built under temporary keys and renamed over the current ones,
+	so suggestions are served during the rebuild. Scheduled daily to compact
+	suggestions that drifted from incremental updates.
+	"""
 	cache = frappe.cache()
 
-	# Delete both autocomplete dicts
-	try:
-		cache.delete(make_key(WEBSITE_ITEM_NAME_AUTOCOMPLETE))
-		cache.delete(make_key(WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE))
-	except Exception:
-		raise_redisearch_error()
+	for dictionary, build in (
+		(WEBSITE_ITEM_NAME_AUTOCOMPLETE, create_items_autocomplete_dict),
+		(WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE, create_item_groups_autocomplete_dict),
+	):
+		temp_dictionary = f"{dictionary}_rebuild"
+		try:
+			cache.delete(make_key(temp_dictionary))
+			build(temp_dictionary)
 
-	create_items_autocomplete_dict()
-	create_item_groups_autocomplete_dict()
+			if super(RedisWrapper, cache).exists(make_key(temp_dictionary)):
+				cache.rename(make_key(temp_dictionary), make_key(dictionary))
+			else:
+				# nothing to suggest
+				cache.delete(make_key(dictionary))
+		except Exception:
+			raise_redisearch_error()
 
 
 @if_redisearch_enabled
-def create_items_autocomplete_dict():
+def create_items_autocomplete_dict(dictionary=WEBSITE_ITEM_NAME_AUTOCOMPLETE):
 	"Add items as suggestions in Autocompleter."
 
 	ac = frappe.cache().ft()
-	items = frappe.get_all(
-		"Website Item", fields=["web_item_name", "item_group"], filters={"published": 1}
-	)
-	for item in items:
-		ac.sugadd(WEBSITE_ITEM_NAME_AUTOCOMPLETE, Suggestion(item.web_item_name))
+	items = frappe.get_all("Website Item", fields=["web_item_name"], filters={"published": 1})
+
+	# sugadd sends its suggestions in one pipeline
+	for start in range(0, len(items), INDEXING_CHUNK_SIZE):
+		ac.sugadd(
+			dictionary,
+			*[Suggestion(item.web_item_name) for item in items[start : start + INDEXING_CHUNK_SIZE]],
+		)
 
 
 @if_redisearch_enabled
-def create_item_groups_autocomplete_dict():
+def create_item_groups_autocomplete_dict(dictionary=WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE):
 	"Add item groups with weightage as suggestions in Autocompleter."
 
 	published_item_groups = frappe.get_all(
@@ -204,45 +576,102 @@ def create_item_groups_autocomplete_dict():
 		return
 
 	ac = frappe.cache().ft()
+	ac.sugadd(
+		dictionary,
+		*[make_item_group_suggestion(item_group) for item_group in published_item_groups],
+	)
 
-	for item_group in published_item_groups:
-		payload = json.dumps({"name": item_group.name, "route": item_group.route})
-		ac.sugadd(
-			WEBSITE_ITEM_CATEGORY_AUTOCOMPLETE,
-			Suggestion(
-				string=item_group.name,
-				score=frappe.utils.flt(item_group.weightage) or 1.0,
-				payload=payload,  # additional info that can be retrieved later
-			),
-		)
+
+def make_item_group_suggestion(item_group):
+	return Suggestion(
+		string=item_group.name,
+		score=frappe.utils.flt(item_group.weightage) or 1.0,
+		# additional info that can be retrieved later
+		payload=json.dumps({"name": item_group.name, "route": item_group.route}),
+	)
 
 
 @if_redisearch_enabled
-def reindex_all_web_items():
-	items = frappe.get_all("Website Item", fields=get_fields_indexed(), filters={"published": True})
+def reindex_all_web_items(version=None):
+	"""
+	Write all published Website Items to the index, one HSET per item and one
+	pipeline per chunk of `INDEXING_CHUNK_SIZE` items.
 
+	Args:
+	        version (int, optional): Version of the index being built, defaults to the current index
+
+	Returns:
+	        dict: number of indexed items, duration and throughput
+	"""
+	# progress is only tracked for builds, see `get_search_index_status`
+	track_progress = version is not None
+	if version is None:
+		version = get_index_version()
+
+	start_time = time.monotonic()
+	fields = get_fields_indexed()
+	tag_fields = get_tag_fields()
+	total = frappe.db.count("Website Item", {"published": 1})
 	cache = frappe.cache()
-	for item in items:
-		web_item = create_web_item_map(item)
-		key = make_key(get_cache_key(item.name))
+	build_key = make_key(SEARCH_INDEX_BUILD_KEY)
+	indexed = 0
+
+	while indexed < total:
+		items = frappe.get_all(
+			"Website Item",
+			fields=fields,
+			filters={"published": True},
+			order_by="name",
+			limit_start=indexed,
+			limit_page_length=INDEXING_CHUNK_SIZE,
+		)
+		if not items:
+			break
+
+		set_tag_tables(items, tag_fields)
+
+		pipeline = cache.pipeline(transaction=False)
+		for item in items:
+			key = make_key(get_cache_key(item.name, version))
+			pipeline.hset(key, mapping=create_web_item_map(item, fields, tag_fields))
+		pipeline.execute()
+
+		indexed += len(items)
+		if track_progress:
+			super(RedisWrapper, cache).hset(build_key, mapping={"indexed": indexed, "total": total})
+		frappe.publish_progress(
+			indexed * 100 / total, title=_("Indexing Website Items"), description=f"{indexed}/{total}"
+		)
+
+	duration = time.monotonic() - start_time
+	stats = {
+		"items": indexed,
+		"duration": frappe.utils.flt(duration, 3),
+		"items_per_sec": frappe.utils.flt(indexed / duration, 1) if duration else 0,
+	}
+	frappe.cache().set_value(SEARCH_INDEX_STATS_KEY, stats)
+
+	return stats
 
-		for field, value in web_item.items():
-			super(RedisWrapper, cache).hset(key, field, value)
 
+def get_cache_key(name, version=None):
+	if version is None:
+		version = get_index_version()
 
-def get_cache_key(name):
 	name = frappe.scrub(name)
-	return f"{WEBSITE_ITEM_KEY_PREFIX}{name}"
+	return f"{get_key_prefix(version)}{name}"
 
 
 def get_fields_indexed():
 	fields_to_index = frappe.db.get_single_value("Webshop Settings", "search_index_fields")
 	fields_to_index = fields_to_index.split(",") if fields_to_index else []
 
-	mandatory_fields = ["name", "web_item_name", "route", "thumbnail", "ranking"]
-	fields_to_index = fields_to_index + mandatory_fields
+	mandatory_fields = ["name", "web_item_name", "route", "thumbnail", "ranking", "published"]
+	# columns of filter fields, values of Table MultiSelect fields are loaded by `set_tag_tables`
+	tag_fields = [field for field, table in get_tag_fields().items() if not table]
+	fields_to_index = fields_to_index + mandatory_fields + tag_fields
 
-	return fields_to_index
+	return list(dict.fromkeys(fields_to_index))
 
 
 def raise_redisearch_error():
@@ -19,7 +19,7 @@ from erpnext.utilities.product import get_price
 from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 	get_shopping_cart_settings,
 )
-from webshop.webshop.utils.product import get_web_item_qty_in_stock
+from webshop.webshop.utils.product import get_stock_for_items
 from erpnext.selling.doctype.quotation.quotation import _make_sales_order
 from erpnext.accounts.doctype.loyalty_program.loyalty_program import (
 	get_loyalty_program_details_with_points,
@@ -211,16 +211,22 @@ def place_order():
 			sales_order.skip_delivery_note = 1
 
 	if not cint(cart_settings.allow_items_not_in_stock):
-		for item in sales_order.get("items"):
-			item.warehouse = frappe.db.get_value(
-				"Website Item", {"item_code": item.item_code}, "website_warehouse"
+		item_codes = [item.item_code for item in sales_order.get("items")]
+		website_warehouses = dict(
+			frappe.get_all(
+				"Website Item",
+				filters={"item_code": ["in", item_codes]},
+				fields=["item_code", "website_warehouse"],
+				as_list=True,
 			)
-			is_stock_item = frappe.db.get_value("Item", item.item_code, "is_stock_item")
+		)
+		stock = get_stock_for_items(item_codes, "website_warehouse", cached=False)
 
-			if is_stock_item:
-				item_stock = get_web_item_qty_in_stock(
-					item.item_code, "website_warehouse"
-				)
+		for item in sales_order.get("items"):
+			item.warehouse = website_warehouses.get(item.item_code)
+
+			item_stock = stock[item.item_code]
+			if item_stock.is_stock_item:
 				if not cint(item_stock.in_stock):
 					throw(_("{0} Not in Stock").format(item.item_code))
 				if item.qty > item_stock.stock_qty:
@@ -2,6 +2,7 @@
 # License: GNU General Public License v3. See license.txt
 
 import frappe
+from frappe.utils import cint, flt, fmt_money
 
 from webshop.webshop.doctype.webshop_settings.webshop_settings import (
     get_shopping_cart_settings,
@@ -91,6 +92,135 @@ def get_product_info_for_website(item_code, skip_quotation_creation=False):
 	return frappe._dict({"product_info": product_info, "cart_settings": cart_settings})
 
 
+def get_prices_for_website_items(item_codes, cart_settings=None):
+	"""
+	Get website prices for a list of items at once.
+	Rates and discounts are read from Website Item Price (default customer group),
+	customers with Pricing Rules of their own are priced per item.
+	"""
+	cart_settings = cart_settings or get_shopping_cart_settings()
+	if not (item_codes and cart_settings.enabled and cart_settings.show_price):
+		return {}
+
+	# Show Price if logged in.
+	# If not logged in, check if price is hidden for guest.
+	if frappe.session.user == "Guest" and cart_settings.hide_price_for_guest:
+		return {}
+
+	selling_price_list = _set_price_list(cart_settings, None)
+	party = get_party()
+
+	if party and party.doctype == "Customer" and has_customer_pricing_rules(party.name):
+		return get_prices_per_item(item_codes, selling_price_list, cart_settings, party)
+
+	rows = frappe.get_all(
+		"Website Item Price",
+		filters={"price_list": selling_price_list, "item_code": ["in", item_codes]},
+		fields=["item_code", "price_list_rate", "effective_rate", "discount_percent", "discount_rate"],
+	)
+	if not rows:
+		return {}
+
+	currency = frappe.get_cached_value("Price List", selling_price_list, "currency") or ""
+	currency_symbol = get_currency_symbol(currency)
+	conversion_factors = get_sales_uom_conversion_factors([row.item_code for row in rows])
+
+	prices = {}
+	for row in rows:
+		rate = flt(row.effective_rate)
+		price = frappe._dict(
+			price_list_rate=rate,
+			currency=currency,
+			currency_symbol=currency_symbol,
+			formatted_price=fmt_money(rate, currency=currency),
+			formatted_price_sales_uom=fmt_money(
+				rate * flt(conversion_factors.get(row.item_code, 1)), currency=currency
+			),
+		)
+
+		# same keys as `get_price` sets for the applied Pricing Rule
+		if flt(row.discount_rate):
+			price.formatted_discount_rate = fmt_money(row.discount_rate, currency=currency)
+		elif flt(row.discount_percent):
+			price.discount_percent = flt(row.discount_percent)
+			price.formatted_discount_percent = str(flt(row.discount_percent, 0)) + "%"
+
+		if flt(row.price_list_rate) != rate:
+			price.formatted_mrp = fmt_money(row.price_list_rate, currency=currency)
+
+		prices[row.item_code] = price
+
+	return prices
+
+
+def get_prices_per_item(item_codes, selling_price_list, cart_settings, party):
+	"""Price items that have an Item Price of their own or via their template with `get_price`."""
+	templates = dict(
+		frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes]},
+			fields=["name", "variant_of"],
+			as_list=True,
+		)
+	)
+	priced_items = set(
+		frappe.get_all(
+			"Item Price",
+			filters={
+				"price_list": selling_price_list,
+				"item_code": ["in", list(set(item_codes) | {t for t in templates.values() if t})],
+			},
+			pluck="item_code",
+		)
+	)
+
+	prices = {}
+	for item_code in item_codes:
+		if item_code in priced_items or templates.get(item_code) in priced_items:
+			prices[item_code] = get_price(
+				item_code,
+				selling_price_list,
+				cart_settings.default_customer_group,
+				cart_settings.company,
+				party=party,
+			)
+
+	return prices
+
+
+def has_customer_pricing_rules(customer):
+	"""Pricing Rules that apply to `customer` only are not in Website Item Price."""
+	return bool(
+		frappe.db.exists(
+			"Pricing Rule",
+			{"selling": 1, "disable": 0, "applicable_for": "Customer", "customer": customer},
+		)
+	)
+
+
+def get_currency_symbol(currency):
+	if cint(frappe.db.get_default("hide_currency_symbol")):
+		return ""
+
+	return frappe.db.get_value("Currency", currency, "symbol", cache=True) or currency
+
+
+def get_sales_uom_conversion_factors(item_codes):
+	"""Return {item_code: conversion factor of the sales UOM} for `item_codes`."""
+	item = frappe.qb.DocType("Item")
+	uom_detail = frappe.qb.DocType("UOM Conversion Detail")
+
+	return dict(
+		(
+			frappe.qb.from_(uom_detail)
+			.join(item)
+			.on((uom_detail.parent == item.name) & (uom_detail.uom == item.sales_uom))
+			.select(item.name, uom_detail.conversion_factor)
+			.where(item.name.isin(item_codes))
+		).run()
+	)
+
+
 def set_product_info_for_website(item):
 	"""set product price uom for website"""
 	product_info = get_product_info_for_website(
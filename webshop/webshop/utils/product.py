@@ -1,97 +1,283 @@
 import frappe
-from frappe.utils import getdate, nowdate
+from frappe.utils import floor, flt, getdate, nowdate
 
-from erpnext.stock.doctype.batch.batch import get_batch_qty
 from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
 
+CHILD_WAREHOUSES_CACHE_KEY = "webshop_child_warehouses"
+PRODUCT_BUNDLES_CACHE_KEY = "webshop_product_bundles"
+
 
 def get_web_item_qty_in_stock(item_code, item_warehouse_field, warehouse=None):
-	in_stock, stock_qty = 0, ""
-	template_item_code, is_stock_item = frappe.db.get_value(
-		"Item", item_code, ["variant_of", "is_stock_item"]
-	)
+	return get_stock_for_items([item_code], item_warehouse_field, warehouse)[item_code]
+
+
+def get_stock_for_items(item_codes, item_warehouse_field, warehouse=None, cached=True):
+	"""
+	Stock of items in their website warehouse (and its children), net of expired batches.
+
+	Args:
+	        item_codes (list): Item codes
+	        item_warehouse_field (str): Website Item field holding the warehouse, used
+	                for variants without one from their template's Website Item
+	        warehouse (str, optional): Warehouse of all items, instead of the Website Item's
+	        cached (bool, optional): Read from the sellable stock cache, set to False
+	                where the quantity must be exact (eg. placing an order)
+
+	Returns:
+	        dict: {item_code: {"in_stock": 0/1, "stock_qty": float, "is_stock_item": 0/1}}
+	"""
+	from webshop.webshop.utils.sellable_stock import get_cached_sellable_qty
 
-	if not warehouse:
-		warehouse = frappe.db.get_value("Website Item", {"item_code": item_code}, item_warehouse_field)
+	item_codes = list(set(item_codes))
+	if not item_codes:
+		return {}
 
-	if not warehouse and template_item_code and template_item_code != item_code:
-		warehouse = frappe.db.get_value(
-			"Website Item", {"item_code": template_item_code}, item_warehouse_field
+	items = {
+		item.name: item
+		for item in frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes]},
+			fields=["name", "variant_of", "is_stock_item"],
 		)
+	}
 
-	if warehouse and frappe.get_cached_value("Warehouse", warehouse, "is_group") == 1:
-		warehouses = get_child_warehouses(warehouse)
+	item_warehouses = get_item_warehouses(items, item_warehouse_field, warehouse)
+	if cached:
+		sellable_qty = get_cached_sellable_qty(item_warehouses)
 	else:
-		warehouses = [warehouse] if warehouse else []
-
-	total_stock = 0.0
-	if warehouses:
-		for warehouse in warehouses:
-			stock_qty = frappe.db.sql(
-				"""
-				select S.actual_qty / IFNULL(C.conversion_factor, 1)
-				from tabBin S
-				inner join `tabItem` I on S.item_code = I.Item_code
-				left join `tabUOM Conversion Detail` C on I.sales_uom = C.uom and C.parent = I.Item_code
-				where S.item_code=%s and S.warehouse=%s""",
-				(item_code, warehouse),
-			)
-
-			if stock_qty:
-				total_stock += adjust_qty_for_expired_items(item_code, stock_qty, warehouse)
-
-		in_stock = total_stock > 0 and 1 or 0
-
-	return frappe._dict(
-		{"in_stock": in_stock, "stock_qty": total_stock, "is_stock_item": is_stock_item}
-	)
+		sellable_qty = get_sellable_qty(item_warehouses)
+
+	out = {}
+	for item_code in item_codes:
+		item = items.get(item_code) or frappe._dict()
+		total_stock = sellable_qty.get(item_code, 0.0)
+
+		out[item_code] = frappe._dict(
+			{
+				"in_stock": total_stock > 0 and 1 or 0,
+				"stock_qty": total_stock,
+				"is_stock_item": item.is_stock_item,
+			}
+		)
 
+	return out
 
-def adjust_qty_for_expired_items(item_code, stock_qty, warehouse):
-	batches = frappe.get_all("Batch", filters=[{"item": item_code}], fields=["expiry_date", "name"])
-	expired_batches = get_expired_batches(batches)
-	stock_qty = [list(item) for item in stock_qty]
 
-	for batch in expired_batches:
+def get_sellable_qty(item_warehouses):
+	"""
+	Stock of items in sales UOM net of expired batches, summed over the warehouse tree.
+
+	Args:
+	        item_warehouses (dict): {item_code: website warehouse}
+
+	Returns:
+	        dict: {item_code: qty}
+	"""
+	warehouse_tree = {
+		warehouse: get_warehouse_tree(warehouse) for warehouse in set(item_warehouses.values())
+	}
+	if not warehouse_tree:
+		return {}
+
+	all_warehouses = list({w for warehouses in warehouse_tree.values() for w in warehouses})
+	stock_qty = get_bin_qty(list(item_warehouses), all_warehouses)
+
+	expired_qty = get_expired_batch_qty(list({key[0] for key in stock_qty}), all_warehouses)
+	for key, qty in expired_qty.items():
+		if key in stock_qty:
+			stock_qty[key] = max(0, stock_qty[key] - qty)
+
+	return {
+		item_code: sum(stock_qty.get((item_code, w), 0.0) for w in warehouse_tree[warehouse])
+		for item_code, warehouse in item_warehouses.items()
+	}
+
+
+def get_item_warehouses(items, item_warehouse_field, warehouse=None):
+	"""{item_code: warehouse} of items, falling back to the template's warehouse for variants."""
+	if warehouse:
+		return {item_code: warehouse for item_code in items}
+
+	templates = {item.variant_of for item in items.values() if item.variant_of}
+	website_warehouses = dict(
+		frappe.get_all(
+			"Website Item",
+			filters={"item_code": ["in", list(set(items) | templates)]},
+			fields=["item_code", item_warehouse_field],
+			as_list=True,
+		)
+	)
+
+	item_warehouses = {}
+	for item_code, item in items.items():
+		warehouse = website_warehouses.get(item_code)
+		if not warehouse and item.variant_of and item.variant_of != item_code:
+			warehouse = website_warehouses.get(item.variant_of)
+
 		if warehouse:
-			stock_qty[0][0] = max(0, stock_qty[0][0] - get_batch_qty(batch, warehouse))
-		else:
-			stock_qty[0][0] = max(0, stock_qty[0][0] - qty_from_all_warehouses(get_batch_qty(batch)))
+			item_warehouses[item_code] = warehouse
+
+	return item_warehouses
+
+
+def get_warehouse_tree(warehouse):
+	"""`warehouse` and its children if it is a group, cached until a Warehouse changes."""
+	if frappe.get_cached_value("Warehouse", warehouse, "is_group") != 1:
+		return [warehouse]
+
+	return frappe.cache().hget(
+		CHILD_WAREHOUSES_CACHE_KEY, warehouse, generator=lambda: get_child_warehouses(warehouse)
+	)
 
-		if not stock_qty[0][0]:
-			break
 
-	return stock_qty[0][0] if stock_qty else 0
+def clear_warehouse_tree_cache():
+	frappe.cache().delete_value(CHILD_WAREHOUSES_CACHE_KEY)
 
 
-def get_expired_batches(batches):
+def get_bin_qty(item_codes, warehouses):
+	"""{(item_code, warehouse): actual qty in the sales UOM of the item}"""
+	rows = frappe.db.sql(
+		"""
+		select S.item_code, S.warehouse, S.actual_qty / IFNULL(C.conversion_factor, 1)
+		from tabBin S
+		inner join `tabItem` I on S.item_code = I.Item_code
+		left join `tabUOM Conversion Detail` C on I.sales_uom = C.uom and C.parent = I.Item_code
+		where S.item_code in %(item_codes)s and S.warehouse in %(warehouses)s""",
+		{"item_codes": tuple(item_codes), "warehouses": tuple(warehouses)},
+	)
+
+	return {(item_code, warehouse): flt(qty) for item_code, warehouse, qty in rows}
+
+
+def get_expired_batch_qty(item_codes, warehouses):
 	"""
-	:param batches: A list of dict in the form [{'expiry_date': datetime.date(20XX, 1, 1), 'name': 'batch_id'}, ...]
+	{(item_code, warehouse): qty} of batches expired as of today, from
+	Serial and Batch Bundles and from stock ledger entries made before them.
 	"""
-	return [b.name for b in batches if b.expiry_date and b.expiry_date <= getdate(nowdate())]
+	if not item_codes:
+		return {}
+
+	rows = frappe.db.sql(
+		"""
+		select item_code, warehouse, sum(qty)
+		from (
+			select bundle.item_code, entry.warehouse, entry.qty
+			from `tabSerial and Batch Entry` entry
+			inner join `tabSerial and Batch Bundle` bundle on entry.parent = bundle.name
+			inner join `tabBatch` batch on entry.batch_no = batch.name
+			where bundle.item_code in %(item_codes)s and entry.warehouse in %(warehouses)s
+				and bundle.docstatus = 1 and bundle.is_cancelled = 0
+				and bundle.type_of_transaction in ('Inward', 'Outward')
+				and batch.expiry_date <= %(today)s
+			union all
+			select sle.item_code, sle.warehouse, sle.actual_qty
+			from `tabStock Ledger Entry` sle
+			inner join `tabBatch` batch on sle.batch_no = batch.name
+			where sle.item_code in %(item_codes)s and sle.warehouse in %(warehouses)s
+				and sle.is_cancelled = 0 and IFNULL(sle.serial_and_batch_bundle, '') = ''
+				and batch.expiry_date <= %(today)s
+		) expired
+		group by item_code, warehouse""",
+		{
+			"item_codes": tuple(item_codes),
+			"warehouses": tuple(warehouses),
+			"today": getdate(nowdate()),
+		},
+	)
+
+	return {(item_code, warehouse): flt(qty) for item_code, warehouse, qty in rows}
+
+
+def get_non_stock_item_status(item_code, item_warehouse_field):
+	return get_non_stock_items_status([item_code], item_warehouse_field)[item_code]
 
 
-def qty_from_all_warehouses(batch_info):
+def get_non_stock_items_status(item_codes, item_warehouse_field):
 	"""
-	:param batch_info: A list of dict in the form [{u'warehouse': u'Stores - I', u'qty': 0.8}, ...]
+	Availability of non stock items: product bundles are available if at least one
+	complete bundle is in stock, other items always are.
+
+	Returns:
+	        dict: {item_code: 0/1}
 	"""
-	qty = 0
-	for batch in batch_info:
-		qty = qty + batch.qty
+	product_bundles = get_product_bundles()
+	bundle_stock = get_bundle_stock(
+		[item_code for item_code in item_codes if item_code in product_bundles],
+		item_warehouse_field,
+	)
 
-	return qty
+	return {
+		item_code: bundle_stock[item_code].in_stock if item_code in bundle_stock else 1
+		for item_code in item_codes
+	}
 
 
-def get_non_stock_item_status(item_code, item_warehouse_field):
-	# if item is a product bundle, check if its bundle items are in stock
-	if frappe.db.exists("Product Bundle", item_code):
-		items = frappe.get_doc("Product Bundle", item_code).get_all_children()
-		bundle_warehouse = frappe.db.get_value(
-			"Website Item", {"item_code": item_code}, item_warehouse_field
+def get_bundle_stock(bundle_codes, item_warehouse_field):
+	"""
+	Number of complete bundles that can be sold from the bundle's website warehouse,
+	i.e. the minimum over components of component stock / component qty.
+	Components of a bundle without a warehouse use their own website warehouse.
+
+	Returns:
+	        dict: {bundle item_code: {"in_stock": 0/1, "stock_qty": int}}
+	"""
+	if not bundle_codes:
+		return {}
+
+	product_bundles = get_product_bundles()
+	bundle_warehouses = dict(
+		frappe.get_all(
+			"Website Item",
+			filters={"item_code": ["in", bundle_codes]},
+			fields=["item_code", item_warehouse_field],
+			as_list=True,
 		)
-		return all(
-			get_web_item_qty_in_stock(d.item_code, item_warehouse_field, bundle_warehouse).in_stock
-			for d in items
+	)
+
+	# one bulk stock lookup per bundle warehouse
+	components_by_warehouse = {}
+	for bundle in bundle_codes:
+		components_by_warehouse.setdefault(bundle_warehouses.get(bundle), set()).update(
+			item_code for item_code, qty in product_bundles[bundle]
 		)
-	else:
-		return 1
+
+	component_stock = {
+		warehouse: get_stock_for_items(list(components), item_warehouse_field, warehouse)
+		for warehouse, components in components_by_warehouse.items()
+	}
+
+	out = {}
+	for bundle in bundle_codes:
+		stock = component_stock[bundle_warehouses.get(bundle)]
+		bundle_qty = min(
+			(
+				floor(flt(stock[item_code].stock_qty) / qty) if qty > 0 else 0
+				for item_code, qty in product_bundles[bundle]
+			),
+			default=0,
+		)
+		out[bundle] = frappe._dict({"in_stock": bundle_qty > 0 and 1 or 0, "stock_qty": bundle_qty})
+
+	return out
+
+
+def get_product_bundles():
+	"""{bundle item_code: [(component item_code, qty), ...]}, cached until a Product Bundle changes."""
+
+	def get_bundles():
+		product_bundles = {}
+		for row in frappe.get_all(
+			"Product Bundle Item",
+			filters={"parenttype": "Product Bundle"},
+			fields=["parent", "item_code", "qty"],
+			order_by="parent, idx",
+		):
+			product_bundles.setdefault(row.parent, []).append((row.item_code, flt(row.qty)))
+
+		return product_bundles
+
+	return frappe.cache().get_value(PRODUCT_BUNDLES_CACHE_KEY, generator=get_bundles)
+
+
+def clear_product_bundles_cache():
+	frappe.cache().delete_value(PRODUCT_BUNDLES_CACHE_KEY)
@@ -0,0 +1,255 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import json
+import time
+
+import frappe
+from frappe.utils import cint, flt, nowdate
+from frappe.utils.redis_wrapper import RedisWrapper
+
+from webshop.webshop.utils.product import get_sellable_qty
+
+# one hash per item: {website warehouse: {"qty", "at", "date"}}
+SELLABLE_STOCK_CACHE_KEY = "webshop_sellable_stock"
+SELLABLE_STOCK_REPORT_KEY = "webshop_sellable_stock_reconciliation"
+
+# staleness bound of an entry, stock movements refresh entries sooner
+SELLABLE_STOCK_TTL = 900
+
+# items reconciled per batch of queries
+RECONCILIATION_BATCH_SIZE = 500
+RECONCILIATION_SAMPLE_SIZE = 20
+
+
+def get_cached_sellable_qty(item_warehouses):
+	"""
+	Sellable qty of items in their website warehouse, computing and caching missing
+	or stale entries.
+
+	Args:
+	        item_warehouses (dict): {item_code: website warehouse}
+
+	Returns:
+	        dict: {item_code: qty}
+	"""
+	if not item_warehouses:
+		return {}
+
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	for item_code, warehouse in item_warehouses.items():
+		pipeline.hget(get_sellable_stock_key(item_code), warehouse)
+
+	out, missing = {}, {}
+	for (item_code, warehouse), entry in zip(item_warehouses.items(), pipeline.execute()):
+		entry = parse_entry(entry)
+		if is_fresh(entry):
+			out[item_code] = entry["qty"]
+		else:
+			missing[item_code] = warehouse
+
+	if missing:
+		sellable_qty = get_sellable_qty(missing)
+		set_sellable_qty(missing, sellable_qty)
+		out.update(sellable_qty)
+
+	return out
+
+
+def set_sellable_qty(item_warehouses, sellable_qty):
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	entry = {"at": time.time(), "date": nowdate()}
+
+	for item_code, warehouse in item_warehouses.items():
+		key = get_sellable_stock_key(item_code)
+		pipeline.hset(key, warehouse, json.dumps({**entry, "qty": sellable_qty.get(item_code, 0.0)}))
+		# drop items that are no longer viewed
+		pipeline.expire(key, SELLABLE_STOCK_TTL * 4)
+
+	pipeline.execute()
+
+
+def get_sellable_stock_key(item_code):
+	return frappe.cache().make_key(f"{SELLABLE_STOCK_CACHE_KEY}:{item_code}")
+
+
+def parse_entry(entry):
+	return json.loads(frappe.safe_decode(entry)) if entry else None
+
+
+def is_fresh(entry):
+	# batches expire at the start of a day
+	return (
+		entry
+		and entry["date"] == nowdate()
+		and time.time() - entry["at"] < SELLABLE_STOCK_TTL
+	)
+
+
+def update_sellable_stock(doc, method=None):
+	"""
+	Stock Ledger Entry hook: drop the cached qty of the item right away and
+	recompute it for the same warehouses once the transaction is committed.
+	"""
+	cache = frappe.cache()
+	key = get_sellable_stock_key(doc.item_code)
+	warehouses = [frappe.safe_decode(w) for w in super(RedisWrapper, cache).hkeys(key)]
+	cache.delete(key)
+
+	if not warehouses:
+		return
+
+	if getattr(frappe.local, "sellable_stock_updates", None) is None:
+		frappe.local.sellable_stock_updates = {}
+		frappe.db.after_commit.add(refresh_sellable_stock)
+		frappe.db.after_rollback.add(discard_sellable_stock_updates)
+
+	frappe.local.sellable_stock_updates.setdefault(doc.item_code, set()).update(warehouses)
+
+
+def refresh_sellable_stock():
+	updates = frappe.local.sellable_stock_updates or {}
+	frappe.local.sellable_stock_updates = None
+
+	# an item can be listed under several website warehouses
+	while updates:
+		item_warehouses = {item_code: warehouses.pop() for item_code, warehouses in updates.items()}
+		set_sellable_qty(item_warehouses, get_sellable_qty(item_warehouses))
+		updates = {item_code: warehouses for item_code, warehouses in updates.items() if warehouses}
+
+
+def discard_sellable_stock_updates():
+	frappe.local.sellable_stock_updates = None
+
+
+def reconcile_sellable_stock():
+	"""
+	Recompute every cached entry, correcting and counting the ones that drifted.
+	Entries keep their expiry, items that are no longer sellable are dropped.
+	The outcome is kept as a report, see `get_sellable_stock_report`.
+	"""
+	cache = frappe.cache()
+	prefix = get_sellable_stock_key("")
+	started_at = time.time()
+	checked = mismatched = dropped = 0
+	max_drift = 0.0
+	sample = []
+
+	keys = [frappe.safe_decode(key) for key in cache.scan_iter(match=f"{prefix}*")]
+	for start in range(0, len(keys), RECONCILIATION_BATCH_SIZE):
+		batch = {key[len(prefix) :]: key for key in keys[start : start + RECONCILIATION_BATCH_SIZE]}
+
+		sellable_items = get_sellable_items(list(batch))
+		for item_code in set(batch) - sellable_items:
+			cache.delete(batch.pop(item_code))
+			dropped += 1
+
+		pipeline = cache.pipeline()
+		for key in batch.values():
+			pipeline.hgetall(key)
+			pipeline.ttl(key)
+		results = pipeline.execute()
+
+		cached, ttls = {}, {}
+		for item_code, entries, ttl in zip(batch, results[::2], results[1::2]):
+			# -1: no expiry (eg. set before expiries were kept), give it one
+			ttls[item_code] = SELLABLE_STOCK_TTL if ttl == -1 else ttl
+			for warehouse, entry in entries.items():
+				cached.setdefault(frappe.safe_decode(warehouse), {})[item_code] = parse_entry(entry)
+
+		for warehouse, entries in cached.items():
+			sellable_qty = get_sellable_qty({item_code: warehouse for item_code in entries})
+
+			corrected = {}
+			for item_code, entry in entries.items():
+				checked += 1
+				drift = abs(flt(sellable_qty.get(item_code)) - flt(entry["qty"]))
+				if drift > 1e-6:
+					mismatched += 1
+					max_drift = max(max_drift, drift)
+					corrected[item_code] = warehouse
+					if len(sample) < RECONCILIATION_SAMPLE_SIZE:
+						sample.append(
+							{
+								"item_code": item_code,
+								"warehouse": warehouse,
+								"cached_qty": entry["qty"],
+								"actual_qty": sellable_qty.get(item_code, 0.0),
+							}
+						)
+
+			correct_sellable_qty(corrected, sellable_qty, ttls)
+
+	report_key = cache.make_key(SELLABLE_STOCK_REPORT_KEY)
+	cache.delete(report_key)
+	super(RedisWrapper, cache).hset(
+		report_key,
+		mapping={
+			"checked": checked,
+			"mismatched": mismatched,
+			"dropped": dropped,
+			"max_drift": max_drift,
+			"started_at": started_at,
+			"duration": time.time() - started_at,
+			"sample": json.dumps(sample),
+		},
+	)
+
+
+def correct_sellable_qty(item_warehouses, sellable_qty, ttls):
+	"""Overwrite drifted entries, keeping the remaining lifetime of their key."""
+	pipeline = frappe.cache().pipeline()
+	entry = {"at": time.time(), "date": nowdate()}
+
+	for item_code, warehouse in item_warehouses.items():
+		if ttls.get(item_code, 0) <= 0:
+			# expired since it was read
+			continue
+
+		key = get_sellable_stock_key(item_code)
+		pipeline.hset(key, warehouse, json.dumps({**entry, "qty": sellable_qty.get(item_code, 0.0)}))
+		pipeline.expire(key, ttls[item_code])
+
+	pipeline.execute()
+
+
+def get_sellable_items(item_codes):
+	"""Enabled items of `item_codes` listed on the website, directly or through their template."""
+	items = frappe.get_all(
+		"Item",
+		filters={"name": ["in", item_codes], "disabled": 0},
+		fields=["name", "variant_of"],
+	)
+	templates = {item.variant_of for item in items if item.variant_of}
+	published = set(
+		frappe.get_all(
+			"Website Item",
+			filters={"item_code": ["in", list(set(item_codes) | templates)], "published": 1},
+			pluck="item_code",
+		)
+	)
+
+	return {item.name for item in items if item.name in published or item.variant_of in published}
+
+
+@frappe.whitelist()
+def get_sellable_stock_report():
+	"Outcome of the last reconciliation of the sellable stock cache."
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	report = super(RedisWrapper, cache).hgetall(cache.make_key(SELLABLE_STOCK_REPORT_KEY))
+	report = {frappe.safe_decode(key): frappe.safe_decode(value) for key, value in report.items()}
+
+	return {
+		"checked": cint(report.get("checked")),
+		"mismatched": cint(report.get("mismatched")),
+		"dropped": cint(report.get("dropped")),
+		"max_drift": flt(report.get("max_drift")),
+		"started_at": flt(report.get("started_at")),
+		"duration": flt(report.get("duration"), 2),
+		"sample": json.loads(report.get("sample") or "[]"),
+		"staleness_bound": SELLABLE_STOCK_TTL,
+	}
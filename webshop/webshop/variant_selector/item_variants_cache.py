@@ -1,41 +1,159 @@
+import time
+
 import frappe
+from frappe.utils import cint
+from frappe.utils.redis_wrapper import RedisWrapper
+from redis.exceptions import LockError
+
+ITEM_VARIANTS_CACHE_KEY = "item_variants_cache"
+ITEM_VARIANTS_CACHE_STATS_KEY = "item_variants_cache_stats"
+
+# a rebuild is queued for the template, set at enqueue time
+REBUILD_PENDING_KEY = "item_variants_cache_rebuild_pending"
+# held while a process builds the cache of the template
+REBUILD_LOCK_KEY = "item_variants_cache_rebuild_lock"
+REBUILD_LOCK_TIMEOUT = 300
+
+# how long a request waits for a missing cache being built elsewhere
+READ_LOCK_TIMEOUT = 5
+
+# bump when the layout of the cached data changes, older entries are rebuilt
+CACHE_FORMAT_VERSION = 2
+
+# value index of an attribute that is not set on a variant
+NOT_SET = -1
 
 
 class ItemVariantsCacheManager:
 	def __init__(self, item_code):
 		self.item_code = item_code
 
+	def get_cache(self):
+		"""
+		Variant data of the template, fetched from Redis once per request.
+		Attributes and values are interned, variants are rows of value indexes.
+		Returns:
+		        dict: {
+		                "version": CACHE_FORMAT_VERSION,
+		                "attributes": [attribute, ...] in template order,
+		                "values": [[value, ...] of each attribute],
+		                "items": [variant item code, ...],
+		                "rows": [(value index of each attribute, NOT_SET if missing) of each variant],
+		                "optional": [index of each optional attribute],
+		                "bitsets": [[bitset of variant indexes having the value, per value] of each attribute],
+		                "present": [bitset of variant indexes having the attribute set, per attribute],
+		        }
+		"""
+		local_cache = getattr(frappe.local, "item_variants_cache", None)
+		if local_cache is None:
+			local_cache = frappe.local.item_variants_cache = {}
+
+		if self.item_code not in local_cache:
+			local_cache[self.item_code] = self.get_stored_cache() or self.build_missing_cache()
+
+		return local_cache[self.item_code]
+
+	def get_stored_cache(self):
+		data = frappe.cache().hget(ITEM_VARIANTS_CACHE_KEY, self.item_code)
+		if data and data.get("version") == CACHE_FORMAT_VERSION:
+			return data
+
+	def build_missing_cache(self):
+		"""Build the cache once, requests missing it at the same time wait for that build."""
+		lock = get_rebuild_lock(self.item_code, blocking_timeout=READ_LOCK_TIMEOUT)
+
+		if not lock.acquire():
+			# build is taking too long, serve this request from the db without caching
+			return self.get_stored_cache() or self.get_cache_data()
+
+		try:
+			# built by another process while waiting for the lock
+			return self.get_stored_cache() or self.build_cache()
+		finally:
+			release_lock(lock)
+
+	def get_attributes(self):
+		"""Attributes of the template in order."""
+		return self.get_cache()["attributes"]
+
 	def get_item_variants_data(self):
-		val = frappe.cache().hget("item_variants_data", self.item_code)
+		"""[(item_code, attribute, attribute_value), ...] of enabled variants."""
+		data = self.get_cache()
+		attributes, values = data["attributes"], data["values"]
 
-		if not val:
-			self.build_cache()
+		item_variants_data = []
+		for item_code, row in zip(data["items"], data["rows"]):
+			for index, value_index in enumerate(row):
+				if value_index != NOT_SET:
+					item_variants_data.append(
+						(item_code, attributes[index], values[index][value_index])
+					)
 
-		return frappe.cache().hget("item_variants_data", self.item_code)
+		return item_variants_data
 
 	def get_attribute_value_item_map(self):
-		val = frappe.cache().hget("attribute_value_item_map", self.item_code)
+		"""(attribute, value) => [item1, item2]"""
+		data = self.get_cache()
+		attributes, values = data["attributes"], data["values"]
 
-		if not val:
-			self.build_cache()
+		attribute_value_item_map = frappe._dict()
+		for item_code, row in zip(data["items"], data["rows"]):
+			for index, value_index in enumerate(row):
+				if value_index != NOT_SET:
+					key = (attributes[index], values[index][value_index])
+					attribute_value_item_map.setdefault(key, []).append(item_code)
 
-		return frappe.cache().hget("attribute_value_item_map", self.item_code)
+		return attribute_value_item_map
 
 	def get_item_attribute_value_map(self):
-		val = frappe.cache().hget("item_attribute_value_map", self.item_code)
+		"""item => {attr1: value1, attr2: value2}"""
+		data = self.get_cache()
+		attributes, values = data["attributes"], data["values"]
+
+		return frappe._dict(
+			{
+				item_code: {
+					attributes[index]: values[index][value_index]
+					for index, value_index in enumerate(row)
+					if value_index != NOT_SET
+				}
+				for item_code, row in zip(data["items"], data["rows"])
+			}
+		)
+
+	def get_optional_attributes(self):
+		data = self.get_cache()
+		return {data["attributes"][index] for index in data["optional"]}
 
-		if not val:
-			self.build_cache()
+	def get_matching_variants(self, selected_attributes):
+		"""
+		Bitset of variant indexes that have all `selected_attributes`.
+		Args:
+		        selected_attributes (dict): {attribute: value}
+		"""
+		data = self.get_cache()
+		attribute_index = {attribute: index for index, attribute in enumerate(data["attributes"])}
 
-		return frappe.cache().hget("item_attribute_value_map", self.item_code)
+		matches = (1 << len(data["items"])) - 1
+		for attribute, value in selected_attributes.items():
+			index = attribute_index.get(attribute)
+			if index is None or value not in data["values"][index]:
+				return 0
 
-	def get_optional_attributes(self):
-		val = frappe.cache().hget("optional_attributes", self.item_code)
+			matches &= data["bitsets"][index][data["values"][index].index(value)]
+
+		return matches
 
-		if not val:
-			self.build_cache()
+	def get_items_from_bitset(self, bitset):
+		items = self.get_cache()["items"]
 
-		return frappe.cache().hget("optional_attributes", self.item_code)
+		result = []
+		while bitset:
+			lowest = bitset & -bitset
+			result.append(items[lowest.bit_length() - 1])
+			bitset ^= lowest
+
+		return result
 
 	def get_ordered_attribute_values(self):
 		val = frappe.cache().get_value("ordered_attribute_values_map")
@@ -54,6 +172,19 @@ class ItemVariantsCacheManager:
 		return ordered_attribute_values_map
 
 	def build_cache(self):
+		start = time.monotonic()
+
+		data = self.get_cache_data()
+		frappe.cache().hset(ITEM_VARIANTS_CACHE_KEY, self.item_code, data)
+
+		local_cache = getattr(frappe.local, "item_variants_cache", None)
+		if local_cache is not None:
+			local_cache[self.item_code] = data
+
+		update_rebuild_stats(time.monotonic() - start)
+		return data
+
+	def get_cache_data(self):
 		parent_item_code = self.item_code
 
 		attributes = [
@@ -76,55 +207,157 @@ class ItemVariantsCacheManager:
 		)
 		item_variants_data = query.run()
 
-		attribute_value_item_map = frappe._dict()
-		item_attribute_value_map = frappe._dict()
-
-		for row in item_variants_data:
-			item_code, attribute, attribute_value = row
-			# (attr, value) => [item1, item2]
-			attribute_value_item_map.setdefault((attribute, attribute_value), []).append(item_code)
-			# item => {attr1: value1, attr2: value2}
-			item_attribute_value_map.setdefault(item_code, {})[attribute] = attribute_value
-
-		optional_attributes = set()
-		for item_code, attr_dict in item_attribute_value_map.items():
-			for attribute in attributes:
-				if attribute not in attr_dict:
-					optional_attributes.add(attribute)
-
-		frappe.cache().hset("attribute_value_item_map", parent_item_code, attribute_value_item_map)
-		frappe.cache().hset("item_attribute_value_map", parent_item_code, item_attribute_value_map)
-		frappe.cache().hset("item_variants_data", parent_item_code, item_variants_data)
-		frappe.cache().hset("optional_attributes", parent_item_code, optional_attributes)
+		return make_variants_cache_data(attributes, item_variants_data)
 
 	def clear_cache(self):
-		keys = [
-			"attribute_value_item_map",
-			"item_attribute_value_map",
-			"item_variants_data",
-			"optional_attributes",
-		]
+		frappe.cache().hdel(ITEM_VARIANTS_CACHE_KEY, self.item_code)
 
-		for key in keys:
-			frappe.cache().hdel(key, self.item_code)
+		local_cache = getattr(frappe.local, "item_variants_cache", None)
+		if local_cache:
+			local_cache.pop(self.item_code, None)
 
 	def rebuild_cache(self):
-		self.clear_cache()
+		# the current cache is served until the rebuild replaces it
 		enqueue_build_cache(self.item_code)
 
 
+def make_variants_cache_data(attributes, item_variants_data):
+	"""
+	Compact variant data from template `attributes` and variant rows.
+	Args:
+	        attributes (list): attributes of the template in order
+	        item_variants_data (list): [(item_code, attribute, attribute_value), ...]
+	"""
+	attributes = list(attributes)
+	attribute_index = {attribute: index for index, attribute in enumerate(attributes)}
+	values = [[] for _ in attributes]
+	value_index = [{} for _ in attributes]
+	items, rows = [], {}
+
+	for item_code, attribute, attribute_value in item_variants_data:
+		index = attribute_index.get(attribute)
+		if index is None:
+			# attribute no longer on the template
+			continue
+
+		if attribute_value not in value_index[index]:
+			value_index[index][attribute_value] = len(values[index])
+			values[index].append(attribute_value)
+
+		if item_code not in rows:
+			items.append(item_code)
+			rows[item_code] = {}
+
+		rows[item_code][index] = value_index[index][attribute_value]
+
+	rows = [
+		tuple(rows[item_code].get(index, NOT_SET) for index in range(len(attributes)))
+		for item_code in items
+	]
+
+	# variant `n` is bit `n` of each bitset
+	bitsets = [[0] * len(attribute_values) for attribute_values in values]
+	present = [0] * len(attributes)
+	for variant_index, row in enumerate(rows):
+		bit = 1 << variant_index
+		for index, value in enumerate(row):
+			if value != NOT_SET:
+				bitsets[index][value] |= bit
+				present[index] |= bit
+
+	all_variants = (1 << len(rows)) - 1
+	optional = [index for index in range(len(attributes)) if present[index] != all_variants]
+
+	return {
+		"version": CACHE_FORMAT_VERSION,
+		"attributes": attributes,
+		"values": values,
+		"items": items,
+		"rows": rows,
+		"optional": optional,
+		"bitsets": bitsets,
+		"present": present,
+	}
+
+
 def build_cache(item_code):
-	frappe.cache().hset("item_cache_build_in_progress", item_code, 1)
-	i = ItemVariantsCacheManager(item_code)
-	i.build_cache()
-	frappe.cache().hset("item_cache_build_in_progress", item_code, 0)
+	# invalidations from now on need another rebuild
+	frappe.cache().delete_value(f"{REBUILD_PENDING_KEY}:{item_code}")
+
+	# wait for a build of the same template that is already running
+	lock = get_rebuild_lock(item_code, blocking_timeout=REBUILD_LOCK_TIMEOUT)
+	if not lock.acquire():
+		enqueue_build_cache(item_code)
+		return
+
+	try:
+		ItemVariantsCacheManager(item_code).build_cache()
+	finally:
+		release_lock(lock)
 
 
 def enqueue_build_cache(item_code):
-	if frappe.cache().hget("item_cache_build_in_progress", item_code):
+	"""Queue a rebuild of the cache, coalescing invalidations until the rebuild starts."""
+	cache = frappe.cache()
+	pending_key = cache.make_key(f"{REBUILD_PENDING_KEY}:{item_code}")
+
+	if not cache.set(pending_key, 1, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+		cache.hincrby(cache.make_key(ITEM_VARIANTS_CACHE_STATS_KEY), "coalesced", 1)
 		return
+
 	frappe.enqueue(
 		"webshop.webshop.variant_selector.item_variants_cache.build_cache",
 		item_code=item_code,
 		queue="long",
+		enqueue_after_commit=True,
+		now=frappe.flags.in_test,
+	)
+
+	# the job is dropped on rollback, let the next invalidation queue it again
+	frappe.db.after_rollback.add(lambda: cache.delete(pending_key))
+
+
+def get_rebuild_lock(item_code, blocking_timeout):
+	cache = frappe.cache()
+	return cache.lock(
+		cache.make_key(f"{REBUILD_LOCK_KEY}:{item_code}"),
+		timeout=REBUILD_LOCK_TIMEOUT,
+		blocking_timeout=blocking_timeout,
 	)
+
+
+def release_lock(lock):
+	try:
+		lock.release()
+	except LockError:
+		# expired and possibly taken over by another build
+		pass
+
+
+def update_rebuild_stats(duration):
+	cache = frappe.cache()
+	stats_key = cache.make_key(ITEM_VARIANTS_CACHE_STATS_KEY)
+
+	pipeline = cache.pipeline()
+	pipeline.hincrby(stats_key, "rebuilds", 1)
+	pipeline.hincrby(stats_key, "rebuild_time_ms", int(duration * 1000))
+	pipeline.hset(stats_key, "last_rebuild_ms", int(duration * 1000))
+	pipeline.execute()
+
+
+@frappe.whitelist()
+def get_item_variants_cache_stats():
+	"Rebuild counters of the variant selector cache."
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	stats = super(RedisWrapper, cache).hgetall(cache.make_key(ITEM_VARIANTS_CACHE_STATS_KEY))
+	stats = {frappe.safe_decode(key): cint(value) for key, value in stats.items()}
+
+	rebuilds = stats.get("rebuilds", 0)
+	return {
+		"rebuilds": rebuilds,
+		"coalesced": stats.get("coalesced", 0),
+		"average_rebuild_ms": (stats.get("rebuild_time_ms", 0) / rebuilds) if rebuilds else 0,
+		"last_rebuild_ms": stats.get("last_rebuild_ms", 0),
+	}
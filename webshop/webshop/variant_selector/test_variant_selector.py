@@ -73,6 +73,57 @@ class TestVariantSelector(FrappeTestCase):
 		small_variant.disabled = 0
 		small_variant.save()
 
+	def test_item_variants_cache(self):
+		"Test if variant data of a template is stored as a single compact entry."
+		from webshop.webshop.variant_selector.item_variants_cache import (
+			ITEM_VARIANTS_CACHE_KEY,
+			ItemVariantsCacheManager,
+		)
+
+		item_cache = ItemVariantsCacheManager("Test-Tshirt-Temp")
+		item_cache.clear_cache()
+
+		data = item_cache.get_cache()
+		self.assertEqual(data["attributes"], ["Test Size", "Test Colour"])
+		self.assertEqual(len(data["items"]), 5)
+		self.assertEqual(frappe.cache().hget(ITEM_VARIANTS_CACHE_KEY, "Test-Tshirt-Temp"), data)
+
+		# maps are derived from the compact rows
+		self.assertEqual(
+			item_cache.get_item_attribute_value_map()["Test-Tshirt-Temp-S-R"],
+			{"Test Size": "Small", "Test Colour": "Red"},
+		)
+		self.assertEqual(
+			item_cache.get_attribute_value_item_map()[("Test Size", "Small")], ["Test-Tshirt-Temp-S-R"]
+		)
+
+	def test_item_variants_cache_rebuild(self):
+		"Test if invalidations queued before a rebuild starts are coalesced into it."
+		from webshop.webshop.variant_selector.item_variants_cache import (
+			REBUILD_PENDING_KEY,
+			ItemVariantsCacheManager,
+			get_item_variants_cache_stats,
+		)
+
+		item_cache = ItemVariantsCacheManager("Test-Tshirt-Temp")
+		data = item_cache.get_cache()
+		stats = get_item_variants_cache_stats()
+
+		# rebuild runs right away in tests
+		item_cache.rebuild_cache()
+		self.assertEqual(get_item_variants_cache_stats()["rebuilds"], stats["rebuilds"] + 1)
+		self.assertEqual(item_cache.get_stored_cache(), data)
+
+		# a rebuild is already queued, the invalidation is folded into it
+		frappe.cache().set_value(f"{REBUILD_PENDING_KEY}:Test-Tshirt-Temp", 1)
+		item_cache.rebuild_cache()
+		self.assertEqual(get_item_variants_cache_stats()["rebuilds"], stats["rebuilds"] + 1)
+		self.assertEqual(get_item_variants_cache_stats()["coalesced"], stats["coalesced"] + 1)
+
+		# previous cache is served until the queued rebuild runs
+		self.assertEqual(item_cache.get_stored_cache(), data)
+		frappe.cache().delete_value(f"{REBUILD_PENDING_KEY}:Test-Tshirt-Temp")
+
 	def test_next_item_variant_values(self):
 		"""
 		Test if on selecting an attribute value, the next possible values
@@ -93,6 +144,63 @@ class TestVariantSelector(FrappeTestCase):
 		self.assertEqual(len(filtered_items), 1)
 		self.assertEqual(filtered_items.pop(), "Test-Tshirt-Temp-S-R")
 
+	def test_variants_cache_payload_size(self):
+		"Test if the cached data of 500 variants is smaller than the previous four entries."
+		from webshop.webshop.benchmarks import benchmark_variants_cache_payload
+
+		payload = benchmark_variants_cache_payload(sizes=10, colours=10, lengths=5)
+
+		self.assertEqual(payload.variants, 500)
+		self.assertLess(payload.compact_bytes, payload.legacy_bytes)
+
+	def test_variant_options_bitsets(self):
+		"""
+		Test if filtering variants by bitsets matches the previous scan of all
+		variant rows, on 4000 variants (20 sizes x 20 colours x 10 lengths).
+		"""
+		from webshop.webshop.benchmarks import (
+			get_legacy_variant_options,
+			make_legacy_variants_cache_data,
+			make_variants_data,
+		)
+		from webshop.webshop.variant_selector.item_variants_cache import (
+			ItemVariantsCacheManager,
+			make_variants_cache_data,
+		)
+		from webshop.webshop.variant_selector.utils import get_variant_options
+
+		attributes, item_variants_data = make_variants_data(20, 20, 10)
+		legacy = make_legacy_variants_cache_data(attributes, item_variants_data)
+
+		item_cache = ItemVariantsCacheManager("_Bench Variant")
+		if getattr(frappe.local, "item_variants_cache", None) is None:
+			frappe.local.item_variants_cache = {}
+		frappe.local.item_variants_cache["_Bench Variant"] = make_variants_cache_data(
+			attributes, item_variants_data
+		)
+
+		try:
+			selections = [
+				{"Size": "S3"},
+				{"Size": "S3", "Colour": "C7"},
+				{"Size": "S3", "Colour": "C7", "Length": "L2"},
+			]
+			for selected_attributes in selections:
+				matches, valid_options, exact_matches = get_variant_options(
+					item_cache, selected_attributes
+				)
+				filtered_items, scanned_options = get_legacy_variant_options(
+					legacy, attributes, selected_attributes
+				)
+
+				self.assertEqual(set(item_cache.get_items_from_bitset(matches)), filtered_items)
+				self.assertEqual(matches.bit_count(), len(filtered_items))
+				self.assertEqual(dict(valid_options), scanned_options)
+
+			self.assertEqual(item_cache.get_items_from_bitset(exact_matches), ["_Bench Variant-3-7-2"])
+		finally:
+			frappe.local.item_variants_cache.pop("_Bench Variant")
+
 	def test_exact_match_with_price(self):
 		"""
 		Test price fetching and matching of variant without Website Item
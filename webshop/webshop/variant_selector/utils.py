@@ -1,10 +1,11 @@
 import frappe
-from frappe.utils import cint, flt
+from frappe.utils import cint
 
 from webshop.webshop.doctype.webshop_settings.webshop_settings import (
 	get_shopping_cart_settings,
 )
 from webshop.webshop.shopping_cart.cart import _set_price_list
+from webshop.webshop.utils.product import get_web_item_qty_in_stock
 from webshop.webshop.variant_selector.item_variants_cache import ItemVariantsCacheManager
 from erpnext.utilities.product import get_price
 
@@ -78,7 +79,7 @@ def get_attributes_and_values(item_code):
 	item_cache = ItemVariantsCacheManager(item_code)
 	item_variants_data = item_cache.get_item_variants_data()
 
-	attributes = get_item_attributes(item_code)
+	attributes = get_item_attributes(item_code, item_cache)
 	attribute_list = [a.attribute for a in attributes]
 
 	valid_options = {}
@@ -86,12 +87,7 @@ def get_attributes_and_values(item_code):
 		if attribute in attribute_list:
 			valid_options.setdefault(attribute, set()).add(attribute_value)
 
-	item_attribute_values = frappe.db.get_all(
-		"Item Attribute Value", ["parent", "attribute_value", "idx"], order_by="parent asc, idx asc"
-	)
-	ordered_attribute_value_map = frappe._dict()
-	for iv in item_attribute_values:
-		ordered_attribute_value_map.setdefault(iv.parent, []).append(iv.attribute_value)
+	ordered_attribute_value_map = item_cache.get_ordered_attribute_values()
 
 	# build attribute values in idx order
 	for attr in attributes:
@@ -104,8 +100,6 @@ def get_attributes_and_values(item_code):
 
 @frappe.whitelist(allow_guest=True)
 def get_next_attribute_and_values(item_code, selected_attributes):
-	from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
-
 	"""Find the count of Items that match the selected attributes.
 	Also, find the attribute values that are not applicable for further searching.
 	If less than equal to 10 items are found, return item_codes of those items.
@@ -114,11 +108,9 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 	selected_attributes = frappe.parse_json(selected_attributes)
 
 	item_cache = ItemVariantsCacheManager(item_code)
-	item_variants_data = item_cache.get_item_variants_data()
 
-	attributes = get_item_attributes(item_code)
+	attributes = get_item_attributes(item_code, item_cache)
 	attribute_list = [a.attribute for a in attributes]
-	filtered_items = get_items_with_selected_attributes(item_code, selected_attributes)
 
 	next_attribute = None
 
@@ -127,35 +119,19 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 			next_attribute = attribute
 			break
 
-	valid_options_for_attributes = frappe._dict()
-
-	for a in attribute_list:
-		valid_options_for_attributes[a] = set()
-
-		selected_attribute = selected_attributes.get(a, None)
-		if selected_attribute:
-			# already selected attribute values are valid options
-			valid_options_for_attributes[a].add(selected_attribute)
-
-	for row in item_variants_data:
-		item_code, attribute, attribute_value = row
-		if (
-			item_code in filtered_items
-			and attribute not in selected_attributes
-			and attribute in attribute_list
-		):
-			valid_options_for_attributes[attribute].add(attribute_value)
+	matches, valid_options_for_attributes, exact_matches = get_variant_options(
+		item_cache, selected_attributes
+	)
+	filtered_items_count = matches.bit_count()
+	filtered_items = (
+		set(item_cache.get_items_from_bitset(matches)) if filtered_items_count < 10 else set()
+	)
 
 	optional_attributes = item_cache.get_optional_attributes()
 	exact_match = []
 	# search for exact match if all selected attributes are required attributes
 	if len(selected_attributes.keys()) >= (len(attribute_list) - len(optional_attributes)):
-		item_attribute_value_map = item_cache.get_item_attribute_value_map()
-		for item_code, attr_dict in item_attribute_value_map.items():
-			if item_code in filtered_items and set(attr_dict.keys()) == set(selected_attributes.keys()):
-				exact_match.append(item_code)
-
-	filtered_items_count = len(filtered_items)
+		exact_match = item_cache.get_items_from_bitset(exact_matches)
 
 	if exact_match:
 		cart_settings = get_shopping_cart_settings()
@@ -168,69 +144,86 @@ def get_next_attribute_and_values(item_code, selected_attributes):
 		product_info = None
 
 	product_id = ""
-	warehouse = ""
-	if exact_match or filtered_items:
+	if exact_match or filtered_items_count:
 		if exact_match and len(exact_match) == 1:
 			product_id = exact_match[0]
 		elif filtered_items_count == 1:
 			product_id = list(filtered_items)[0]
 
+	available_qty = 0.0
 	if product_id:
+		# stock of the variant in its own website warehouse
 		warehouse = frappe.get_cached_value(
 			"Website Item", {"item_code": product_id}, "website_warehouse"
 		)
-
-	available_qty = 0.0
-	if warehouse and frappe.get_cached_value("Warehouse", warehouse, "is_group") == 1:
-		warehouses = get_child_warehouses(warehouse)
-	else:
-		warehouses = [warehouse] if warehouse else []
-
-	for warehouse in warehouses:
-		available_qty += flt(
-			frappe.db.get_value("Bin", {"item_code": product_id, "warehouse": warehouse}, "actual_qty")
-		)
+		if warehouse:
+			available_qty = get_web_item_qty_in_stock(
+				product_id, "website_warehouse", warehouse
+			).stock_qty
 
 	return {
 		"next_attribute": next_attribute,
 		"valid_options_for_attributes": valid_options_for_attributes,
 		"filtered_items_count": filtered_items_count,
-		"filtered_items": filtered_items if filtered_items_count < 10 else [],
+		"filtered_items": filtered_items,
 		"exact_match": exact_match,
 		"product_info": product_info,
 		"available_qty": available_qty,
 	}
 
 
-def get_items_with_selected_attributes(item_code, selected_attributes):
-	item_cache = ItemVariantsCacheManager(item_code)
-	attribute_value_item_map = item_cache.get_attribute_value_item_map()
+def get_variant_options(item_cache, selected_attributes):
+	"""
+	Filter the variants of a template by `selected_attributes` using the cached bitsets.
+	Returns:
+	        tuple: (bitset of matching variants, {attribute: set of valid values},
+	                bitset of matching variants with no other attribute set)
+	"""
+	data = item_cache.get_cache()
+	matches = item_cache.get_matching_variants(selected_attributes)
 
-	items = []
-	for attribute, value in selected_attributes.items():
-		filtered_items = attribute_value_item_map.get((attribute, value), [])
-		items.append(set(filtered_items))
+	valid_options_for_attributes = frappe._dict()
+	unselected_attributes_set = 0
 
-	return set.intersection(*items)
+	for index, attribute in enumerate(data["attributes"]):
+		valid_options_for_attributes[attribute] = set()
 
+		if attribute in selected_attributes:
+			if selected_attributes[attribute]:
+				# already selected attribute values are valid options
+				valid_options_for_attributes[attribute].add(selected_attributes[attribute])
+			continue
 
-# utilities
+		unselected_attributes_set |= data["present"][index]
+		for value, bitset in zip(data["values"][index], data["bitsets"][index]):
+			if bitset & matches:
+				valid_options_for_attributes[attribute].add(value)
 
+	return matches, valid_options_for_attributes, matches & ~unselected_attributes_set
 
-def get_item_attributes(item_code):
-	attributes = frappe.db.get_all(
-		"Item Variant Attribute",
-		fields=["attribute"],
-		filters={"parenttype": "Item", "parent": item_code},
-		order_by="idx asc",
-	)
 
-	optional_attributes = ItemVariantsCacheManager(item_code).get_optional_attributes()
+def get_items_with_selected_attributes(item_code, selected_attributes, item_cache=None):
+	item_cache = item_cache or ItemVariantsCacheManager(item_code)
+	matches = item_cache.get_matching_variants(selected_attributes)
 
-	for a in attributes:
-		if a.attribute in optional_attributes:
+	return set(item_cache.get_items_from_bitset(matches))
+
+
+# utilities
+
+
+def get_item_attributes(item_code, item_cache=None):
+	item_cache = item_cache or ItemVariantsCacheManager(item_code)
+	optional_attributes = item_cache.get_optional_attributes()
+
+	attributes = []
+	for attribute in item_cache.get_attributes():
+		a = frappe._dict(attribute=attribute)
+		if attribute in optional_attributes:
 			a.optional = True
 
+		attributes.append(a)
+
 	return attributes
 
 